@@ -3,8 +3,122 @@ Exercise 1: Gale-Shapley Algorithm Implementation
 Implements the Gale-Shapley algorithm for the Stable Matching Problem
 """
 
+import json
+import sys
+import time
+from array import array
+from collections import Counter, deque
 
-def gale_shapley(men_preferences, women_preferences):
+
+class MatchStats:
+    """
+    Optional proposal trace for Gale-Shapley runs.
+    
+    Pass an instance as stats= to a matching function and it records, per
+    run, how many proposals were made and how they ended: an engagement
+    with a free woman, a swap that displaces her partner, or a rejection.
+    It also keeps the proposal depth of every man in the last run (how far
+    down his list he got) and how often each man was displaced over all
+    runs. The matching loops only touch it on a swap and once at the end
+    of a run, behind an `is not None` check, so leaving stats=None costs
+    nothing measurable.
+    
+    The worst-case ratio is proposals / total list length: 1.0 means every
+    man proposed to every woman on his list, and the n(n+1)/2 input of
+    worst_case_preferences sits at about 0.5.
+    """
+    
+    def __init__(self):
+        self.runs = 0
+        self.proposals = 0
+        self.engagements = 0
+        self.swaps = 0
+        self.rejections = 0
+        self.depth = {}  # proposer -> proposals made in the last run
+        self.displaced = Counter()  # proposer -> times displaced, all runs
+        self.last_run = {}
+        self._run_swaps = 0
+    
+    def record_swap(self, displaced):
+        """Called by the matching loop when a woman trades up"""
+        self._run_swaps += 1
+        self.displaced[displaced] += 1
+    
+    def finish_run(self, depth, engagements, list_entries, proposals=None):
+        """
+        Close a run.
+        
+        Args:
+            depth: Dictionary mapping proposer -> proposals made in this run
+            engagements: Proposals accepted by a free woman (or free seat)
+            list_entries: Total length of the proposers' preference lists
+            proposals: Proposals made, if not the sum of the depths
+        """
+        if proposals is None:
+            proposals = sum(depth.values())
+        swaps = self._run_swaps
+        self._run_swaps = 0
+        
+        self.runs += 1
+        self.proposals += proposals
+        self.engagements += engagements
+        self.swaps += swaps
+        self.rejections += proposals - engagements - swaps
+        self.depth = depth
+        self.last_run = {
+            'proposals': proposals,
+            'engagements': engagements,
+            'swaps': swaps,
+            'rejections': proposals - engagements - swaps,
+            'list_entries': list_entries,
+            'worst_case_ratio': proposals / list_entries if list_entries else 0.0,
+        }
+    
+    def histogram(self, bins=10):
+        """
+        Bucket the proposal depths of the last run.
+        
+        Returns:
+            List of (low, high, count) with inclusive bounds
+        """
+        if not self.depth:
+            return []
+        top = max(self.depth.values())
+        width = max(1, -(-top // bins))  # ceil(top / bins)
+        counts = Counter((d - 1) // width if d else 0 for d in self.depth.values())
+        return [(b * width + 1, (b + 1) * width, counts[b])
+                for b in range(-(-top // width))]
+    
+    def summary(self, top=5):
+        """Totals, last-run figures and depth histogram as a plain dict"""
+        depths = self.depth.values()
+        return {
+            'runs': self.runs,
+            'proposals': self.proposals,
+            'engagements': self.engagements,
+            'swaps': self.swaps,
+            'rejections': self.rejections,
+            'last_run': dict(self.last_run,
+                             mean_depth=sum(depths) / len(depths) if depths else 0.0,
+                             max_depth=max(depths, default=0)),
+            'depth_histogram': [list(bucket) for bucket in self.histogram()],
+            'most_displaced': [[str(man), times]
+                               for man, times in self.displaced.most_common(top)],
+        }
+    
+    def to_json(self, indent=None):
+        """Serialize summary() for logs or dashboards"""
+        return json.dumps(self.summary(), indent=indent)
+    
+    def format_histogram(self, bins=10, width=40):
+        """Render the depth histogram as text bars"""
+        buckets = self.histogram(bins)
+        largest = max((count for _, _, count in buckets), default=0) or 1
+        return "\n".join(f"{low:>6}-{high:<6} {count:>7} {'#' * (count * width // largest)}"
+                         for low, high, count in buckets)
+
+
+def gale_shapley(men_preferences, women_preferences, stats=None, proposers='men'):
     """
     Implements the Gale-Shapley algorithm for stable matching.
     
@@ -19,12 +133,24 @@ def gale_shapley(men_preferences, women_preferences):
     Args:
         men_preferences: Dictionary mapping man -> list of women in order of preference
         women_preferences: Dictionary mapping woman -> list of men in order of preference
+        stats: Optional MatchStats that records this run
+        proposers: 'men' for the man-optimal matching, 'women' for the
+            woman-optimal one
     
     Returns:
         Dictionary mapping woman -> man (the stable matching)
     """
+    if proposers == 'women':
+        # The loop does not care which side is which; only the result is inverted
+        wives = gale_shapley(women_preferences, men_preferences, stats)
+        return {woman: man for man, woman in wives.items()}
+    if proposers != 'men':
+        raise ValueError("proposers must be 'men' or 'women'")
+    
     # Initialize: all men and women are free
-    free_men = list(men_preferences.keys())
+    # A deque gives O(1) removal from the front; list.pop(0) is O(n) and
+    # would make the whole algorithm O(n³)
+    free_men = deque(men_preferences.keys())
     engaged = {}  # woman -> man
     proposals = {man: 0 for man in free_men}  # Track how many proposals each man made
     
@@ -40,7 +166,7 @@ def gale_shapley(men_preferences, women_preferences):
         
         # If man has proposed to all women, skip (shouldn't happen in valid input)
         if proposals[man] >= len(men_preferences[man]):
-            free_men.pop(0)
+            free_men.popleft()
             continue
         
         # Get the next woman on man's preference list
@@ -50,7 +176,7 @@ def gale_shapley(men_preferences, women_preferences):
         if woman not in engaged:
             # Woman is free, engage them
             engaged[woman] = man
-            free_men.pop(0)
+            free_men.popleft()
         else:
             # Woman is engaged, check if she prefers this man
             current_man = engaged[woman]
@@ -59,17 +185,299 @@ def gale_shapley(men_preferences, women_preferences):
             if women_rankings[woman][man] < women_rankings[woman][current_man]:
                 # Woman prefers new man, break engagement and re-engage
                 engaged[woman] = man
-                free_men.pop(0)
+                free_men.popleft()
                 free_men.append(current_man)  # Previous man becomes free
+                if stats is not None:
+                    stats.record_swap(current_man)
             # Else: woman prefers current man, new man remains free and continues proposing
     
+    if stats is not None:
+        stats.finish_run(proposals, len(engaged),
+                         sum(map(len, men_preferences.values())))
     return engaged
 
 
+class IndexedMarket:
+    """
+    Integer-indexed representation of a stable matching instance.
+    
+    Agent names are interned to dense ids 0..n-1 once, and preferences are
+    kept in flat int32 arrays (row-major, one row of length n per agent):
+        men_prefs[m * n + k]  = id of the k-th woman on man m's list
+        women_rank[w * n + m] = rank of man m in woman w's list
+    
+    Each entry costs 4 bytes, compared to a list slot plus a dict entry
+    (well over 100 bytes) in the dict-of-dicts representation.
+    
+    Space Complexity: O(n²) int32 entries
+    """
+    
+    def __init__(self, men_preferences, women_preferences):
+        self.men = list(men_preferences.keys())
+        self.women = list(women_preferences.keys())
+        
+        n = len(self.men)
+        if len(self.women) != n:
+            raise ValueError("Both sides of the market must have the same size")
+        self.n = n
+        
+        man_id = {man: i for i, man in enumerate(self.men)}
+        woman_id = {woman: i for i, woman in enumerate(self.women)}
+        
+        # Men's lists may be shorter than n; unused slots are padded with -1
+        self.men_prefs = array('i')
+        self.men_list_length = array('i', [0]) * n
+        for m, man in enumerate(self.men):
+            row = list(map(woman_id.__getitem__, men_preferences[man]))
+            self.men_list_length[m] = len(row)
+            self.men_prefs.fromlist(row + [-1] * (n - len(row)))
+        
+        # Unranked men get rank n, i.e. worse than any ranked man
+        self.women_rank = array('i')
+        for woman in self.women:
+            row = [n] * n
+            for rank, man in enumerate(women_preferences[woman]):
+                row[man_id[man]] = rank
+            self.women_rank.fromlist(row)
+        
+        self._reversed = None
+    
+    def reversed(self):
+        """
+        The same market with the roles of men and women swapped.
+        
+        Built from the arrays on first use and cached, so women can propose
+        without the original dicts: each woman's list scatters her rank row,
+        and each man's rank row scatters his list.
+        
+        Time Complexity: O(n²) once, O(1) afterwards
+        """
+        if self._reversed is not None:
+            return self._reversed
+        
+        n = self.n
+        other = IndexedMarket.__new__(IndexedMarket)
+        other.men, other.women, other.n = self.women, self.men, n
+        other.men_prefs = array('i')
+        other.men_list_length = array('i', [0]) * n
+        other.women_rank = array('i')
+        
+        for woman in range(n):
+            row = [-1] * n
+            for man, rank in enumerate(self.women_rank[woman * n:(woman + 1) * n]):
+                if rank < n:
+                    row[rank] = man
+            other.men_list_length[woman] = n - row.count(-1)
+            other.men_prefs.fromlist(row)
+        
+        for man in range(n):
+            row = [n] * n
+            for rank, woman in enumerate(self.men_prefs[man * n:man * n + self.men_list_length[man]]):
+                row[woman] = rank
+            other.women_rank.fromlist(row)
+        
+        other._reversed = self
+        self._reversed = other
+        return other
+    
+    def to_matching(self, husband):
+        """Convert a woman id -> man id array back to a woman -> man dict"""
+        return {self.women[w]: self.men[m] for w, m in enumerate(husband) if m >= 0}
+    
+    def memory_bytes(self):
+        """Bytes used by the preference and ranking arrays"""
+        return sum(a.itemsize * len(a) for a in
+                   (self.men_prefs, self.men_list_length, self.women_rank))
+
+
+def gale_shapley_indexed(market, stats=None, proposers='men', mode='recursive'):
+    """
+    Gale-Shapley on an IndexedMarket.
+    
+    Same algorithm as gale_shapley, but all state lives in int32 arrays
+    indexed by agent id, so each proposal is a couple of array reads
+    instead of dict lookups. Every mode and order of proposals gives the
+    same proposer-optimal matching.
+    
+    Modes:
+        'recursive': a free man keeps proposing until he is engaged, and a
+            displaced man proposes next, as in McVitie and Wilson's
+            recursive formulation
+        'rounds': every free man proposes at once, then each woman keeps
+            the best of her suitors and her partner (see gale_shapley_rounds)
+    
+    Time Complexity: O(n²)
+    Space Complexity: O(n) on top of the market
+    
+    Args:
+        market: IndexedMarket
+        stats: Optional MatchStats; depths and displaced men are reported by name
+        proposers: 'men' or 'women'; women propose on market.reversed()
+        mode: 'recursive' or 'rounds'
+    
+    Returns:
+        array husband where husband[w] is the id of woman w's partner (-1 if single)
+    """
+    if proposers == 'women':
+        wife = gale_shapley_indexed(market.reversed(), stats, 'men', mode)
+        husband = array('i', [-1]) * market.n
+        for man, woman in enumerate(wife):
+            if woman >= 0:
+                husband[woman] = man
+        return husband
+    if proposers != 'men':
+        raise ValueError("proposers must be 'men' or 'women'")
+    if mode == 'rounds':
+        return gale_shapley_rounds(market, stats)[0]
+    if mode != 'recursive':
+        raise ValueError("mode must be 'recursive' or 'rounds'")
+    
+    n = market.n
+    men_prefs = market.men_prefs
+    women_rank = market.women_rank
+    list_length = market.men_list_length
+    
+    husband = array('i', [-1]) * n
+    next_choice = array('i', [0]) * n
+    free_men = list(range(n - 1, -1, -1))  # Stack: order does not change the result
+    
+    while free_men:
+        man = free_men.pop()
+        k = next_choice[man]
+        end = list_length[man]
+        row = man * n
+        
+        while k < end:
+            woman = men_prefs[row + k]
+            k += 1
+            current_man = husband[woman]
+            
+            if current_man < 0:
+                husband[woman] = man
+                break
+            if women_rank[woman * n + man] < women_rank[woman * n + current_man]:
+                husband[woman] = man
+                free_men.append(current_man)
+                if stats is not None:
+                    stats.record_swap(market.men[current_man])
+                break
+        
+        next_choice[man] = k
+    
+    if stats is not None:
+        stats.finish_run(dict(zip(market.men, next_choice)),
+                         n - husband.count(-1), sum(list_length))
+    return husband
+
+
+def gale_shapley_rounds(market, stats=None):
+    """
+    Round-based Gale-Shapley: all free men propose simultaneously.
+    
+    Each round sends every free man's next proposal, groups them by woman
+    and resolves each woman in bulk with a single min over the ranks of
+    her suitors and her current partner. The number of rounds is the
+    longest chain of rejections rather than the number of proposals, so
+    this is the mode to hand to a vectorized or parallel backend.
+    
+    Time Complexity: O(n²) proposals over at most n² rounds
+    
+    Returns:
+        (husband, rounds) with husband as in gale_shapley_indexed
+    """
+    n = market.n
+    men_prefs = market.men_prefs
+    women_rank = market.women_rank
+    list_length = market.men_list_length
+    
+    husband = array('i', [-1]) * n
+    next_choice = array('i', [0]) * n
+    free_men = list(range(n))
+    rounds = 0
+    
+    while free_men:
+        rounds += 1
+        suitors = {}  # woman -> men proposing to her this round
+        for man in free_men:
+            k = next_choice[man]
+            if k < list_length[man]:
+                next_choice[man] = k + 1
+                suitors.setdefault(men_prefs[man * n + k], []).append(man)
+        
+        free_men = []
+        for woman, men in suitors.items():
+            current_man = husband[woman]
+            if current_man >= 0:
+                men.insert(0, current_man)  # min keeps the first of equal ranks
+            if len(men) == 1:
+                husband[woman] = men[0]
+                continue
+            
+            row = woman * n
+            best = min(men, key=lambda man: women_rank[row + man])
+            husband[woman] = best
+            men.remove(best)
+            free_men.extend(men)
+            if stats is not None and current_man >= 0 and current_man != best:
+                stats.record_swap(market.men[current_man])
+    
+    if stats is not None:
+        stats.finish_run(dict(zip(market.men, next_choice)),
+                         n - husband.count(-1), sum(list_length))
+    return husband, rounds
+
+
+def iter_blocking_pairs(matching, men_preferences, women_preferences):
+    """
+    Generate the blocking pairs of a matching one at a time.
+    
+    A man can only block with a woman he ranks above his partner, so only
+    the prefix of his list before his partner is examined, and each of those
+    women answers with one lookup in her precomputed ranking. Unmatched
+    agents prefer anyone on their list to being single.
+    
+    Time Complexity: O(n²) - every preference entry is looked at most once
+    Space Complexity: O(n²) for the women's rankings
+    
+    Yields:
+        (man, woman) blocking pairs, grouped by man in men_preferences order
+    """
+    man_to_woman = {man: woman for woman, man in matching.items()}
+    
+    # Create inverse preference lists for O(1) lookup
+    women_rankings = {}
+    for woman, prefs in women_preferences.items():
+        women_rankings[woman] = {man: rank for rank, man in enumerate(prefs)}
+    
+    for man, prefs in men_preferences.items():
+        current_woman = man_to_woman.get(man)
+        
+        # Women before his partner are exactly the ones he prefers
+        for woman in prefs:
+            if woman == current_woman:
+                break
+            
+            rankings = women_rankings[woman]
+            if man not in rankings:
+                continue  # Man not in woman's preference list
+            
+            current_man = matching.get(woman)
+            if current_man is None or rankings[man] < rankings[current_man]:
+                # Both prefer each other to their partners: blocking pair!
+                yield man, woman
+
+
+def first_blocking_pair(matching, men_preferences, women_preferences):
+    """Return the first blocking pair of a matching, or None if it is stable"""
+    return next(iter_blocking_pairs(matching, men_preferences, women_preferences), None)
+
+
 def is_stable_matching(matching, men_preferences, women_preferences):
     """
     Verifies if a given matching is stable.
     
+    Time Complexity: O(n²), see iter_blocking_pairs
+    
     Args:
         matching: Dictionary mapping woman -> man
         men_preferences: Dictionary mapping man -> list of women in order of preference
@@ -80,41 +488,220 @@ def is_stable_matching(matching, men_preferences, women_preferences):
         is_stable: Boolean indicating if matching is stable
         blocking_pairs: List of blocking pairs if not stable
     """
-    # Create inverse matching (man -> woman)
-    man_to_woman = {man: woman for woman, man in matching.items()}
+    blocking_pairs = list(iter_blocking_pairs(matching, men_preferences, women_preferences))
+    return len(blocking_pairs) == 0, blocking_pairs
+
+
+def iter_blocking_pairs_indexed(market, husband):
+    """
+    iter_blocking_pairs for an IndexedMarket and a woman id -> man id array.
     
-    # Create inverse preference lists for efficient lookup
-    women_rankings = {}
-    for woman, prefs in women_preferences.items():
-        women_rankings[woman] = {man: rank for rank, man in enumerate(prefs)}
+    Uses the market's rank table directly, so nothing is rebuilt per call;
+    this is the cheap way to validate large production matchings.
+    
+    Yields:
+        (man id, woman id) blocking pairs
+    """
+    n = market.n
+    men_prefs = market.men_prefs
+    women_rank = market.women_rank
+    
+    wife = array('i', [-1]) * n
+    for woman, man in enumerate(husband):
+        if man >= 0:
+            wife[man] = woman
+    
+    for man in range(n):
+        row = man * n
+        for k in range(market.men_list_length[man]):
+            woman = men_prefs[row + k]
+            if woman == wife[man]:
+                break
+            
+            rank = women_rank[woman * n + man]
+            current_man = husband[woman]
+            if rank < n and (current_man < 0 or rank < women_rank[woman * n + current_man]):
+                yield man, woman
+
+
+def dict_preferences_bytes(preferences):
+    """Approximate bytes used by a dict of preference lists or rankings"""
+    total = sys.getsizeof(preferences)
+    for prefs in preferences.values():
+        total += sys.getsizeof(prefs)
+    return total
+
+
+def random_preferences(n, seed=0):
+    """Random complete preference lists over integer agents 0..n-1"""
+    import random
+    rng = random.Random(seed)
+    men_prefs = {}
+    women_prefs = {}
+    for i in range(n):
+        men_prefs[i] = rng.sample(range(n), n)
+        women_prefs[i] = rng.sample(range(n), n)
+    return men_prefs, women_prefs
+
+
+def benchmark_indexed_engine(sizes=(200, 500, 1000)):
+    """
+    Compare the dict-based and the array-based Gale-Shapley engines.
     
-    blocking_pairs = []
+    Building an IndexedMarket is a one-off O(n²) cost comparable to the
+    rank dicts gale_shapley builds on every call; the run column is what
+    repeated runs over the same market pay.
     
-    # Check all possible pairs (man, woman)
-    for man in men_preferences:
-        current_woman = man_to_woman[man]
-        man_rank_current = men_preferences[man].index(current_woman)
+    Pass larger sizes (e.g. 10000) to reproduce large-market numbers;
+    memory grows as n² for both engines.
+    """
+    print(f"{'n':<7} {'dict (ms)':<11} {'build (ms)':<12} {'run (ms)':<10} "
+          f"{'dict ranks (KB)':<17} {'arrays (KB)':<12} {'same':<5}")
+    print("-" * 78)
+    
+    for n in sizes:
+        men_prefs, women_prefs = random_preferences(n, seed=n)
         
-        for woman in women_preferences:
-            if woman == current_woman:
-                continue
+        start = time.perf_counter()
+        expected = gale_shapley(men_prefs, women_prefs)
+        dict_ms = (time.perf_counter() - start) * 1000
+        
+        start = time.perf_counter()
+        market = IndexedMarket(men_prefs, women_prefs)
+        build_ms = (time.perf_counter() - start) * 1000
+        
+        start = time.perf_counter()
+        husband = gale_shapley_indexed(market)
+        run_ms = (time.perf_counter() - start) * 1000
+        
+        # The dict engine builds one {man: rank} dict per woman
+        rankings = {w: {m: r for r, m in enumerate(p)} for w, p in women_prefs.items()}
+        dict_kb = dict_preferences_bytes(rankings) / 1024
+        array_kb = market.memory_bytes() / 1024
+        same = market.to_matching(husband) == expected
+        
+        print(f"{n:<7} {dict_ms:<11.1f} {build_ms:<12.1f} {run_ms:<10.1f} "
+              f"{dict_kb:<17.0f} {array_kb:<12.0f} {str(same):<5}")
+    print()
+
+
+def worst_case_preferences(n):
+    """
+    Instance forcing n(n+1)/2 proposals: everybody has the same list.
+    
+    Man i is rejected by women 0..i-1 before settling with woman i. The
+    lists are shared objects, so the instance itself only takes O(n) memory.
+    """
+    men_list = list(range(n))
+    women_list = list(range(n))
+    men_prefs = {man: men_list for man in range(n)}
+    women_prefs = {woman: women_list for woman in range(n)}
+    return men_prefs, women_prefs
+
+
+def benchmark_proposal_loop(sizes=(250, 500, 1000), indexed_sizes=(1000, 2000)):
+    """
+    Show that Gale-Shapley stays O(n²) on its worst-case input.
+    
+    The time per proposal must stay flat as n grows; with list.pop(0) it
+    grew linearly with the length of the free list. The indexed engine
+    needs 8n² bytes, so n = 20000 takes about 3.2 GB:
+        benchmark_proposal_loop(sizes=(), indexed_sizes=(5000, 10000, 20000))
+    """
+    print(f"{'engine':<10} {'n':<8} {'proposals':<12} {'time (ms)':<12} {'ns/proposal':<12}")
+    print("-" * 60)
+    
+    for engine, engine_sizes in (("dict", sizes), ("indexed", indexed_sizes)):
+        for n in engine_sizes:
+            men_prefs, women_prefs = worst_case_preferences(n)
+            proposals = n * (n + 1) // 2
             
-            # Check if man prefers this woman over his current partner
-            try:
-                man_rank_woman = men_preferences[man].index(woman)
-            except ValueError:
-                continue  # Woman not in man's preference list
+            if engine == "dict":
+                start = time.perf_counter()
+                gale_shapley(men_prefs, women_prefs)
+            else:
+                market = IndexedMarket(men_prefs, women_prefs)
+                start = time.perf_counter()
+                gale_shapley_indexed(market)
+            elapsed = time.perf_counter() - start
             
-            if man_rank_woman < man_rank_current:
-                # Man prefers woman over current partner
-                current_man = matching[woman]
-                
-                # Check if woman prefers this man over her current partner
-                if women_rankings[woman][man] < women_rankings[woman][current_man]:
-                    # This is a blocking pair!
-                    blocking_pairs.append((man, woman))
+            print(f"{engine:<10} {n:<8} {proposals:<12} {elapsed * 1000:<12.1f} "
+                  f"{elapsed * 1e9 / proposals:<12.1f}")
+    print()
+
+
+def benchmark_proposal_modes(sizes=(1000, 2000)):
+    """
+    Time both proposing sides and both proposal modes of gale_shapley_indexed.
     
-    return len(blocking_pairs) == 0, blocking_pairs
+    The reversed market is built once per market and cached, so the
+    women column only pays for the run. Rounds are the sequential steps
+    left when each round is resolved in bulk. In pure Python every round
+    still visits its proposals one by one and pays for the grouping, so
+    the rounds mode is slower than the recursive one here; it only wins
+    with a backend that resolves a whole round in one step.
+    """
+    print(f"{'input':<12} {'n':<7} {'men (ms)':<10} {'reverse (ms)':<14} {'women (ms)':<12} "
+          f"{'rounds (ms)':<13} {'rounds':<8} {'proposals':<10}")
+    print("-" * 90)
+    
+    for n in sizes:
+        for label, (men_prefs, women_prefs) in (("random", random_preferences(n, seed=n)),
+                                                ("worst case", worst_case_preferences(n))):
+            market = IndexedMarket(men_prefs, women_prefs)
+            timings = []
+            
+            start = time.perf_counter()
+            expected = gale_shapley_indexed(market)
+            timings.append(time.perf_counter() - start)
+            
+            start = time.perf_counter()
+            market.reversed()
+            timings.append(time.perf_counter() - start)
+            
+            start = time.perf_counter()
+            gale_shapley_indexed(market, proposers='women')
+            timings.append(time.perf_counter() - start)
+            
+            stats = MatchStats()
+            start = time.perf_counter()
+            husband, rounds = gale_shapley_rounds(market, stats)
+            timings.append(time.perf_counter() - start)
+            assert husband == expected
+            
+            print(f"{label:<12} {n:<7} " + " ".join(f"{t * 1000:<{w}.1f}" for t, w in
+                                                     zip(timings, (10, 14, 12, 13))) +
+                  f" {rounds:<8} {stats.proposals:<10}")
+    print()
+
+
+def benchmark_match_stats(n=1000, repeats=3):
+    """
+    Compare random and worst-case inputs through MatchStats, and time the
+    instrumented loop against stats=None.
+    """
+    print(f"{'input':<12} {'proposals':<11} {'swaps':<9} {'rejections':<11} "
+          f"{'ratio':<7} {'plain (ms)':<11} {'traced (ms)':<11}")
+    print("-" * 76)
+    
+    traces = {}
+    for label, (men_prefs, women_prefs) in (("random", random_preferences(n, seed=n)),
+                                            ("worst case", worst_case_preferences(n))):
+        timings = []
+        for stats in (None, MatchStats()):
+            best = float('inf')
+            for _ in range(repeats):
+                start = time.perf_counter()
+                gale_shapley(men_prefs, women_prefs, stats=stats)
+                best = min(best, time.perf_counter() - start)
+            timings.append(best)
+        
+        run = stats.last_run
+        traces[label] = stats
+        print(f"{label:<12} {run['proposals']:<11} {run['swaps']:<9} {run['rejections']:<11} "
+              f"{run['worst_case_ratio']:<7.3f} {timings[0] * 1000:<11.1f} {timings[1] * 1000:<11.1f}")
+    print()
+    return traces
 
 
 def print_matching(matching):
@@ -206,6 +793,64 @@ def demonstrate_gale_shapley():
     if blocking:
         print(f"Blocking pairs: {blocking}")
     print()
+    
+    # Example 4: Integer-indexed engine on larger random markets
+    print("\nExample 4: Integer-Indexed Engine")
+    print("-" * 60)
+    
+    market = IndexedMarket(men_prefs_3, women_prefs_3)
+    matching_4 = market.to_matching(gale_shapley_indexed(market))
+    print(f"Same result as gale_shapley on Example 3: {matching_4 == matching_3}")
+    print()
+    benchmark_indexed_engine()
+    
+    # Example 5: Worst-case input stays quadratic
+    print("\nExample 5: Worst-Case Proposal Count")
+    print("-" * 60)
+    benchmark_proposal_loop()
+    
+    # Example 6: Finding blocking pairs in an unstable matching
+    print("\nExample 6: Validating a Matching")
+    print("-" * 60)
+    
+    swapped = dict(matching_2)
+    swapped['X'], swapped['Z'] = swapped['Z'], swapped['X']
+    print("Example 2 with the partners of X and Z swapped:")
+    print(f"  First blocking pair: {first_blocking_pair(swapped, men_prefs_2, women_prefs_2)}")
+    print(f"  All blocking pairs: {list(iter_blocking_pairs(swapped, men_prefs_2, women_prefs_2))}")
+    
+    husband = gale_shapley_indexed(market)
+    print(f"  Indexed check of Example 4: "
+          f"{next(iter_blocking_pairs_indexed(market, husband), None) is None}")
+    
+    # Example 7: Either side proposing, one proposal or one round at a time
+    print("\nExample 7: Proposing Side and Proposal Mode")
+    print("-" * 60)
+    
+    woman_optimal = gale_shapley(men_prefs_3, women_prefs_3, proposers='women')
+    print("Woman-optimal matching of Example 3:")
+    for woman, man in sorted(woman_optimal.items()):
+        print(f"  {woman} <-> {man}")
+    for proposers in ('men', 'women'):
+        husband, = {tuple(gale_shapley_indexed(market, proposers=proposers, mode=mode))
+                    for mode in ('recursive', 'rounds')}
+        print(f"  {proposers} proposing, both modes agree: {market.to_matching(husband)}")
+    print()
+    benchmark_proposal_modes()
+    
+    # Example 8: Tracing proposals
+    print("\nExample 8: Proposal Trace")
+    print("-" * 60)
+    
+    traces = benchmark_match_stats()
+    for label, stats in traces.items():
+        print(f"Proposal depth per man ({label}):")
+        print(stats.format_histogram(bins=5))
+        print()
+    
+    stats = MatchStats()
+    gale_shapley_indexed(market, stats=stats)
+    print(f"JSON summary of Example 4: {stats.to_json()}")
 
 
 if __name__ == "__main__":
@@ -3,15 +3,213 @@ Exercise 2: Stable Matching Properties
 Demonstrates key properties of stable matchings and the Gale-Shapley algorithm
 """
 
+import json
+from bisect import bisect_right
+from collections import Counter, deque
+
+
+class RotationPoset:
+    """
+    Rotation poset of a stable matching instance (Gusfield & Irving).
+    
+    A rotation is a cyclic list of pairs (m_0, w_0), ..., (m_r-1, w_r-1) from
+    a stable matching; eliminating it moves every m_i down to w_i+1 and gives
+    a new stable matching. Every stable matching is obtained from the
+    man-optimal one by eliminating exactly the rotations of a closed subset
+    (all predecessors included) of the rotation poset, and every closed
+    subset gives a stable matching.
+    
+    All rotations are found along one maximal chain from the man-optimal to
+    the woman-optimal matching, so their indices form a topological order of
+    the poset. Assumes complete preference lists.
+    
+    Time Complexity: O(n² log n) to build, O(n²) rotations at most
+    
+    Attributes:
+        man_optimal: Dict mapping woman -> man, from gale_shapley
+        rotations: List of rotations, each a list of (man, woman) pairs
+        predecessors: predecessors[i] is the set of rotations that must be
+            eliminated before rotation i (covers the order, not transitive)
+        men_rankings, women_rankings: Dicts mapping agent -> {partner: rank}
+    """
+    
+    def __init__(self, men_preferences, women_preferences):
+        self.men_preferences = men_preferences
+        self.women_preferences = women_preferences
+        self.man_optimal = gale_shapley(men_preferences, women_preferences)
+        self.rotations = []
+        self.predecessors = []
+        
+        # Women propose to get each man's worst stable partner
+        woman_optimal_wife = gale_shapley(women_preferences, men_preferences)
+        
+        women_rankings = {}
+        for woman, prefs in women_preferences.items():
+            women_rankings[woman] = {man: rank for rank, man in enumerate(prefs)}
+        men_rankings = {}
+        for man, prefs in men_preferences.items():
+            men_rankings[man] = {woman: rank for rank, woman in enumerate(prefs)}
+        self.men_rankings = men_rankings
+        self.women_rankings = women_rankings
+        
+        husband = dict(self.man_optimal)
+        wife = {man: woman for woman, man in husband.items()}
+        # arrived_by[w] is the rotation that gave w her current partner
+        arrived_by = {woman: None for woman in husband}
+        # history[w] lists (partner rank, rotation) with improving ranks
+        history = {woman: [(-women_rankings[woman][man], None)]
+                   for woman, man in husband.items()}
+        # position[m] only moves forward: women skipped once stay worse off
+        position = {man: men_rankings[man][woman] + 1 for man, woman in wife.items()}
+        
+        def next_woman(man):
+            """First woman after man's partner who prefers him to her partner"""
+            prefs = men_preferences[man]
+            while position[man] < len(prefs):
+                woman = prefs[position[man]]
+                rankings = women_rankings[woman]
+                if rankings[man] < rankings[husband[woman]]:
+                    return woman
+                position[man] += 1
+            return None
+        
+        # Walk the "next man" graph; every cycle it closes is an exposed rotation
+        stack = []
+        on_stack = {}
+        men = list(men_preferences)
+        first_unfinished = 0  # Men before this index reached their worst partner
+        
+        while True:
+            if not stack:
+                while (first_unfinished < len(men) and
+                       wife[men[first_unfinished]] == woman_optimal_wife[men[first_unfinished]]):
+                    first_unfinished += 1
+                if first_unfinished == len(men):
+                    break
+                on_stack[men[first_unfinished]] = 0
+                stack.append(men[first_unfinished])
+            
+            man = stack[-1]
+            following = husband[next_woman(man)]
+            
+            if following not in on_stack:
+                on_stack[following] = len(stack)
+                stack.append(following)
+                continue
+            
+            cycle = stack[on_stack[following]:]
+            del stack[on_stack[following]:]
+            for m in cycle:
+                del on_stack[m]
+            
+            index = len(self.rotations)
+            rotation = [(m, wife[m]) for m in cycle]
+            self.rotations.append(rotation)
+            
+            # Type 1: the rotations that brought each man to his current woman
+            self.predecessors.append({arrived_by[w] for _, w in rotation
+                                      if arrived_by[w] is not None})
+            
+            for i, (m, _) in enumerate(rotation):
+                new_woman = rotation[(i + 1) % len(rotation)][1]
+                husband[new_woman] = m
+                wife[m] = new_woman
+                arrived_by[new_woman] = index
+                history[new_woman].append((-women_rankings[new_woman][m], index))
+                position[m] = men_rankings[m][new_woman] + 1
+        
+        # Type 2: a woman skipped by m_i must already have moved above m_i
+        for index, rotation in enumerate(self.rotations):
+            for i, (man, woman) in enumerate(rotation):
+                new_woman = rotation[(i + 1) % len(rotation)][1]
+                prefs = men_preferences[man]
+                for skipped in prefs[men_rankings[man][woman] + 1:men_rankings[man][new_woman]]:
+                    entries = history[skipped]
+                    # First partner she ranks above man (ranks are stored negated)
+                    k = bisect_right(entries, (-women_rankings[skipped][man], float('inf')))
+                    if k < len(entries) and entries[k][1] is not None:
+                        self.predecessors[index].add(entries[k][1])
+    
+    def apply(self, husband, index):
+        """Eliminate rotation index from a woman -> man dict, in place"""
+        rotation = self.rotations[index]
+        for i, (man, _) in enumerate(rotation):
+            husband[rotation[(i + 1) % len(rotation)][1]] = man
+    
+    def undo(self, husband, index):
+        """Reverse apply(husband, index)"""
+        for man, woman in self.rotations[index]:
+            husband[woman] = man
+    
+    def matching(self, eliminated):
+        """Stable matching (woman -> man) of a closed set of rotation indices"""
+        husband = dict(self.man_optimal)
+        for index in sorted(eliminated):
+            self.apply(husband, index)
+        return husband
+    
+    def _closed_sets(self, husband=None):
+        """
+        Walk every closed subset of rotations by include/exclude backtracking.
+        
+        Rotations are decided in index order (a topological order), and a
+        rotation can be included only if its predecessors were. Every leaf is
+        a distinct closed set and every branch reaches one, so the walk costs
+        O(R) per matching. If husband is given it is kept in sync.
+        
+        Yields once per closed set
+        """
+        count = len(self.rotations)
+        included = [False] * count
+        decided = 0
+        
+        while True:
+            if decided == count:
+                yield
+                # Backtrack to the last included rotation and exclude it instead
+                while decided > 0:
+                    decided -= 1
+                    if included[decided]:
+                        included[decided] = False
+                        if husband is not None:
+                            self.undo(husband, decided)
+                        decided += 1
+                        break
+                else:
+                    return
+                continue
+            
+            if all(included[p] for p in self.predecessors[decided]):
+                included[decided] = True
+                if husband is not None:
+                    self.apply(husband, decided)
+            decided += 1
+    
+    def matchings(self):
+        """
+        Generate every stable matching lazily, starting with the man-optimal.
+        
+        Yields:
+            Dict mapping woman -> man
+        """
+        husband = dict(self.man_optimal)
+        for _ in self._closed_sets(husband):
+            yield dict(husband)
+    
+    def count(self):
+        """Number of stable matchings, without building any of them"""
+        return sum(1 for _ in self._closed_sets())
+
 
 def find_all_stable_matchings(men_preferences, women_preferences):
     """
-    Finds all possible stable matchings (brute force approach).
+    Finds all stable matchings by enumerating the rotation poset.
     
-    Note: This is computationally expensive and only practical for small inputs.
-    For n men and n women, there are n! possible matchings to check.
+    Replaces the n! brute force over permutations: rotations are found from
+    the man-optimal matching, and each stable matching is produced in
+    polynomial time from a closed set of rotations (see RotationPoset).
     
-    Time Complexity: O(n! * n²) - exponential!
+    Time Complexity: O(n² log n + n² * number of stable matchings)
     
     Args:
         men_preferences: Dictionary mapping man -> list of women in order of preference
@@ -20,70 +218,150 @@ def find_all_stable_matchings(men_preferences, women_preferences):
     Returns:
         List of all stable matchings (each is a dict: woman -> man)
     """
-    from itertools import permutations
-    
-    men = list(men_preferences.keys())
-    women = list(women_preferences.keys())
-    
-    if len(men) != len(women):
+    if len(men_preferences) != len(women_preferences):
         return []
     
-    stable_matchings = []
-    
-    # Generate all possible matchings
-    # Permute men and assign each woman to a different man
-    for perm in permutations(men):
-        matching = {women[i]: perm[i] for i in range(len(women))}
-        
-        # Check if this matching is stable
-        is_stable, _ = is_stable_matching(matching, men_preferences, women_preferences)
-        if is_stable:
-            stable_matchings.append(matching)
-    
-    return stable_matchings
+    return list(RotationPoset(men_preferences, women_preferences).matchings())
 
 
 def is_stable_matching(matching, men_preferences, women_preferences):
-    """Helper function to check if a matching is stable"""
+    """
+    Helper function to check if a matching is stable.
+    
+    Stops at the first blocking pair. Only women a man ranks above his
+    partner can block with him, so the scan of his list ends at his partner
+    and the whole check is O(n²).
+    """
     man_to_woman = {man: woman for woman, man in matching.items()}
     
     women_rankings = {}
     for woman, prefs in women_preferences.items():
         women_rankings[woman] = {man: rank for rank, man in enumerate(prefs)}
     
-    for man in men_preferences:
-        current_woman = man_to_woman[man]
-        man_rank_current = men_preferences[man].index(current_woman)
+    for man, prefs in men_preferences.items():
+        current_woman = man_to_woman.get(man)
         
-        for woman in women_preferences:
+        for woman in prefs:
             if woman == current_woman:
-                continue
+                break
             
-            try:
-                man_rank_woman = men_preferences[man].index(woman)
-            except ValueError:
+            rankings = women_rankings[woman]
+            if man not in rankings:
                 continue
             
-            if man_rank_woman < man_rank_current:
-                current_man = matching[woman]
-                if women_rankings[woman][man] < women_rankings[woman][current_man]:
-                    return False, [(man, woman)]
+            current_man = matching.get(woman)
+            if current_man is None or rankings[man] < rankings[current_man]:
+                return False, [(man, woman)]
     
     return True, []
 
 
-def gale_shapley(men_preferences, women_preferences):
+class MatchStats:
+    """Proposal trace for Gale-Shapley runs (from exercise 1)"""
+    
+    def __init__(self):
+        self.runs = 0
+        self.proposals = 0
+        self.engagements = 0
+        self.swaps = 0
+        self.rejections = 0
+        self.depth = {}  # proposer -> proposals made in the last run
+        self.displaced = Counter()  # proposer -> times displaced, all runs
+        self.last_run = {}
+        self._run_swaps = 0
+    
+    def record_swap(self, displaced):
+        """Called by the matching loop when a woman trades up"""
+        self._run_swaps += 1
+        self.displaced[displaced] += 1
+    
+    def finish_run(self, depth, engagements, list_entries, proposals=None):
+        """
+        Close a run.
+        
+        Args:
+            depth: Dictionary mapping proposer -> proposals made in this run
+            engagements: Proposals accepted by a free woman (or free seat)
+            list_entries: Total length of the proposers' preference lists
+            proposals: Proposals made, if not the sum of the depths
+        """
+        if proposals is None:
+            proposals = sum(depth.values())
+        swaps = self._run_swaps
+        self._run_swaps = 0
+        
+        self.runs += 1
+        self.proposals += proposals
+        self.engagements += engagements
+        self.swaps += swaps
+        self.rejections += proposals - engagements - swaps
+        self.depth = depth
+        self.last_run = {
+            'proposals': proposals,
+            'engagements': engagements,
+            'swaps': swaps,
+            'rejections': proposals - engagements - swaps,
+            'list_entries': list_entries,
+            'worst_case_ratio': proposals / list_entries if list_entries else 0.0,
+        }
+    
+    def histogram(self, bins=10):
+        """
+        Bucket the proposal depths of the last run.
+        
+        Returns:
+            List of (low, high, count) with inclusive bounds
+        """
+        if not self.depth:
+            return []
+        top = max(self.depth.values())
+        width = max(1, -(-top // bins))  # ceil(top / bins)
+        counts = Counter((d - 1) // width if d else 0 for d in self.depth.values())
+        return [(b * width + 1, (b + 1) * width, counts[b])
+                for b in range(-(-top // width))]
+    
+    def summary(self, top=5):
+        """Totals, last-run figures and depth histogram as a plain dict"""
+        depths = self.depth.values()
+        return {
+            'runs': self.runs,
+            'proposals': self.proposals,
+            'engagements': self.engagements,
+            'swaps': self.swaps,
+            'rejections': self.rejections,
+            'last_run': dict(self.last_run,
+                             mean_depth=sum(depths) / len(depths) if depths else 0.0,
+                             max_depth=max(depths, default=0)),
+            'depth_histogram': [list(bucket) for bucket in self.histogram()],
+            'most_displaced': [[str(man), times]
+                               for man, times in self.displaced.most_common(top)],
+        }
+    
+    def to_json(self, indent=None):
+        """Serialize summary() for logs or dashboards"""
+        return json.dumps(self.summary(), indent=indent)
+    
+    def format_histogram(self, bins=10, width=40):
+        """Render the depth histogram as text bars"""
+        buckets = self.histogram(bins)
+        largest = max((count for _, _, count in buckets), default=0) or 1
+        return "\n".join(f"{low:>6}-{high:<6} {count:>7} {'#' * (count * width // largest)}"
+                         for low, high, count in buckets)
+
+
+def gale_shapley(men_preferences, women_preferences, stats=None):
     """
     Gale-Shapley algorithm for stable matching.
     
     Args:
         men_preferences: Dictionary mapping man -> list of women in order of preference
         women_preferences: Dictionary mapping woman -> list of men in order of preference
+        stats: Optional MatchStats that records this run
     
     Returns:
         Dictionary mapping woman -> man (the stable matching)
     """
-    free_men = list(men_preferences.keys())
+    free_men = deque(men_preferences.keys())
     engaged = {}
     proposals = {man: 0 for man in free_men}
     
@@ -95,7 +373,7 @@ def gale_shapley(men_preferences, women_preferences):
         man = free_men[0]
         
         if proposals[man] >= len(men_preferences[man]):
-            free_men.pop(0)
+            free_men.popleft()
             continue
         
         woman = men_preferences[man][proposals[man]]
@@ -103,17 +381,45 @@ def gale_shapley(men_preferences, women_preferences):
         
         if woman not in engaged:
             engaged[woman] = man
-            free_men.pop(0)
+            free_men.popleft()
         else:
             current_man = engaged[woman]
             if women_rankings[woman][man] < women_rankings[woman][current_man]:
                 engaged[woman] = man
-                free_men.pop(0)
+                free_men.popleft()
                 free_men.append(current_man)
+                if stats is not None:
+                    stats.record_swap(current_man)
     
+    if stats is not None:
+        stats.finish_run(proposals, len(engaged),
+                         sum(map(len, men_preferences.values())))
     return engaged
 
 
+def matching_metrics(matching, men_preferences, women_preferences):
+    """
+    Preference ranks achieved by a matching (rank 0 = first choice).
+    
+    Returns:
+        Dictionary with men_avg_rank, women_avg_rank (as in compare_matchings),
+        egalitarian_cost (sum of all ranks) and regret (worst rank of anyone)
+    """
+    men_ranks = []
+    women_ranks = []
+    for woman, man in matching.items():
+        men_ranks.append(men_preferences[man].index(woman))
+        women_ranks.append(women_preferences[woman].index(man))
+    
+    count = len(matching)
+    return {
+        'men_avg_rank': sum(men_ranks) / count if count > 0 else 0,
+        'women_avg_rank': sum(women_ranks) / count if count > 0 else 0,
+        'egalitarian_cost': sum(men_ranks) + sum(women_ranks),
+        'regret': max(men_ranks + women_ranks, default=0),
+    }
+
+
 def compare_matchings(matching1, matching2, men_preferences, women_preferences):
     """
     Compares two matchings to see which is better for men vs women.
@@ -121,35 +427,210 @@ def compare_matchings(matching1, matching2, men_preferences, women_preferences):
     Returns:
         Dictionary with comparison metrics
     """
-    def calculate_average_rank(matching, preferences, is_men=True):
-        """Calculate average preference rank in a matching"""
-        total_rank = 0
-        count = 0
-        
-        if is_men:
-            # For men: how well did they do?
-            man_to_woman = {man: woman for woman, man in matching.items()}
-            for man, woman in man_to_woman.items():
-                rank = preferences[man].index(woman)
-                total_rank += rank
-                count += 1
-        else:
-            # For women: how well did they do?
-            for woman, man in matching.items():
-                rank = preferences[woman].index(man)
-                total_rank += rank
-                count += 1
-        
-        return total_rank / count if count > 0 else 0
+    metrics1 = matching_metrics(matching1, men_preferences, women_preferences)
+    metrics2 = matching_metrics(matching2, men_preferences, women_preferences)
     
     return {
-        'men_avg_rank_1': calculate_average_rank(matching1, men_preferences, True),
-        'men_avg_rank_2': calculate_average_rank(matching2, men_preferences, True),
-        'women_avg_rank_1': calculate_average_rank(matching1, women_preferences, False),
-        'women_avg_rank_2': calculate_average_rank(matching2, women_preferences, False),
+        'men_avg_rank_1': metrics1['men_avg_rank'],
+        'men_avg_rank_2': metrics2['men_avg_rank'],
+        'women_avg_rank_1': metrics1['women_avg_rank'],
+        'women_avg_rank_2': metrics2['women_avg_rank'],
     }
 
 
+def min_weight_closed_set(weights, predecessors):
+    """
+    Closed set of rotations with minimum total weight, via a minimum cut.
+    
+    Rotations with negative weight hang off the source, positive ones lead
+    to the sink, and every precedence becomes an infinite edge from a
+    rotation to its predecessor, so a finite cut never keeps a rotation
+    without its predecessors. The source side of a minimum cut is the answer.
+    Max flow is Dinic's algorithm (BFS levels + blocking flows).
+    
+    Time Complexity: O(V² E) for V rotations and E precedence edges
+    
+    Returns:
+        Set of rotation indices
+    """
+    count = len(weights)
+    source, sink = count, count + 1
+    adjacency = [[] for _ in range(count + 2)]
+    target = []
+    capacity = []
+    
+    def add_edge(u, v, c):
+        # Edge e and its reverse e ^ 1 are stored side by side
+        adjacency[u].append(len(target))
+        target.append(v)
+        capacity.append(c)
+        adjacency[v].append(len(target))
+        target.append(u)
+        capacity.append(0)
+    
+    infinite = sum(abs(w) for w in weights) + 1
+    for i, weight in enumerate(weights):
+        if weight < 0:
+            add_edge(source, i, -weight)
+        elif weight > 0:
+            add_edge(i, sink, weight)
+        for p in predecessors[i]:
+            add_edge(i, p, infinite)
+    
+    while True:
+        # Build the level graph
+        level = [-1] * (count + 2)
+        level[source] = 0
+        queue = deque([source])
+        while queue:
+            u = queue.popleft()
+            for e in adjacency[u]:
+                if capacity[e] > 0 and level[target[e]] < 0:
+                    level[target[e]] = level[u] + 1
+                    queue.append(target[e])
+        if level[sink] < 0:
+            break
+        
+        # Push blocking flow along shortest paths (iterative DFS)
+        next_edge = [0] * (count + 2)
+        while True:
+            path = []
+            u = source
+            while u != sink:
+                while next_edge[u] < len(adjacency[u]):
+                    e = adjacency[u][next_edge[u]]
+                    if capacity[e] > 0 and level[target[e]] == level[u] + 1:
+                        break
+                    next_edge[u] += 1
+                else:
+                    # Dead end: retreat and never come back to u in this phase
+                    if u == source:
+                        break
+                    level[u] = -1
+                    u = target[path.pop() ^ 1]
+                    next_edge[u] += 1
+                    continue
+                e = adjacency[u][next_edge[u]]
+                path.append(e)
+                u = target[e]
+            if u != sink:
+                break
+            
+            flow = min(capacity[e] for e in path)
+            for e in path:
+                capacity[e] -= flow
+                capacity[e ^ 1] += flow
+    
+    # Source side of the minimum cut
+    reached = [False] * (count + 2)
+    reached[source] = True
+    stack = [source]
+    while stack:
+        u = stack.pop()
+        for e in adjacency[u]:
+            if capacity[e] > 0 and not reached[target[e]]:
+                reached[target[e]] = True
+                stack.append(target[e])
+    
+    return {i for i in range(count) if reached[i]}
+
+
+def egalitarian_stable_matching(men_preferences, women_preferences, poset=None):
+    """
+    Stable matching minimizing the sum of everybody's preference ranks.
+    
+    Eliminating a rotation changes the total rank by a fixed amount (men
+    move down their lists, women move up), so the best stable matching is
+    the closed set of rotations with minimum total change: a minimum
+    weight closure, solved as a minimum cut over the rotation poset.
+    
+    Time Complexity: O(n² log n) for the poset plus the min cut
+    
+    Returns:
+        Tuple (matching, metrics) with metrics as in matching_metrics
+    """
+    if poset is None:
+        poset = RotationPoset(men_preferences, women_preferences)
+    men_rankings = poset.men_rankings
+    women_rankings = poset.women_rankings
+    
+    weights = []
+    for rotation in poset.rotations:
+        change = 0
+        for i, (man, woman) in enumerate(rotation):
+            next_man, new_woman = rotation[(i + 1) % len(rotation)]
+            change += men_rankings[man][new_woman] - men_rankings[man][woman]
+            change += women_rankings[new_woman][man] - women_rankings[new_woman][next_man]
+        weights.append(change)
+    
+    matching = poset.matching(min_weight_closed_set(weights, poset.predecessors))
+    return matching, matching_metrics(matching, men_preferences, women_preferences)
+
+
+def minimum_regret_stable_matching(men_preferences, women_preferences, poset=None):
+    """
+    Stable matching minimizing the worst rank any agent gets (Gusfield).
+    
+    Starting from the man-optimal matching, the women with the worst rank
+    are moved up by eliminating the rotation that moves each of them and
+    everything it depends on. Each step gives the smallest closed set with a
+    better worst woman, hence the best worst man for that bound; the best
+    step overall is optimal. Men only get worse along the way.
+    
+    Time Complexity: O(n² log n) for the poset plus O(n) per step
+    
+    Returns:
+        Tuple (matching, metrics) with metrics as in matching_metrics
+    """
+    if poset is None:
+        poset = RotationPoset(men_preferences, women_preferences)
+    men_rankings = poset.men_rankings
+    women_rankings = poset.women_rankings
+    
+    # moved_by[w] lists, in elimination order, the rotations taking w's partner
+    moved_by = {woman: [] for woman in poset.man_optimal}
+    for index, rotation in enumerate(poset.rotations):
+        for _, woman in rotation:
+            moved_by[woman].append(index)
+    
+    husband = dict(poset.man_optimal)
+    eliminated = set()
+    best_regret, best_matching = None, None
+    
+    while True:
+        men_worst = max(men_rankings[m][w] for w, m in husband.items())
+        women_worst = max(women_rankings[w][m] for w, m in husband.items())
+        if best_regret is None or max(men_worst, women_worst) < best_regret:
+            best_regret, best_matching = max(men_worst, women_worst), dict(husband)
+        if women_worst <= men_worst:
+            break  # Moving women up can only make men worse from here on
+        
+        # Every worst-off woman must lose her current partner
+        needed = set()
+        stack = []
+        for woman, man in husband.items():
+            if women_rankings[woman][man] == women_worst:
+                pending = [r for r in moved_by[woman] if r not in eliminated]
+                if not pending:
+                    stack = None  # She is already at her best stable partner
+                    break
+                stack.append(pending[0])
+        if stack is None:
+            break
+        
+        while stack:
+            index = stack.pop()
+            if index not in needed and index not in eliminated:
+                needed.add(index)
+                stack.extend(poset.predecessors[index])
+        
+        for index in sorted(needed):
+            poset.apply(husband, index)
+        eliminated |= needed
+    
+    return best_matching, matching_metrics(best_matching, men_preferences, women_preferences)
+
+
 def demonstrate_properties():
     """Demonstrate key properties of stable matchings"""
     print("=" * 60)
@@ -188,15 +669,33 @@ def demonstrate_properties():
         for woman, man in sorted(matching.items()):
             print(f"  {woman} <-> {man}")
     
+    poset = RotationPoset(men_prefs, women_prefs)
+    print("\nRotations (each man moves to the next pair's woman):")
+    for i, rotation in enumerate(poset.rotations):
+        after = sorted(poset.predecessors[i])
+        print(f"  rho_{i}: {rotation}" + (f" after {after}" if after else ""))
+    if not poset.rotations:
+        print("  none - the man-optimal matching is the only stable one")
+    
+    # A larger cyclic instance: n rotations in a chain give n + 1 matchings
+    n = 12
+    cyclic_men = {f"m{i}": [f"w{(i + k) % n}" for k in range(n)] for i in range(n)}
+    cyclic_women = {f"w{i}": [f"m{(i + 1 + k) % n}" for k in range(n)] for i in range(n)}
+    print(f"\nCyclic instance with n = {n}: "
+          f"{RotationPoset(cyclic_men, cyclic_women).count()} stable matchings "
+          f"(brute force would check {n}! = 479001600 permutations)")
+    
     # Property 2: Man-optimal vs Woman-optimal
     print("\n\nProperty 2: Man-Optimal vs Woman-Optimal Matching")
     print("-" * 60)
     
     # Man-optimal: Run Gale-Shapley with men proposing
-    man_optimal = gale_shapley(men_prefs, women_prefs)
+    men_propose = MatchStats()
+    man_optimal = gale_shapley(men_prefs, women_prefs, stats=men_propose)
     
     # Woman-optimal: Run Gale-Shapley with women proposing (swap roles)
-    woman_optimal = gale_shapley(women_prefs, men_prefs)
+    women_propose = MatchStats()
+    woman_optimal = gale_shapley(women_prefs, men_prefs, stats=women_propose)
     # Swap back: woman_optimal maps men -> women, we need women -> men
     woman_optimal = {woman: man for man, woman in woman_optimal.items()}
     
@@ -208,6 +707,10 @@ def demonstrate_properties():
     for woman, man in sorted(woman_optimal.items()):
         print(f"  {woman} <-> {man}")
     
+    print(f"\nProposals: {men_propose.proposals} with men proposing "
+          f"({men_propose.swaps} swaps), {women_propose.proposals} with women proposing "
+          f"({women_propose.swaps} swaps)")
+    
     # Compare the two
     comparison = compare_matchings(man_optimal, woman_optimal, men_prefs, women_prefs)
     print("\nComparison:")
@@ -241,6 +744,42 @@ def demonstrate_properties():
         print(f"  Result: {'STABLE ✓' if is_stable else 'UNSTABLE ✗'}")
         for woman, man in sorted(matching.items()):
             print(f"    {woman} <-> {man}")
+    
+    # Property 4: Fair stable matchings
+    print("\n\nProperty 4: Egalitarian and Minimum-Regret Stable Matchings")
+    print("-" * 60)
+    
+    men_prefs = {
+        'A': ['U', 'W', 'X', 'Z', 'V', 'Y'],
+        'B': ['W', 'Y', 'U', 'Z', 'V', 'X'],
+        'C': ['X', 'Y', 'V', 'W', 'U', 'Z'],
+        'D': ['Z', 'V', 'X', 'W', 'Y', 'U'],
+        'E': ['Y', 'U', 'X', 'Z', 'V', 'W'],
+        'F': ['U', 'V', 'X', 'W', 'Z', 'Y']
+    }
+    
+    women_prefs = {
+        'U': ['E', 'D', 'C', 'A', 'B', 'F'],
+        'V': ['B', 'C', 'E', 'F', 'A', 'D'],
+        'W': ['A', 'D', 'C', 'F', 'E', 'B'],
+        'X': ['D', 'E', 'F', 'A', 'B', 'C'],
+        'Y': ['F', 'E', 'D', 'B', 'C', 'A'],
+        'Z': ['C', 'B', 'E', 'A', 'D', 'F']
+    }
+    
+    poset = RotationPoset(men_prefs, women_prefs)
+    print(f"6x6 instance: {poset.count()} stable matchings, {len(poset.rotations)} rotations")
+    
+    candidates = [
+        ('man-optimal', poset.man_optimal),
+        ('egalitarian', egalitarian_stable_matching(men_prefs, women_prefs, poset)[0]),
+        ('minimum regret', minimum_regret_stable_matching(men_prefs, women_prefs, poset)[0]),
+    ]
+    print(f"\n  {'matching':<16} {'men avg':<9} {'women avg':<11} {'total':<7} {'regret':<6}")
+    for name, matching in candidates:
+        metrics = matching_metrics(matching, men_prefs, women_prefs)
+        print(f"  {name:<16} {metrics['men_avg_rank']:<9.2f} {metrics['women_avg_rank']:<11.2f} "
+              f"{metrics['egalitarian_cost']:<7} {metrics['regret']:<6}")
 
 
 if __name__ == "__main__":
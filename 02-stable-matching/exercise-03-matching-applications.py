@@ -3,41 +3,466 @@ Exercise 3: Applications of Stable Matching
 Demonstrates real-world applications of the stable matching problem
 """
 
+import csv
+import heapq
+import json
+import mmap
+import os
+import pickle
+import random
+import tempfile
+import time
+import tracemalloc
+from array import array
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate, chain, count
+from multiprocessing import shared_memory
 
-def gale_shapley(men_preferences, women_preferences):
-    """Gale-Shapley algorithm (from exercise 1)"""
-    free_men = list(men_preferences.keys())
-    engaged = {}
-    proposals = {man: 0 for man in free_men}
+
+def flatten_ties(prefs):
+    """
+    Yield (agent, rank) for a preference list that may contain ties.
+    
+    A nested list is a group of agents ranked equally, e.g.
+    ['R1', ['R2', 'R3'], 'R4'] ranks R2 and R3 both second.
+    """
+    for rank, entry in enumerate(prefs):
+        if isinstance(entry, list):
+            for agent in entry:
+                yield agent, rank
+        else:
+            yield entry, rank
+
+
+def group_ties(agents, ranks):
+    """Inverse of flatten_ties: nest agents that share a rank"""
+    prefs = []
+    previous = None
+    for agent, rank in zip(agents, ranks):
+        if rank != previous:
+            prefs.append([agent])
+        else:
+            prefs[-1].append(agent)
+        previous = rank
+    return [group if len(group) > 1 else group[0] for group in prefs]
+
+
+class PreferenceInstance:
+    """
+    Two-sided market stored as flat integer arrays (compressed sparse rows).
+    
+    Agents are numbered 0, 1, 2, ... on each side; proposer i's list is
+    proposer_lists[proposer_offsets[i]:proposer_offsets[i + 1]] and the same
+    holds for receivers. Compared with dicts of lists of names this costs
+    4 bytes per list entry, and the arrays can be written to disk and
+    memory-mapped back without parsing (see save and load).
+    
+    Receiver lists may contain ties. Then receiver_ranks holds the rank of
+    every receiver_lists entry; otherwise it is None and the rank is the
+    position in the list.
+    
+    Attributes:
+        proposers, receivers: Agent names, indexed by agent number
+        proposer_offsets, proposer_lists: Proposer lists as CSR arrays
+        receiver_offsets, receiver_lists: Receiver lists as CSR arrays
+        capacities: Capacity of each receiver
+        receiver_ranks: Ranks aligned with receiver_lists, or None
+        settings: How a loaded cache was built (see save), otherwise None
+    """
     
-    women_rankings = {}
-    for woman, prefs in women_preferences.items():
-        women_rankings[woman] = {man: rank for rank, man in enumerate(prefs)}
+    MAGIC = b'PREFCSR2'
     
-    while free_men:
-        man = free_men[0]
+    def __init__(self, proposers, receivers, proposer_offsets, proposer_lists,
+                 receiver_offsets, receiver_lists, capacities, receiver_ranks=None):
+        self.proposers = proposers
+        self.receivers = receivers
+        self.proposer_offsets = proposer_offsets
+        self.proposer_lists = proposer_lists
+        self.receiver_offsets = receiver_offsets
+        self.receiver_lists = receiver_lists
+        self.capacities = capacities
+        self.receiver_ranks = receiver_ranks
+        self.settings = None
+        self._mapped = None
+    
+    @classmethod
+    def from_dicts(cls, proposer_preferences, receiver_preferences, capacities):
+        """Number the agents of dict-based preferences (as deferred_acceptance takes them)"""
+        proposers = list(proposer_preferences)
+        receivers = list(receiver_preferences)
+        proposer_index = dict(zip(proposers, range(len(proposers))))
+        receiver_index = dict(zip(receivers, range(len(receivers))))
+        
+        def compress(lists, index):
+            offsets = array('i', [0])
+            offsets.extend(accumulate(map(len, lists)))
+            # map() keeps the per-entry translation in C
+            entries = array('i', map(index.__getitem__, chain.from_iterable(lists)))
+            return offsets, entries
+        
+        proposer_offsets, proposer_lists = compress(proposer_preferences.values(), receiver_index)
+        try:
+            receiver_offsets, receiver_lists = compress(receiver_preferences.values(), proposer_index)
+            receiver_ranks = None
+        except TypeError:
+            # Unhashable entries: some receiver lists a tied group
+            tied = [list(flatten_ties(prefs)) for prefs in receiver_preferences.values()]
+            receiver_offsets, receiver_lists = compress(
+                [[proposer for proposer, _ in pairs] for pairs in tied], proposer_index)
+            receiver_ranks = array('i', (rank for pairs in tied for _, rank in pairs))
+        
+        return cls(proposers, receivers, proposer_offsets, proposer_lists,
+                   receiver_offsets, receiver_lists,
+                   array('i', map(capacities.__getitem__, receivers)), receiver_ranks)
+    
+    def to_dicts(self):
+        """Back to (proposer_preferences, receiver_preferences, capacities) dicts of names"""
+        def expand(names, offsets, lists, other):
+            return {name: [other[j] for j in lists[offsets[i]:offsets[i + 1]]]
+                    for i, name in enumerate(names)}
+        
+        receiver_prefs = expand(self.receivers, self.receiver_offsets, self.receiver_lists,
+                                self.proposers)
+        if self.receiver_ranks is not None:
+            for i, receiver in enumerate(self.receivers):
+                ranks = self.receiver_ranks[self.receiver_offsets[i]:self.receiver_offsets[i + 1]]
+                receiver_prefs[receiver] = group_ties(receiver_prefs[receiver], ranks)
+        
+        return (expand(self.proposers, self.proposer_offsets, self.proposer_lists, self.receivers),
+                receiver_prefs, dict(zip(self.receivers, self.capacities)))
+    
+    def save(self, path, settings=None):
+        """
+        Write the instance as a binary cache file.
+        
+        Layout: magic, seven int32 sizes, the six arrays (receiver_ranks is
+        empty for strict lists), then the agent names and settings as JSON.
+        Arrays are stored in native byte order, so the file is meant for
+        repeat runs on the same machine, not for exchange.
+        
+        The file is written next to path and then renamed over it, so
+        instances still mapped from an older version keep their contents.
+        
+        Args:
+            settings: Optional JSON value describing how the instance was
+                built, returned by load as the settings attribute
+        """
+        arrays = [self.proposer_offsets, self.proposer_lists, self.receiver_offsets,
+                  self.receiver_lists, self.capacities,
+                  self.receiver_ranks if self.receiver_ranks is not None else ()]
+        names = json.dumps([list(self.proposers), list(self.receivers), settings]).encode('utf-8')
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+        try:
+            with open(descriptor, 'wb') as handle:
+                handle.write(self.MAGIC)
+                handle.write(array('i', [len(values) for values in arrays] + [len(names)]).tobytes())
+                for values in arrays:
+                    handle.write(array('i', values).tobytes())
+                handle.write(names)
+            os.replace(temporary, path)
+        except BaseException:
+            os.remove(temporary)
+            raise
+    
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-map a file written by save.
+        
+        The integer arrays are views into the mapped file, so loading costs
+        no parsing and pages are only read when the solver touches them.
+        The settings given to save are in the settings attribute. Call
+        close (or use the instance as a context manager) to unmap the file.
+        """
+        with open(path, 'rb') as handle:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        if mapped[:len(cls.MAGIC)] != cls.MAGIC:
+            mapped.close()
+            raise ValueError(f"{path} is not a preference cache file")
         
-        if proposals[man] >= len(men_preferences[man]):
-            free_men.pop(0)
+        data = memoryview(mapped)
+        position = len(cls.MAGIC)
+        with data[position:position + 28].cast('i') as view:
+            sizes = view.tolist()
+        position += 28
+        
+        arrays = []
+        for size in sizes[:6]:
+            arrays.append(data[position:position + 4 * size].cast('i'))
+            position += 4 * size
+        # Files written before settings were stored hold only the names
+        proposers, receivers, *settings = json.loads(bytes(data[position:position + sizes[6]]))
+        if not sizes[5]:
+            arrays[5] = None
+        instance = cls(proposers, receivers, *arrays)
+        instance.settings = settings[0] if settings else None
+        instance._mapped = mapped
+        data.release()
+        return instance
+    
+    def close(self):
+        """Release the views and unmap the file; does nothing unless loaded"""
+        if self._mapped is None:
+            return
+        for view in (self.proposer_offsets, self.proposer_lists, self.receiver_offsets,
+                     self.receiver_lists, self.capacities, self.receiver_ranks):
+            if view is not None:
+                view.release()
+        self._mapped.close()
+        self._mapped = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MatchStats:
+    """Proposal trace for Gale-Shapley runs (from exercise 1)"""
+    
+    def __init__(self):
+        self.runs = 0
+        self.proposals = 0
+        self.engagements = 0
+        self.swaps = 0
+        self.rejections = 0
+        self.depth = {}  # proposer -> proposals made in the last run
+        self.displaced = Counter()  # proposer -> times displaced, all runs
+        self.last_run = {}
+        self._run_swaps = 0
+    
+    def record_swap(self, displaced):
+        """Called by the matching loop when a woman trades up"""
+        self._run_swaps += 1
+        self.displaced[displaced] += 1
+    
+    def finish_run(self, depth, engagements, list_entries, proposals=None):
+        """
+        Close a run.
+        
+        Args:
+            depth: Dictionary mapping proposer -> proposals made in this run
+            engagements: Proposals accepted by a free woman (or free seat)
+            list_entries: Total length of the proposers' preference lists
+            proposals: Proposals made, if not the sum of the depths
+        """
+        if proposals is None:
+            proposals = sum(depth.values())
+        swaps = self._run_swaps
+        self._run_swaps = 0
+        
+        self.runs += 1
+        self.proposals += proposals
+        self.engagements += engagements
+        self.swaps += swaps
+        self.rejections += proposals - engagements - swaps
+        self.depth = depth
+        self.last_run = {
+            'proposals': proposals,
+            'engagements': engagements,
+            'swaps': swaps,
+            'rejections': proposals - engagements - swaps,
+            'list_entries': list_entries,
+            'worst_case_ratio': proposals / list_entries if list_entries else 0.0,
+        }
+    
+    def histogram(self, bins=10):
+        """
+        Bucket the proposal depths of the last run.
+        
+        Returns:
+            List of (low, high, count) with inclusive bounds
+        """
+        if not self.depth:
+            return []
+        top = max(self.depth.values())
+        width = max(1, -(-top // bins))  # ceil(top / bins)
+        counts = Counter((d - 1) // width if d else 0 for d in self.depth.values())
+        return [(b * width + 1, (b + 1) * width, counts[b])
+                for b in range(-(-top // width))]
+    
+    def summary(self, top=5):
+        """Totals, last-run figures and depth histogram as a plain dict"""
+        depths = self.depth.values()
+        return {
+            'runs': self.runs,
+            'proposals': self.proposals,
+            'engagements': self.engagements,
+            'swaps': self.swaps,
+            'rejections': self.rejections,
+            'last_run': dict(self.last_run,
+                             mean_depth=sum(depths) / len(depths) if depths else 0.0,
+                             max_depth=max(depths, default=0)),
+            'depth_histogram': [list(bucket) for bucket in self.histogram()],
+            'most_displaced': [[str(man), times]
+                               for man, times in self.displaced.most_common(top)],
+        }
+    
+    def to_json(self, indent=None):
+        """Serialize summary() for logs or dashboards"""
+        return json.dumps(self.summary(), indent=indent)
+    
+    def format_histogram(self, bins=10, width=40):
+        """Render the depth histogram as text bars"""
+        buckets = self.histogram(bins)
+        largest = max((count for _, _, count in buckets), default=0) or 1
+        return "\n".join(f"{low:>6}-{high:<6} {count:>7} {'#' * (count * width // largest)}"
+                         for low, high, count in buckets)
+
+
+def propose_until_stable(proposers, receivers, proposer_lists, receiver_rankings, capacities,
+                         stats=None):
+    """
+    Proposal loop shared by deferred_acceptance and deferred_acceptance_indexed.
+    
+    Free proposers wait in a deque, so taking the next one is O(1). Each
+    receiver keeps its accepted proposers in a max-heap keyed by its own
+    ranking, so finding and evicting the worst one costs O(log c) for a
+    receiver of capacity c instead of a linear scan. A proposer the
+    receiver did not rank is rejected. Among proposers a receiver ranks
+    equally, the one that arrived last is evicted first.
+    
+    The containers are only indexed, so they can be dicts keyed by name or
+    lists indexed by agent number.
+    
+    Time Complexity: O(L log c) where L is the total preference list length
+    
+    Args:
+        proposers, receivers: Iterables of the agents on each side
+        proposer_lists: proposer -> list of receivers in order of preference
+        receiver_rankings: receiver -> dict mapping proposer -> rank
+        capacities: receiver -> number of proposers it accepts
+        stats: Optional MatchStats; an evicted proposer counts as a swap
+    
+    Returns:
+        Dict mapping receiver -> heap of (-rank, -arrival, proposer) it accepted
+    """
+    free_proposers = deque(proposers)
+    # accepted[receiver] is a heap of (-rank, -arrival, proposer): the worst
+    # is at [0], and proposers themselves are never compared
+    accepted = {receiver: [] for receiver in receivers}
+    proposals = {proposer: 0 for proposer in free_proposers}
+    arrivals = count()
+    
+    while free_proposers:
+        proposer = free_proposers[0]
+        
+        if proposals[proposer] >= len(proposer_lists[proposer]):
+            free_proposers.popleft()
             continue
         
-        woman = men_preferences[man][proposals[man]]
-        proposals[man] += 1
+        receiver = proposer_lists[proposer][proposals[proposer]]
+        proposals[proposer] += 1
         
-        if woman not in engaged:
-            engaged[woman] = man
-            free_men.pop(0)
-        else:
-            current_man = engaged[woman]
-            if women_rankings[woman][man] < women_rankings[woman][current_man]:
-                engaged[woman] = man
-                free_men.pop(0)
-                free_men.append(current_man)
+        rank = receiver_rankings[receiver].get(proposer)
+        if rank is None:
+            continue
+        slots = accepted[receiver]
+        
+        if len(slots) < capacities[receiver]:
+            # Receiver has capacity, accept proposer
+            heapq.heappush(slots, (-rank, -next(arrivals), proposer))
+            free_proposers.popleft()
+        elif slots and rank < -slots[0][0]:
+            # Receiver is full but prefers the new proposer to its worst one
+            _, _, worst_proposer = heapq.heapreplace(slots, (-rank, -next(arrivals), proposer))
+            free_proposers.popleft()
+            free_proposers.append(worst_proposer)
+            if stats is not None:
+                stats.record_swap(worst_proposer)
+        # Else: receiver prefers current assignment, proposer remains free
+    
+    if stats is not None:
+        # Seats never free up again, so every filled seat was one engagement
+        stats.finish_run(proposals, sum(map(len, accepted.values())),
+                         sum(len(proposer_lists[proposer]) for proposer in proposals))
+    return accepted
+
+
+def deferred_acceptance(proposer_preferences, receiver_preferences, capacities, stats=None):
+    """
+    Deferred acceptance on dicts of names (gale_shapley, hospital_resident_matching).
+    
+    Lists may be incomplete: a receiver rejects every proposer it did not
+    rank, and one without a list rejects everybody. Receiver lists may
+    contain ties (see flatten_ties); a full receiver only replaces its worst
+    proposer by a strictly better one, so the result is weakly stable.
+    
+    Args:
+        proposer_preferences: Dict mapping proposer -> list of receivers
+        receiver_preferences: Dict mapping receiver -> list of proposers
+        capacities: Dict mapping receiver -> number of proposers it accepts
+        stats: Optional MatchStats that records this run
+    
+    Returns:
+        Dict mapping receiver -> list of accepted proposers (best first)
+    """
+    # Create inverse preference lists; they only hold ranked proposers, so
+    # their size is the number of applications, not proposers x receivers
+    receiver_rankings = defaultdict(dict)
+    for receiver, prefs in receiver_preferences.items():
+        try:
+            receiver_rankings[receiver] = {proposer: rank for rank, proposer in enumerate(prefs)}
+        except TypeError:
+            # Unhashable entry: the list has a tied group
+            receiver_rankings[receiver] = dict(flatten_ties(prefs))
     
-    return engaged
+    accepted = propose_until_stable(proposer_preferences, receiver_preferences,
+                                    proposer_preferences, receiver_rankings, capacities, stats)
+    return {receiver: [proposer for _, _, proposer in sorted(slots, reverse=True)]
+            for receiver, slots in accepted.items()}
+
+
+def deferred_acceptance_indexed(instance, stats=None):
+    """
+    Deferred acceptance on a PreferenceInstance, without any names.
+    
+    Args:
+        instance: PreferenceInstance
+        stats: Optional MatchStats; depths are keyed by proposer number
+    
+    Returns:
+        List indexed by receiver number of accepted proposer numbers (best first)
+    """
+    proposer_offsets = instance.proposer_offsets
+    receiver_offsets = instance.receiver_offsets
+    num_proposers = len(proposer_offsets) - 1
+    num_receivers = len(receiver_offsets) - 1
+    
+    # Python lists index faster than arrays or memory-mapped views
+    proposer_lists = [instance.proposer_lists[proposer_offsets[i]:proposer_offsets[i + 1]].tolist()
+                      for i in range(num_proposers)]
+    ranks = instance.receiver_ranks
+    receiver_rankings = []
+    for receiver in range(num_receivers):
+        start, end = receiver_offsets[receiver], receiver_offsets[receiver + 1]
+        receiver_rankings.append(dict(zip(instance.receiver_lists[start:end],
+                                          range(end - start) if ranks is None else ranks[start:end])))
+    
+    accepted = propose_until_stable(range(num_proposers), range(num_receivers), proposer_lists,
+                                    receiver_rankings, instance.capacities.tolist(), stats)
+    return [[proposer for _, _, proposer in sorted(slots, reverse=True)]
+            for slots in accepted.values()]
+
+
+def match_instance(instance, stats=None):
+    """Run deferred_acceptance_indexed and translate the result back to names"""
+    proposers = instance.proposers
+    return {receiver: [proposers[i] for i in accepted] for receiver, accepted
+            in zip(instance.receivers, deferred_acceptance_indexed(instance, stats))}
+
+
+def gale_shapley(men_preferences, women_preferences, stats=None):
+    """Gale-Shapley algorithm (from exercise 1), as deferred acceptance with capacity 1"""
+    capacities = {woman: 1 for woman in women_preferences}
+    assignments = deferred_acceptance(men_preferences, women_preferences, capacities, stats)
+    return {woman: men[0] for woman, men in assignments.items() if men}
 
 
-def hospital_resident_matching(residents, hospitals, hospital_capacities):
+def hospital_resident_matching(residents, hospitals, hospital_capacities, stats=None):
     """
     Hospital-Resident Matching Problem (many-to-one matching).
     
@@ -45,80 +470,634 @@ def hospital_resident_matching(residents, hospitals, hospital_capacities):
     - Each hospital can accept multiple residents
     - Each resident can only go to one hospital
     
+    Lists may be incomplete: residents list only the hospitals they apply
+    to and hospitals rank only their applicants. A hospital may rank a band
+    of residents equally by giving a nested list; the matching is then
+    weakly stable (no resident and hospital both strictly prefer each other).
+    
     Args:
         residents: Dict mapping resident -> list of hospitals (preferences)
-        hospitals: Dict mapping hospital -> list of residents (preferences)
+        hospitals: Dict mapping hospital -> list of residents (preferences,
+            nested lists for ties)
         hospital_capacities: Dict mapping hospital -> capacity (int)
+        stats: Optional MatchStats that records this run
     
     Returns:
-        Dict mapping hospital -> list of residents
+        Dict mapping hospital -> list of residents (in the hospital's order)
+    """
+    return deferred_acceptance(residents, hospitals, hospital_capacities, stats)
+
+
+def student_school_matching(students, schools, school_capacities, stats=None):
     """
-    # Initialize
-    free_residents = list(residents.keys())
-    assignments = {hospital: [] for hospital in hospitals.keys()}
-    proposals = {resident: 0 for resident in free_residents}
+    Student-School Matching Problem.
+    Similar to hospital-resident matching.
     
-    # Create inverse preference lists
-    hospital_rankings = {}
-    for hospital, prefs in hospitals.items():
-        hospital_rankings[hospital] = {resident: rank for rank, resident in enumerate(prefs)}
+    Args:
+        students: Dict mapping student -> list of schools (preferences)
+        schools: Dict mapping school -> list of students (preferences)
+        school_capacities: Dict mapping school -> capacity
+        stats: Optional MatchStats that records this run
+    
+    Returns:
+        Dict mapping school -> list of students
+    """
+    return hospital_resident_matching(students, schools, school_capacities, stats)
+
+
+class Numbering(dict):
+    """Dict that gives every new key the next number: 0, 1, 2, ..."""
+    
+    def __missing__(self, key):
+        number = self[key] = len(self)
+        return number
+
+
+def read_preference_rows(path):
+    """
+    Stream (agent, choices, capacity) rows from a preference export.
+    
+    Two formats are read, chosen by file extension:
+    - .jsonl: one {"agent": ..., "preferences": [...], "capacity": c}
+      object per line ("capacity" is optional)
+    - .csv: one "agent,first choice,second choice,..." row per agent
+      (capacity is None)
+    
+    Only one row is held in memory at a time.
+    """
+    with open(path, newline='', encoding='utf-8') as handle:
+        if path.endswith('.jsonl'):
+            for line in handle:
+                if line.strip():
+                    record = json.loads(line)
+                    yield record['agent'], record['preferences'], record.get('capacity')
+        else:
+            for row in csv.reader(handle):
+                if row and row[0]:
+                    yield row[0], [choice for choice in row[1:] if choice], None
+
+
+def load_preferences(proposer_path, receiver_path, capacities=None, default_capacity=1,
+                     complete=False, cache_path=None):
+    """
+    Stream two preference exports into a PreferenceInstance.
     
-    while free_residents:
-        resident = free_residents[0]
+    Names are numbered as they are first seen and every list goes straight
+    into the integer arrays, so no dict of lists of names is ever built.
+    The lists are validated in the same pass: an agent may not have two
+    rows, a list may not repeat an agent, receivers may only rank known
+    proposers, and every receiver a proposer ranks must have a row. Lists
+    may be incomplete, and JSONL receiver lists may contain ties as nested
+    lists (see flatten_ties).
+    
+    Args:
+        proposer_path, receiver_path: .csv or .jsonl files (see
+            read_preference_rows)
+        capacities: Optional dict receiver -> capacity, overriding the file
+        default_capacity: Capacity of receivers given no capacity elsewhere
+        complete: Also require every list to rank the whole other side, as
+            one-to-one markets with complete lists do
+        cache_path: Optional binary cache (see PreferenceInstance.save). It
+            is memory-mapped instead of parsing when it is newer than both
+            exports and was written with the same capacities,
+            default_capacity and complete; otherwise the exports are parsed
+            and the cache rewritten.
+    
+    Returns:
+        PreferenceInstance
+    
+    Raises:
+        ValueError: If a list fails validation
+    """
+    capacities = capacities or {}
+    # Round-tripped through JSON so it compares equal to what load returns
+    settings = json.loads(json.dumps({
+        'capacities': sorted(map(list, capacities.items()), key=json.dumps),
+        'default_capacity': default_capacity,
+        'complete': complete,
+    }))
+    if cache_path is not None and os.path.exists(cache_path):
+        cache_time = os.path.getmtime(cache_path)
+        if cache_time >= max(os.path.getmtime(proposer_path), os.path.getmtime(receiver_path)):
+            cached = PreferenceInstance.load(cache_path)
+            if cached.settings == settings:
+                return cached
+            cached.close()
+    
+    proposer_index = {}
+    receiver_index = Numbering()
+    
+    # Proposers: receivers get their numbers as they are first ranked
+    proposer_offsets = array('i', [0])
+    proposer_lists = array('i')
+    for agent, choices, _ in read_preference_rows(proposer_path):
+        if agent in proposer_index:
+            raise ValueError(f"{proposer_path}: {agent!r} has two rows")
+        proposer_index[agent] = len(proposer_index)
+        try:
+            repeated = len(set(choices)) != len(choices)
+        except TypeError:
+            raise ValueError(f"{proposer_path}: {agent!r} has a tie; only receivers may "
+                             f"rank agents equally") from None
+        if repeated:
+            raise ValueError(f"{proposer_path}: list of {agent!r} names an agent twice")
+        # map() keeps the per-entry numbering in C
+        proposer_lists.extend(map(receiver_index.__getitem__, choices))
+        proposer_offsets.append(len(proposer_lists))
+    
+    # Receivers: rows may come in any order, so they are stored as read and
+    # put in receiver order afterwards
+    row_offsets = array('i', [0])
+    row_lists = array('i')
+    # Ranks are only kept once some list has a tie
+    row_ranks = None
+    row_of = {}
+    receiver_capacities = {}
+    for agent, choices, capacity in read_preference_rows(receiver_path):
+        receiver = receiver_index[agent]
+        if receiver in row_of:
+            raise ValueError(f"{receiver_path}: {agent!r} has two rows")
+        row_of[receiver] = len(row_of)
+        receiver_capacities[receiver] = capacities.get(
+            agent, default_capacity if capacity is None else capacity)
         
-        if proposals[resident] >= len(residents[resident]):
-            free_residents.pop(0)
-            continue
+        try:
+            distinct = len(set(choices))
+            ranks = range(len(choices))
+        except TypeError:
+            # Unhashable entries: the list has a tied group
+            pairs = list(flatten_ties(choices))
+            choices = [proposer for proposer, _ in pairs]
+            ranks = [rank for _, rank in pairs]
+            distinct = len(set(choices))
+            if row_ranks is None:
+                row_ranks = array('i')
+                for row in range(len(row_offsets) - 1):
+                    row_ranks.extend(range(row_offsets[row + 1] - row_offsets[row]))
+        if row_ranks is not None:
+            row_ranks.extend(ranks)
         
-        hospital = residents[resident][proposals[resident]]
-        proposals[resident] += 1
+        if distinct != len(choices):
+            raise ValueError(f"{receiver_path}: list of {agent!r} names an agent twice")
+        try:
+            row_lists.extend(map(proposer_index.__getitem__, choices))
+        except KeyError as error:
+            raise ValueError(f"{receiver_path}: {agent!r} ranks unknown proposer {error}") from None
+        row_offsets.append(len(row_lists))
+    
+    receivers = list(receiver_index)
+    missing = [receivers[receiver] for receiver in range(len(receivers)) if receiver not in row_of]
+    if missing:
+        raise ValueError(f"{receiver_path}: no list for {missing[:5]} (ranked by proposers)")
+    
+    receiver_offsets = array('i', [0])
+    receiver_lists = array('i')
+    receiver_ranks = array('i') if row_ranks is not None else None
+    for receiver in range(len(receivers)):
+        row = row_of[receiver]
+        start, end = row_offsets[row], row_offsets[row + 1]
+        receiver_lists.extend(row_lists[start:end])
+        if receiver_ranks is not None:
+            receiver_ranks.extend(row_ranks[start:end])
+        receiver_offsets.append(len(receiver_lists))
+    
+    instance = PreferenceInstance(list(proposer_index), receivers, proposer_offsets,
+                                  proposer_lists, receiver_offsets, receiver_lists,
+                                  array('i', (receiver_capacities[r] for r in range(len(receivers)))),
+                                  receiver_ranks)
+    
+    if complete:
+        for names, offsets, other, path in (
+                (instance.proposers, proposer_offsets, len(receivers), proposer_path),
+                (receivers, receiver_offsets, len(proposer_index), receiver_path)):
+            for i, name in enumerate(names):
+                if offsets[i + 1] - offsets[i] != other:
+                    raise ValueError(f"{path}: list of {name!r} ranks {offsets[i + 1] - offsets[i]} "
+                                     f"of {other} agents")
+    
+    if cache_path is not None:
+        instance.save(cache_path, settings)
+    return instance
+
+
+def write_preference_exports(directory, num_residents, num_hospitals, list_length=10, seed=0):
+    """Write synthetic_residency_market as resident CSV and hospital JSONL exports"""
+    residents, hospital_prefs, capacities = synthetic_residency_market(
+        num_residents, num_hospitals, list_length, seed)
+    resident_path = os.path.join(directory, 'residents.csv')
+    hospital_path = os.path.join(directory, 'hospitals.jsonl')
+    
+    with open(resident_path, 'w', newline='', encoding='utf-8') as handle:
+        writer = csv.writer(handle)
+        for resident, prefs in residents.items():
+            writer.writerow([resident] + prefs)
+    with open(hospital_path, 'w', encoding='utf-8') as handle:
+        for hospital, prefs in hospital_prefs.items():
+            record = {'agent': hospital, 'preferences': prefs, 'capacity': capacities[hospital]}
+            handle.write(json.dumps(record) + '\n')
+    
+    return resident_path, hospital_path
+
+
+def benchmark_preference_loading(num_residents=20000, num_hospitals=100):
+    """
+    Compare building dicts from the exports with the streaming loader and its cache.
+    
+    The dict route is what callers did before: read every row into dicts of
+    lists of names, then match. The loader spends a little longer numbering
+    and validating, but keeps 4 bytes per list entry instead of a list of
+    name references, and the cache skips parsing altogether. Memory is the
+    peak traced while loading (measured in a separate run).
+    """
+    def load_dicts(resident_path, hospital_path):
+        residents = {agent: choices for agent, choices, _ in read_preference_rows(resident_path)}
+        hospitals = {}
+        capacities = {}
+        for agent, choices, capacity in read_preference_rows(hospital_path):
+            hospitals[agent] = choices
+            capacities[agent] = capacity
+        return residents, hospitals, capacities
+    
+    with tempfile.TemporaryDirectory() as directory:
+        resident_path, hospital_path = write_preference_exports(
+            directory, num_residents, num_hospitals)
+        cache_path = os.path.join(directory, 'market.bin')
+        load_preferences(resident_path, hospital_path, cache_path=cache_path)
         
-        current_assignment = assignments[hospital]
+        routes = [
+            ('dicts', lambda: load_dicts(resident_path, hospital_path),
+             lambda market: hospital_resident_matching(*market)),
+            ('loader', lambda: load_preferences(resident_path, hospital_path), match_instance),
+            ('cached', lambda: load_preferences(resident_path, hospital_path, cache_path=cache_path),
+             match_instance),
+        ]
         
-        if len(current_assignment) < hospital_capacities[hospital]:
-            # Hospital has capacity, assign resident
-            assignments[hospital].append(resident)
-            free_residents.pop(0)
-        else:
-            # Hospital is full, check if resident is better than worst current resident
-            # Find worst resident at this hospital
-            worst_resident = None
-            worst_rank = -1
+        print(f"{num_residents} residents, {num_hospitals} hospitals")
+        print(f"{'route':<10} {'load (ms)':<11} {'peak (MB)':<11} {'match (ms)':<12} {'same'}")
+        print("-" * 60)
+        expected = None
+        for name, load, match in routes:
+            tracemalloc.start()
+            load()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
             
-            for r in current_assignment:
-                rank = hospital_rankings[hospital][r]
-                if rank > worst_rank:
-                    worst_rank = rank
-                    worst_resident = r
+            start = time.perf_counter()
+            market = load()
+            loaded = time.perf_counter()
+            assignments = match(market)
+            matched = time.perf_counter()
+            expected = expected or assignments
             
-            # Compare with new resident
-            new_rank = hospital_rankings[hospital][resident]
+            print(f"{name:<10} {(loaded - start) * 1000:<11.1f} {peak / 2**20:<11.1f} "
+                  f"{(matched - loaded) * 1000:<12.1f} {assignments == expected}")
+            del market
+
+
+def encode_instances(instances):
+    """
+    Pack matching instances into one flat int32 array.
+    
+    Each instance becomes a record of agent indices instead of a pickled
+    dict of names, which is what crosses to the worker processes:
+        
+        [num_proposers, num_receivers, capacity of each receiver,
+         proposer offsets, proposer lists, receiver offsets, receiver lists]
+    
+    The record holds the CSR arrays of a PreferenceInstance as they are,
+    so a PreferenceInstance is encoded by copying its arrays. Instances
+    given as dicts of names, or as lists of index lists, are translated
+    entry by entry first, which costs about as much as solving them.
+    
+    Args:
+        instances: Iterable of PreferenceInstance objects with strict
+            lists, or of (proposer_preferences, receiver_preferences,
+            capacities) tuples as taken by deferred_acceptance, or the same
+            with lists indexed by agent number instead of dicts
+    
+    Returns:
+        (buffer, offsets, names) where offsets[i] is the start of record i
+        and names[i] is its (proposers, receivers) sequences, or None when
+        the instance was given as index lists
+    
+    Raises:
+        ValueError: If a PreferenceInstance has ties
+    """
+    values = array('i')
+    offsets = []
+    names = []
+    
+    for instance in instances:
+        offsets.append(len(values))
+        if isinstance(instance, PreferenceInstance):
+            if instance.receiver_ranks is not None:
+                raise ValueError("encoded instances must have strict lists")
+            names.append((instance.proposers, instance.receivers))
+            values.append(len(instance.proposers))
+            values.append(len(instance.receivers))
+            for part in (instance.capacities, instance.proposer_offsets, instance.proposer_lists,
+                         instance.receiver_offsets, instance.receiver_lists):
+                values.extend(part)
+            continue
+        
+        proposer_prefs, receiver_prefs, capacities = instance
+        values.append(len(proposer_prefs))
+        values.append(len(receiver_prefs))
+        if isinstance(proposer_prefs, dict):
+            proposers = list(proposer_prefs)
+            receivers = list(receiver_prefs)
+            proposer_index = dict(zip(proposers, range(len(proposers))))
+            receiver_index = dict(zip(receivers, range(len(receivers))))
+            names.append((proposers, receivers))
             
-            if new_rank < worst_rank:
-                # New resident is better, replace worst
-                assignments[hospital].remove(worst_resident)
-                assignments[hospital].append(resident)
-                free_residents.pop(0)
-                free_residents.append(worst_resident)
-            # Else: hospital prefers current residents, resident remains free
+            # map() keeps the per-entry translation in C
+            values.extend(map(capacities.__getitem__, receivers))
+            values.append(0)
+            values.extend(accumulate(map(len, proposer_prefs.values())))
+            values.extend(map(receiver_index.__getitem__, chain.from_iterable(proposer_prefs.values())))
+            values.append(0)
+            values.extend(accumulate(map(len, receiver_prefs.values())))
+            values.extend(map(proposer_index.__getitem__, chain.from_iterable(receiver_prefs.values())))
+        else:
+            names.append(None)
+            values.extend(capacities)
+            for lists in (proposer_prefs, receiver_prefs):
+                values.append(0)
+                values.extend(accumulate(map(len, lists)))
+                values.extend(chain.from_iterable(lists))
     
-    return assignments
+    return values, offsets, names
 
 
-def student_school_matching(students, schools, school_capacities):
+def decode_instance(data, offset):
+    """View one encoded record as a PreferenceInstance with agents numbered 0, 1, 2, ..."""
+    num_proposers, num_receivers = data[offset], data[offset + 1]
+    offset += 2
+    capacities = data[offset:offset + num_receivers]
+    offset += num_receivers
+    
+    arrays = []
+    for count in (num_proposers, num_receivers):
+        offsets = data[offset:offset + count + 1]
+        offset += count + 1
+        arrays.append(offsets)
+        arrays.append(data[offset:offset + offsets[-1]])
+        offset += offsets[-1]
+    
+    return PreferenceInstance(range(num_proposers), range(num_receivers), *arrays, capacities)
+
+
+def _match_records(data, offsets):
     """
-    Student-School Matching Problem.
-    Similar to hospital-resident matching.
+    Solve encoded records.
+    
+    Returns:
+        array('i') holding, per instance and per receiver, the number of
+        accepted proposers followed by their indices (best first)
+    """
+    results = array('i')
+    for offset in offsets:
+        for accepted in deferred_acceptance_indexed(decode_instance(data, offset)):
+            results.append(len(accepted))
+            results.extend(accepted)
+    return results
+
+
+def _match_encoded_chunk(block_name, offsets):
+    """Worker side of batch_matching for a chunk encoded into a shared block"""
+    block = shared_memory.SharedMemory(name=block_name)
+    data = block.buf.cast('i')
+    try:
+        return _match_records(data, offsets)
+    finally:
+        data.release()
+        block.close()
+
+
+def _match_chunk(chunk):
+    """Worker side of batch_matching for a pickled chunk, encoded here"""
+    buffer, offsets, _ = encode_instances(chunk)
+    return _match_records(buffer, offsets)
+
+
+def batch_matching(instances, max_workers=None, chunk_size=64):
+    """
+    Solve many independent matching instances on a pool of processes.
+    
+    Instances are taken lazily from the iterable and grouped in chunks.
+    A chunk of PreferenceInstance objects is copied array by array into a
+    shared memory block (see encode_instances) that the worker reads in
+    place, and only a block name and record offsets are pickled; that is
+    the input to use when throughput matters, since the parent's work per
+    instance is a few buffer copies. Other chunks are pickled as they are
+    and translated to indices inside the workers. A bounded number of
+    chunks is in flight, so the input can be a generator of any length,
+    and results come back in input order as soon as they are ready. Runs
+    in the workers are not traced; to look at one instance, pass stats to
+    match_instance instead.
     
     Args:
-        students: Dict mapping student -> list of schools (preferences)
-        schools: Dict mapping school -> list of students (preferences)
-        school_capacities: Dict mapping school -> capacity
+        instances: Iterable of PreferenceInstance objects or of
+            (proposer_preferences, receiver_preferences, capacities)
+            tuples, all with strict lists; use capacity 1 for one-to-one
+            markets
+        max_workers: Number of worker processes (default: CPU count)
+        chunk_size: Instances per task; larger chunks amortize the
+            inter-process round trip for small markets
     
-    Returns:
-        Dict mapping school -> list of students
+    Yields:
+        Dict mapping receiver -> list of accepted proposers (best first),
+        one per instance, exactly as deferred_acceptance (or match_instance)
+        returns it
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    instances = iter(instances)
+    in_flight = deque()
+    
+    def submit(executor):
+        chunk = [instance for _, instance in zip(range(chunk_size), instances)]
+        if not chunk:
+            return False
+        
+        names = []
+        for instance in chunk:
+            if isinstance(instance, PreferenceInstance):
+                names.append((instance.proposers, instance.receivers))
+            elif isinstance(instance[0], dict):
+                names.append((list(instance[0]), list(instance[1])))
+            else:
+                names.append((None, range(len(instance[1]))))
+        
+        block = None
+        if all(isinstance(instance, PreferenceInstance) for instance in chunk):
+            buffer, offsets, _ = encode_instances(chunk)
+            block = shared_memory.SharedMemory(create=True, size=max(1, len(buffer) * buffer.itemsize))
+            block.buf[:len(buffer) * buffer.itemsize] = memoryview(buffer).cast('B')
+            future = executor.submit(_match_encoded_chunk, block.name, offsets)
+        else:
+            future = executor.submit(_match_chunk, chunk)
+        in_flight.append((future, block, names))
+        return True
+    
+    def collect():
+        future, block, names = in_flight.popleft()
+        try:
+            results = future.result()
+        finally:
+            if block is not None:
+                block.close()
+                block.unlink()
+        
+        position = 0
+        for proposers, receivers in names:
+            assignments = []
+            for _ in receivers:
+                accepted = results[position + 1:position + 1 + results[position]].tolist()
+                position += 1 + len(accepted)
+                assignments.append(accepted)
+            
+            if proposers is None:
+                yield dict(enumerate(assignments))
+            else:
+                yield {receiver: [proposers[i] for i in accepted]
+                       for receiver, accepted in zip(receivers, assignments)}
+    
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            more = True
+            while more or in_flight:
+                # Keep every worker busy with one chunk queued behind it
+                while more and len(in_flight) < 2 * max_workers:
+                    more = submit(executor)
+                if in_flight:
+                    yield from collect()
+        finally:
+            for future, block, _ in in_flight:
+                future.cancel()
+                if block is not None:
+                    block.close()
+                    block.unlink()
+
+
+def random_marriage_market(n, rng):
+    """One-to-one market with n men and n women and uniform random lists"""
+    men = [f"M{i}" for i in range(n)]
+    women = [f"W{i}" for i in range(n)]
+    men_prefs = {man: rng.sample(women, n) for man in men}
+    women_prefs = {woman: rng.sample(men, n) for woman in women}
+    return men_prefs, women_prefs, {woman: 1 for woman in women}
+
+
+def benchmark_batch_matching(num_instances=2000, size=20, worker_counts=(1, 2, 4), chunk_size=64):
+    """
+    Compare a plain loop of deferred_acceptance calls with batch_matching,
+    given dicts of names and given PreferenceInstance objects.
+    
+    Each worker runs the same single-threaded solver, so the speed-up is
+    bounded by the number of CPU cores; adding workers beyond that only
+    adds process overhead. The parent's share of the work is shown as
+    "parent": pickling the dict chunks, or copying the instance arrays
+    into shared memory.
+    """
+    rng = random.Random(0)
+    instances = [random_marriage_market(size, rng) for _ in range(num_instances)]
+    numbered = [PreferenceInstance.from_dicts(*instance) for instance in instances]
+    
+    start = time.perf_counter()
+    expected = [deferred_acceptance(*instance) for instance in instances]
+    sequential = time.perf_counter() - start
+    
+    parent = {}
+    start = time.perf_counter()
+    for first in range(0, num_instances, chunk_size):
+        pickle.dumps(instances[first:first + chunk_size])
+    parent['dicts'] = time.perf_counter() - start
+    start = time.perf_counter()
+    for first in range(0, num_instances, chunk_size):
+        encode_instances(numbered[first:first + chunk_size])
+    parent['instances'] = time.perf_counter() - start
+    
+    print(f"{num_instances} markets of {size} x {size}, {os.cpu_count()} CPU cores")
+    print(f"{'runner':<26} {'parent (ms)':<13} {'time (ms)':<11} {'markets/s':<11} "
+          f"{'speed-up':<10} {'same'}")
+    print("-" * 84)
+    print(f"{'loop':<26} {'':<13} {sequential * 1000:<11.1f} {num_instances / sequential:<11.0f} "
+          f"{1.0:<10.2f} {True}")
+    
+    for label, batch in (("dicts", instances), ("instances", numbered)):
+        for workers in worker_counts:
+            start = time.perf_counter()
+            results = list(batch_matching(batch, max_workers=workers, chunk_size=chunk_size))
+            elapsed = time.perf_counter() - start
+            print(f"{f'{label}, {workers} workers':<26} {parent[label] * 1000:<13.1f} "
+                  f"{elapsed * 1000:<11.1f} {num_instances / elapsed:<11.0f} "
+                  f"{sequential / elapsed:<10.2f} {results == expected}")
+
+
+def synthetic_residency_market(num_residents, num_hospitals, list_length=10, seed=0,
+                               tie_size=1):
+    """
+    Random residency market in the shape of a national match.
+    
+    Each resident applies to list_length random hospitals, and every hospital
+    ranks only its applicants, by a shared score, so popular hospitals fill
+    up and keep rejecting. With tie_size > 1 hospitals rank applicants in
+    tied bands of that size. Capacities add up to 90% of the residents.
+    """
+    rng = random.Random(seed)
+    hospitals = [f"H{i}" for i in range(num_hospitals)]
+    residents = {}
+    applicants = {hospital: [] for hospital in hospitals}
+    
+    for i in range(num_residents):
+        resident = f"R{i}"
+        residents[resident] = rng.sample(hospitals, min(list_length, num_hospitals))
+        for hospital in residents[resident]:
+            applicants[hospital].append(resident)
+    
+    score = {resident: rng.random() for resident in residents}
+    hospital_prefs = {hospital: sorted(applicants[hospital], key=score.__getitem__)
+                      for hospital in hospitals}
+    if tie_size > 1:
+        for hospital, prefs in hospital_prefs.items():
+            hospital_prefs[hospital] = [prefs[i:i + tie_size]
+                                        for i in range(0, len(prefs), tie_size)]
+    
+    capacity = max(1, num_residents * 9 // (10 * num_hospitals))
+    capacities = {hospital: capacity for hospital in hospitals}
+    return residents, hospital_prefs, capacities
+
+
+def benchmark_hospital_resident(num_residents=20000, hospital_counts=(1000, 100, 40),
+                                tie_sizes=(1, 10)):
     """
-    return hospital_resident_matching(students, schools, school_capacities)
+    Time hospital_resident_matching as hospital capacities grow.
+    
+    With heap-backed slots the time per proposal barely moves when the
+    capacity goes from tens to hundreds of residents, and hospital lists
+    with tied bands cost the same per proposal as strict ones. For a
+    full-size run:
+        benchmark_hospital_resident(100000, (2000, 200))
+    """
+    print(f"{'residents':<11} {'hospitals':<11} {'capacity':<10} {'ties':<6} {'proposals':<11} "
+          f"{'time (ms)':<11} {'ns/proposal':<12}")
+    print("-" * 76)
+    
+    for num_hospitals, tie_size in ((h, t) for h in hospital_counts for t in tie_sizes):
+        residents, hospital_prefs, capacities = synthetic_residency_market(
+            num_residents, num_hospitals, tie_size=tie_size)
+        
+        stats = MatchStats()
+        start = time.perf_counter()
+        hospital_resident_matching(residents, hospital_prefs, capacities, stats=stats)
+        elapsed = time.perf_counter() - start
+        proposals = stats.proposals
+        
+        capacity = next(iter(capacities.values()))
+        print(f"{num_residents:<11} {num_hospitals:<11} {capacity:<10} {tie_size:<6} {proposals:<11} "
+              f"{elapsed * 1000:<11.1f} {elapsed * 1e9 / proposals:<12.1f}")
+    
+    return stats
 
 
 def demonstrate_applications():
@@ -165,6 +1144,21 @@ def demonstrate_applications():
     for hospital, assigned_residents in sorted(assignments.items()):
         print(f"  {hospital}: {assigned_residents}")
     
+    # Real lists are short, and hospitals rank only their applicants, in bands
+    print("\nShort lists and ties (a nested list is a tied band):")
+    residents = {'R1': ['H1'], 'R2': ['H2', 'H1'], 'R3': ['H1', 'H3'], 'R4': ['H3'], 'R5': ['H2', 'H3']}
+    hospitals = {'H1': [['R1', 'R3'], 'R2'], 'H2': ['R5', 'R2'], 'H3': [['R3', 'R4', 'R5']]}
+    capacities = {'H1': 1, 'H2': 1, 'H3': 1}
+    for hospital, prefs in hospitals.items():
+        print(f"  {hospital}: {prefs}")
+    
+    assignments = hospital_resident_matching(residents, hospitals, capacities)
+    matched = {resident for assigned in assignments.values() for resident in assigned}
+    print("Final Assignments:")
+    for hospital, assigned_residents in sorted(assignments.items()):
+        print(f"  {hospital}: {assigned_residents}")
+    print(f"  Unmatched: {sorted(set(residents) - matched)}")
+    
     # Application 2: Student-School Matching
     print("\n\nApplication 2: Student-School Matching")
     print("-" * 60)
@@ -234,6 +1228,24 @@ def demonstrate_applications():
     for job, applicant in sorted(job_matching.items()):
         print(f"  {job} <-> {applicant}")
     
+    # Scaling: large residency markets
+    print("\n\nApplication 4: Large Residency Match")
+    print("-" * 60)
+    stats = benchmark_hospital_resident()
+    print(f"\nApplications per resident in the last market "
+          f"({stats.last_run['worst_case_ratio']:.0%} of all list entries used):")
+    print(stats.format_histogram())
+    
+    # Loading large markets from preference exports
+    print("\n\nApplication 5: Loading Preference Exports")
+    print("-" * 60)
+    benchmark_preference_loading()
+    
+    # Throughput: many small markets at once
+    print("\n\nApplication 6: Batch of Small Markets")
+    print("-" * 60)
+    benchmark_batch_matching()
+    
     # Summary
     print("\n\n" + "=" * 60)
     print("Key Takeaways:")
@@ -0,0 +1,658 @@
+"""
+Exercise 4: Incremental Stable Matching
+Repairs a man-optimal stable matching after agents join, leave or change
+their preference lists, instead of rerunning Gale-Shapley from scratch
+"""
+
+import json
+import random
+from collections import Counter, deque
+
+
+class MatchStats:
+    """Proposal trace for Gale-Shapley runs (from exercise 1)"""
+    
+    def __init__(self):
+        self.runs = 0
+        self.proposals = 0
+        self.engagements = 0
+        self.swaps = 0
+        self.rejections = 0
+        self.depth = {}  # proposer -> proposals made in the last run
+        self.displaced = Counter()  # proposer -> times displaced, all runs
+        self.last_run = {}
+        self._run_swaps = 0
+    
+    def record_swap(self, displaced):
+        """Called by the matching loop when a woman trades up"""
+        self._run_swaps += 1
+        self.displaced[displaced] += 1
+    
+    def finish_run(self, depth, engagements, list_entries, proposals=None):
+        """
+        Close a run.
+        
+        Args:
+            depth: Dictionary mapping proposer -> proposals made in this run
+            engagements: Proposals accepted by a free woman (or free seat)
+            list_entries: Total length of the proposers' preference lists
+            proposals: Proposals made, if not the sum of the depths
+        """
+        if proposals is None:
+            proposals = sum(depth.values())
+        swaps = self._run_swaps
+        self._run_swaps = 0
+        
+        self.runs += 1
+        self.proposals += proposals
+        self.engagements += engagements
+        self.swaps += swaps
+        self.rejections += proposals - engagements - swaps
+        self.depth = depth
+        self.last_run = {
+            'proposals': proposals,
+            'engagements': engagements,
+            'swaps': swaps,
+            'rejections': proposals - engagements - swaps,
+            'list_entries': list_entries,
+            'worst_case_ratio': proposals / list_entries if list_entries else 0.0,
+        }
+    
+    def histogram(self, bins=10):
+        """
+        Bucket the proposal depths of the last run.
+        
+        Returns:
+            List of (low, high, count) with inclusive bounds
+        """
+        if not self.depth:
+            return []
+        top = max(self.depth.values())
+        width = max(1, -(-top // bins))  # ceil(top / bins)
+        counts = Counter((d - 1) // width if d else 0 for d in self.depth.values())
+        return [(b * width + 1, (b + 1) * width, counts[b])
+                for b in range(-(-top // width))]
+    
+    def summary(self, top=5):
+        """Totals, last-run figures and depth histogram as a plain dict"""
+        depths = self.depth.values()
+        return {
+            'runs': self.runs,
+            'proposals': self.proposals,
+            'engagements': self.engagements,
+            'swaps': self.swaps,
+            'rejections': self.rejections,
+            'last_run': dict(self.last_run,
+                             mean_depth=sum(depths) / len(depths) if depths else 0.0,
+                             max_depth=max(depths, default=0)),
+            'depth_histogram': [list(bucket) for bucket in self.histogram()],
+            'most_displaced': [[str(man), times]
+                               for man, times in self.displaced.most_common(top)],
+        }
+    
+    def to_json(self, indent=None):
+        """Serialize summary() for logs or dashboards"""
+        return json.dumps(self.summary(), indent=indent)
+    
+    def format_histogram(self, bins=10, width=40):
+        """Render the depth histogram as text bars"""
+        buckets = self.histogram(bins)
+        largest = max((count for _, _, count in buckets), default=0) or 1
+        return "\n".join(f"{low:>6}-{high:<6} {count:>7} {'#' * (count * width // largest)}"
+                         for low, high, count in buckets)
+
+
+def gale_shapley(men_preferences, women_preferences, stats=None):
+    """Gale-Shapley algorithm (from exercise 1)"""
+    free_men = deque(men_preferences.keys())
+    engaged = {}
+    proposals = {man: 0 for man in free_men}
+    
+    women_rankings = {}
+    for woman, prefs in women_preferences.items():
+        women_rankings[woman] = {man: rank for rank, man in enumerate(prefs)}
+    
+    while free_men:
+        man = free_men[0]
+        
+        if proposals[man] >= len(men_preferences[man]):
+            free_men.popleft()
+            continue
+        
+        woman = men_preferences[man][proposals[man]]
+        proposals[man] += 1
+        
+        if woman not in engaged:
+            engaged[woman] = man
+            free_men.popleft()
+        else:
+            current_man = engaged[woman]
+            if women_rankings[woman][man] < women_rankings[woman][current_man]:
+                engaged[woman] = man
+                free_men.popleft()
+                free_men.append(current_man)
+                if stats is not None:
+                    stats.record_swap(current_man)
+    
+    if stats is not None:
+        stats.finish_run(proposals, len(engaged),
+                         sum(map(len, men_preferences.values())))
+    return engaged
+
+
+# Spacing between consecutive ranks, so an agent can be inserted into a
+# list without renumbering everybody after him
+RANK_GAP = 1 << 32
+
+
+def insert_ranked(prefs, rankings, agent, position):
+    """Insert agent into a preference list at position, keeping the others' ranks"""
+    position = min(position, len(prefs))
+    
+    def bounds():
+        low = rankings[prefs[position - 1]] if position > 0 else -RANK_GAP
+        high = rankings[prefs[position]] if position < len(prefs) else low + 2 * RANK_GAP
+        return low, high
+    
+    low, high = bounds()
+    if high - low < 2:
+        # Gap used up: renumber this list once
+        for rank, other in enumerate(prefs):
+            rankings[other] = rank * RANK_GAP
+        low, high = bounds()
+    
+    rankings[agent] = (low + high) // 2
+    prefs.insert(position, agent)
+    return position
+
+
+class RepairTooExpensive(Exception):
+    """Raised when an incremental repair costs more than a fresh run"""
+
+
+class IncrementalStableMatching:
+    """
+    Man-optimal stable matching that is kept up to date under changes.
+    
+    Changes that can only make men worse off (add_man, remove_woman) keep
+    every past rejection valid, so deferred acceptance simply resumes with
+    the newly free man. Changes that can make men better off (remove_man,
+    add_woman) are repaired in two steps:
+    
+    1. Vacancy chain: the woman left without a partner proposes down her
+       list, men trade up if they like, and each abandoned woman continues
+       from where she was. The result is stable but may not be man-optimal.
+    2. Climb: a cycle w -> s(w) -> wife(s(w)) -> ... where s(w) is the first
+       man below w's partner who prefers w to his wife is an exposed
+       rotation; rotating it moves the women down and the men up. Only
+       women whose s(w) may have changed can start a new cycle, so only
+       those are examined; when none is left the matching is man-optimal.
+    
+    A man's new list is handled as removing and re-adding him. A woman with
+    a new list first rejects everybody, then re-enters with her new list.
+    Every man a proposer considers counts as a proposal, and a repair that
+    needs more proposals than the last full run is abandoned for a full
+    rerun, so a change never costs much more than starting over.
+    
+    With a MatchStats attached, the initial run and every operation are
+    recorded as one run each. A swap is a proposer left single by a trade
+    (a man in deferred acceptance, a woman in a vacancy chain or rotation),
+    and the depth of a man is the position of his wife in his list, which
+    is how far a fresh Gale-Shapley run would have taken him.
+    
+    Attributes:
+        men_preferences, women_preferences: Current preference lists
+        proposals: Proposals made by the last operation
+        engagements: Proposals of the last operation that matched a single agent
+        full_run_proposals: Proposals made by the last full run
+        stats: Optional MatchStats
+    """
+    
+    def __init__(self, men_preferences, women_preferences, stats=None):
+        self.men_preferences = {man: list(prefs) for man, prefs in men_preferences.items()}
+        self.women_preferences = {woman: list(prefs) for woman, prefs in women_preferences.items()}
+        self.men_rankings = {man: {woman: rank * RANK_GAP for rank, woman in enumerate(prefs)}
+                             for man, prefs in self.men_preferences.items()}
+        self.women_rankings = {woman: {man: rank * RANK_GAP for rank, man in enumerate(prefs)}
+                               for woman, prefs in self.women_preferences.items()}
+        self.stats = stats
+        self.proposals = 0
+        self.engagements = 0
+        self._restart()
+        self._report()
+    
+    def matching(self):
+        """Current stable matching as a dict woman -> man"""
+        return dict(self.husband)
+    
+    def _restart(self):
+        """Run deferred acceptance from scratch"""
+        self.husband = {}
+        self.wife = {}
+        # position[m] is the index of m's wife in his list
+        self.position = {}
+        self.budget = None
+        spent = self.proposals
+        self._propose(deque((man, 0) for man in self.men_preferences))
+        self.full_run_proposals = self.proposals - spent
+    
+    def _report(self):
+        """Close the current run in stats, if attached"""
+        if self.stats is None:
+            return
+        depth = {man: self.position[man] + 1 if man in self.position else len(prefs)
+                 for man, prefs in self.men_preferences.items()}
+        self.stats.finish_run(depth, self.engagements,
+                              sum(map(len, self.men_preferences.values())), self.proposals)
+    
+    def _count(self):
+        """Count one proposal, giving up once a full run would be cheaper"""
+        self.proposals += 1
+        if self.budget is not None and self.proposals > self.budget:
+            raise RepairTooExpensive
+    
+    def _update(self, repair, finish=None):
+        """
+        Run an incremental repair, falling back to a full run if needed.
+        
+        Args:
+            repair: Callable bringing the matching up to date
+            finish: Callable applied afterwards in any case, leaving the
+                preference lists in their final state
+        """
+        self.proposals = 0
+        self.engagements = 0
+        self.budget = self.full_run_proposals
+        try:
+            repair()
+            repaired = True
+        except RepairTooExpensive:
+            repaired = False
+        self.budget = None
+        
+        if finish is not None:
+            finish()
+        if not repaired:
+            self._restart()
+        self._report()
+    
+    def _propose(self, free_men):
+        """Resume deferred acceptance; free_men holds (man, next list index)"""
+        while free_men:
+            man, position = free_men.popleft()
+            prefs = self.men_preferences[man]
+            
+            while position < len(prefs):
+                woman = prefs[position]
+                self._count()
+                
+                rank = self.women_rankings[woman].get(man)
+                current_man = self.husband.get(woman)
+                
+                if rank is not None and (current_man is None or
+                                         rank < self.women_rankings[woman][current_man]):
+                    self.husband[woman] = man
+                    self.wife[man] = woman
+                    self.position[man] = position
+                    if current_man is not None:
+                        del self.wife[current_man]
+                        free_men.append((current_man, self.position.pop(current_man) + 1))
+                        if self.stats is not None:
+                            self.stats.record_swap(current_man)
+                    else:
+                        self.engagements += 1
+                    break
+                position += 1
+    
+    def _prefers(self, man, woman):
+        """Would man leave his wife (if any) for woman?"""
+        rank = self.men_rankings[man].get(woman)
+        if rank is None:
+            return False
+        wife = self.wife.get(man)
+        return wife is None or rank < self.men_rankings[man][wife]
+    
+    def _move(self, man, woman, dirty):
+        """Man trades up to woman; women he used to prefer to his wife get dirty"""
+        prefs = self.men_preferences[man]
+        old_position = self.position.get(man, len(prefs))
+        dirty.update(prefs[:old_position])
+        self.wife[man] = woman
+        self.husband[woman] = man
+        self.position[man] = prefs.index(woman, 0, old_position)
+    
+    def _vacancy_chain(self, woman, start, dirty):
+        """A single woman proposes from start; abandoned women carry on"""
+        while woman is not None:
+            dirty.add(woman)
+            prefs = self.women_preferences[woman]
+            proposer, woman = woman, None
+            
+            for position in range(start, len(prefs)):
+                man = prefs[position]
+                self._count()
+                if self._prefers(man, proposer):
+                    woman = self.wife.get(man)
+                    if woman is not None:
+                        del self.husband[woman]
+                        if self.stats is not None:
+                            self.stats.record_swap(woman)
+                    else:
+                        self.engagements += 1
+                    self._move(man, proposer, dirty)
+                    if woman is not None:
+                        start = self.women_preferences[woman].index(man) + 1
+                    break
+    
+    def _climb(self, dirty):
+        """Rotate exposed women-side rotations until the matching is man-optimal"""
+        # pointer[w] is the index in w's list of her candidate s(w)
+        pointer = {}
+        
+        def next_man(woman):
+            prefs = self.women_preferences[woman]
+            if woman not in pointer:
+                pointer[woman] = prefs.index(self.husband[woman]) + 1
+            while pointer[woman] < len(prefs):
+                man = prefs[pointer[woman]]
+                self._count()
+                if self._prefers(man, woman):
+                    return man
+                pointer[woman] += 1
+            return None
+        
+        pending = deque(dirty)
+        while pending:
+            woman = pending.popleft()
+            dirty.discard(woman)
+            
+            path = []
+            on_path = {}
+            while woman is not None and woman not in on_path:
+                on_path[woman] = len(path)
+                path.append(woman)
+                man = next_man(woman) if woman in self.husband else None
+                woman = self.wife.get(man) if man is not None else None
+            if woman is None:
+                continue  # Dead end: no rotation through these women for now
+            
+            cycle = path[on_path[woman]:]
+            movers = [next_man(w) for w in cycle]
+            changed = set()
+            for w in cycle:
+                del self.husband[w]
+            for w, man in zip(cycle, movers):
+                if self.stats is not None:
+                    self.stats.record_swap(self.wife[man])
+                self._move(man, w, changed)
+                pointer[w] += 1
+            changed.update(cycle)
+            
+            for w in changed:
+                if w not in dirty:
+                    dirty.add(w)
+                    pending.append(w)
+    
+    def _set_man(self, man, preferences):
+        self.men_preferences[man] = list(preferences)
+        self.men_rankings[man] = {woman: rank * RANK_GAP for rank, woman in enumerate(preferences)}
+    
+    def _set_woman(self, woman, preferences):
+        self.women_preferences[woman] = list(preferences)
+        self.women_rankings[woman] = {man: rank * RANK_GAP for rank, man in enumerate(preferences)}
+    
+    def _detach_man(self, man):
+        """Make man unacceptable to everybody, then restore man-optimality"""
+        dirty = set()
+        prefs = self.men_preferences[man]
+        # Women who rejected him could only do so because he was around
+        dirty.update(prefs[:self.position.get(man, len(prefs))])
+        
+        woman = self.wife.pop(man, None)
+        self.position.pop(man, None)
+        self._set_man(man, [])
+        if woman is not None:
+            del self.husband[woman]
+            start = self.women_preferences[woman].index(man) + 1
+            self._vacancy_chain(woman, start, dirty)
+        self._climb(dirty)
+    
+    def _enter_woman(self, woman):
+        """Let a single woman claim her place, then restore man-optimality"""
+        dirty = set()
+        self._vacancy_chain(woman, 0, dirty)
+        self._climb(dirty)
+    
+    def add_man(self, man, preferences, positions=None):
+        """
+        Add a man with his preference list.
+        
+        Args:
+            preferences: List of women in order of preference
+            positions: Dict mapping woman -> index in her list where the new
+                man goes (he is appended to lists not mentioned)
+        """
+        positions = positions or {}
+        self._set_man(man, preferences)
+        for woman, prefs in self.women_preferences.items():
+            insert_ranked(prefs, self.women_rankings[woman], man,
+                          positions.get(woman, len(prefs)))
+        
+        self._update(lambda: self._propose(deque([(man, 0)])))
+    
+    def remove_woman(self, woman):
+        """Remove a woman; only her partner has to propose again"""
+        man = self.husband.pop(woman, None)
+        if man is not None:
+            del self.wife[man]
+        
+        for suitor, prefs in self.men_preferences.items():
+            position = prefs.index(woman)
+            del prefs[position]
+            del self.men_rankings[suitor][woman]
+            if suitor in self.position and position < self.position[suitor]:
+                self.position[suitor] -= 1
+        
+        del self.women_preferences[woman]
+        del self.women_rankings[woman]
+        
+        free_men = deque()
+        if man is not None:
+            free_men.append((man, self.position.pop(man)))
+        self._update(lambda: self._propose(free_men))
+    
+    def remove_man(self, man):
+        """Remove a man; men who lost out to him may now do better"""
+        def finish():
+            for prefs in self.women_preferences.values():
+                prefs.remove(man)
+            for rankings in self.women_rankings.values():
+                del rankings[man]
+            del self.men_preferences[man]
+            del self.men_rankings[man]
+        
+        self._update(lambda: self._detach_man(man), finish)
+    
+    def add_woman(self, woman, preferences, positions=None):
+        """
+        Add a woman with her preference list.
+        
+        Args:
+            preferences: List of men in order of preference
+            positions: Dict mapping man -> index in his list where the new
+                woman goes (she is appended to lists not mentioned)
+        """
+        positions = positions or {}
+        self._set_woman(woman, preferences)
+        for man, prefs in self.men_preferences.items():
+            position = insert_ranked(prefs, self.men_rankings[man], woman,
+                                     positions.get(man, len(prefs)))
+            if man in self.position and position <= self.position[man]:
+                self.position[man] += 1
+        
+        self._update(lambda: self._enter_woman(woman))
+    
+    def reorder_man(self, man, preferences):
+        """Replace a man's preference list"""
+        def repair():
+            self._detach_man(man)
+            self._set_man(man, preferences)
+            self._propose(deque([(man, 0)]))
+        
+        self._update(repair, lambda: self._set_man(man, preferences))
+    
+    def reorder_woman(self, woman, preferences):
+        """Replace a woman's preference list"""
+        def repair():
+            # Rejecting everybody only makes men worse off: her partner re-proposes
+            self._set_woman(woman, [])
+            man = self.husband.pop(woman, None)
+            if man is not None:
+                del self.wife[man]
+                self._propose(deque([(man, self.position.pop(man) + 1)]))
+            
+            self._set_woman(woman, preferences)
+            self._enter_woman(woman)
+        
+        self._update(repair, lambda: self._set_woman(woman, preferences))
+
+
+def check_against_gale_shapley(rounds=200, n=12, seed=0):
+    """
+    Apply random changes and compare each result with a fresh gale_shapley.
+    
+    Returns:
+        Number of mismatches (0 means every incremental result was identical)
+    """
+    rng = random.Random(seed)
+    men = [f"m{i}" for i in range(n)]
+    women = [f"w{i}" for i in range(n)]
+    men_prefs = {man: rng.sample(women, n) for man in men}
+    women_prefs = {woman: rng.sample(men, n) for woman in women}
+    
+    matcher = IncrementalStableMatching(men_prefs, women_prefs)
+    mismatches = 0
+    next_id = n
+    
+    for _ in range(rounds):
+        men = list(matcher.men_preferences)
+        women = list(matcher.women_preferences)
+        change = rng.choice(['add_man', 'remove_man', 'add_woman', 'remove_woman',
+                             'reorder_man', 'reorder_woman'])
+        
+        if change == 'add_man':
+            positions = {woman: rng.randint(0, len(men)) for woman in women}
+            matcher.add_man(f"m{next_id}", rng.sample(women, len(women)), positions)
+            next_id += 1
+        elif change == 'add_woman':
+            positions = {man: rng.randint(0, len(women)) for man in men}
+            matcher.add_woman(f"w{next_id}", rng.sample(men, len(men)), positions)
+            next_id += 1
+        elif change == 'remove_man' and len(men) > 1:
+            matcher.remove_man(rng.choice(men))
+        elif change == 'remove_woman' and len(women) > 1:
+            matcher.remove_woman(rng.choice(women))
+        elif change == 'reorder_man':
+            matcher.reorder_man(rng.choice(men), rng.sample(women, len(women)))
+        elif change == 'reorder_woman':
+            matcher.reorder_woman(rng.choice(women), rng.sample(men, len(men)))
+        
+        expected = gale_shapley(matcher.men_preferences, matcher.women_preferences)
+        if matcher.matching() != expected:
+            mismatches += 1
+    
+    return mismatches
+
+
+def demonstrate_incremental_matching():
+    """Demonstrate incremental repairs of a stable matching"""
+    print("=" * 60)
+    print("Incremental Stable Matching")
+    print("=" * 60)
+    
+    men_prefs = {
+        'A': ['W', 'X', 'Y', 'Z'],
+        'B': ['X', 'W', 'Z', 'Y'],
+        'C': ['W', 'X', 'Y', 'Z'],
+        'D': ['Y', 'Z', 'X', 'W']
+    }
+    
+    women_prefs = {
+        'W': ['B', 'A', 'D', 'C'],
+        'X': ['A', 'B', 'C', 'D'],
+        'Y': ['A', 'B', 'C', 'D'],
+        'Z': ['C', 'D', 'A', 'B']
+    }
+    
+    matcher = IncrementalStableMatching(men_prefs, women_prefs)
+    
+    def show(title):
+        print(f"\n{title} ({matcher.proposals} proposals)")
+        print("-" * 60)
+        for woman, man in sorted(matcher.matching().items()):
+            print(f"  {woman} <-> {man}")
+        fresh = gale_shapley(matcher.men_preferences, matcher.women_preferences)
+        print(f"  Same as a fresh Gale-Shapley run: {matcher.matching() == fresh}")
+    
+    show("Initial matching")
+    
+    matcher.reorder_woman('Y', ['D', 'C', 'B', 'A'])
+    show("Y now prefers D, C, B, A")
+    
+    matcher.add_man('E', ['X', 'W', 'Y', 'Z'], {'W': 0, 'X': 0, 'Y': 2, 'Z': 4})
+    show("E joins (first choice of W and X)")
+    
+    matcher.add_woman('V', ['E', 'A', 'B', 'C', 'D'], {'A': 0, 'C': 1})
+    show("V joins (first choice of A)")
+    
+    matcher.remove_man('B')
+    show("B leaves")
+    
+    matcher.remove_woman('W')
+    show("W leaves")
+    
+    print("\n\nRandom changes compared with fresh Gale-Shapley runs")
+    print("-" * 60)
+    for n in (3, 8, 20):
+        mismatches = check_against_gale_shapley(rounds=300, n=n, seed=n)
+        print(f"  n = {n:<3} 300 random changes, mismatches: {mismatches}")
+    
+    # Proposal counts on a larger market
+    print("\n\nProposals per change on a market with 1000 men and women")
+    print("-" * 60)
+    # Correlated preferences: everybody roughly agrees on who is popular
+    rng = random.Random(1)
+    n = 1000
+    men = [f"m{i}" for i in range(n)]
+    women = [f"w{i}" for i in range(n)]
+    popularity = {agent: rng.random() for agent in men + women}
+    
+    def ranked(agents):
+        return sorted(agents, key=lambda agent: popularity[agent] + rng.random())
+    
+    stats = MatchStats()
+    matcher = IncrementalStableMatching({m: ranked(women) for m in men},
+                                        {w: ranked(men) for w in women}, stats=stats)
+    print(f"  {'full run':<16} {matcher.full_run_proposals:>7} proposals "
+          f"{stats.last_run['swaps']:>6} swaps")
+    
+    changes = [
+        ('reorder_woman', lambda: matcher.reorder_woman('w0', ranked(men))),
+        ('reorder_man', lambda: matcher.reorder_man('m0', ranked(women))),
+        ('remove_man', lambda: matcher.remove_man('m1')),
+        ('remove_woman', lambda: matcher.remove_woman('w1')),
+        ('add_man', lambda: matcher.add_man('m1', ranked(matcher.women_preferences),
+                                            dict.fromkeys(matcher.women_preferences, n // 2))),
+        ('add_woman', lambda: matcher.add_woman('w1', ranked(matcher.men_preferences),
+                                                dict.fromkeys(matcher.men_preferences, n // 2))),
+    ]
+    for name, change in changes:
+        change()
+        print(f"  {name:<16} {matcher.proposals:>7} proposals {stats.last_run['swaps']:>6} swaps")
+    
+    print("\n  Position of each man's wife in his list after the changes:")
+    print(stats.format_histogram())
+
+
+if __name__ == "__main__":
+    demonstrate_incremental_matching()
@@ -3,7 +3,17 @@ Exercise 1: Graph Traversal (BFS and DFS)
 Implements Breadth-First Search and Depth-First Search algorithms
 """
 
+import mmap
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+from array import array
 from collections import deque, defaultdict
+from itertools import accumulate
 
 
 class Graph:
@@ -22,16 +32,290 @@ class Graph:
         self.graph[u].append(v)
 
 
-def bfs(graph, start):
+class CSRGraph:
+    """
+    Compressed sparse row graph over vertex ids 0..n-1.
+    
+    The neighbors of vertex v are targets[offsets[v]:offsets[v + 1]], so
+    the whole adjacency structure is two flat arrays: 8 bytes per vertex
+    and 4 bytes per adjacency entry, instead of a dict entry, a list and
+    an object per neighbor. An undirected edge is stored in both
+    directions, as in Graph.
+    
+    Attributes:
+        num_nodes: Number of vertices
+        offsets: array('q') of length num_nodes + 1
+        targets: array('i') of neighbor ids
+        nodes: Sequence mapping id -> original node (range for edge lists)
+        directed: Whether edges are stored in one direction only
+    """
+    
+    def __init__(self, offsets, targets, nodes=None, directed=False):
+        self.num_nodes = len(offsets) - 1
+        self.offsets = offsets
+        self.targets = targets
+        self.nodes = range(self.num_nodes) if nodes is None else nodes
+        self.node_id = None if nodes is None else {node: i for i, node in enumerate(nodes)}
+        self.directed = directed
+        self._transpose = None
+    
+    @classmethod
+    def from_edges(cls, num_nodes, edges, directed=False):
+        """
+        Build from (u, v) pairs of vertex ids with a counting sort.
+        
+        Neighbors keep the order in which their edges were given.
+        
+        Time Complexity: O(V + E)
+        """
+        heads = array('i')
+        tails = array('i')
+        for u, v in edges:
+            heads.append(u)
+            tails.append(v)
+            if not directed:
+                heads.append(v)
+                tails.append(u)
+        
+        degree = array('q', [0]) * (num_nodes + 1)
+        for u in heads:
+            degree[u + 1] += 1
+        offsets = array('q', accumulate(degree))
+        
+        targets = array('i', [0]) * len(heads)
+        position = offsets[:-1]
+        for u, v in zip(heads, tails):
+            targets[position[u]] = v
+            position[u] += 1
+        return cls(offsets, targets, directed=directed)
+    
+    @classmethod
+    def from_graph(cls, graph, directed=False):
+        """
+        Build from a Graph, numbering nodes in order of first appearance.
+        
+        Neighbor order is kept, so traversals visit nodes in the same order
+        as on the Graph. Pass directed=True if the Graph has edges added
+        with add_directed_edge.
+        """
+        adjacency = graph.graph
+        node_id = {}
+        for node, neighbors in adjacency.items():
+            node_id.setdefault(node, len(node_id))
+            for neighbor in neighbors:
+                node_id.setdefault(neighbor, len(node_id))
+        nodes = list(node_id)
+        
+        offsets = array('q', [0])
+        offsets.extend(accumulate(len(adjacency.get(node, ())) for node in nodes))
+        targets = array('i')
+        for node in nodes:
+            targets.fromlist(list(map(node_id.__getitem__, adjacency.get(node, ()))))
+        return cls(offsets, targets, nodes, directed)
+    
+    def id_of(self, node):
+        """Vertex id of an original node"""
+        return node if self.node_id is None else self.node_id[node]
+    
+    def neighbors(self, v):
+        """Neighbor ids of vertex v"""
+        return self.targets[self.offsets[v]:self.offsets[v + 1]]
+    
+    def transpose(self):
+        """
+        CSRGraph of the reversed edges, built on first use and cached; an
+        undirected graph is its own transpose
+        """
+        if not self.directed:
+            return self
+        if self._transpose is None:
+            offsets = self.offsets
+            sources = (u for u in range(self.num_nodes) for _ in range(offsets[u], offsets[u + 1]))
+            transpose = CSRGraph.from_edges(self.num_nodes, zip(self.targets, sources), directed=True)
+            transpose.nodes, transpose.node_id = self.nodes, self.node_id
+            transpose._transpose = self
+            self._transpose = transpose
+        return self._transpose
+    
+    def memory_bytes(self):
+        """Bytes used by the offset and target arrays"""
+        return (self.offsets.itemsize * len(self.offsets) +
+                self.targets.itemsize * len(self.targets))
+
+
+GRAPH_MAGIC = b'CSRGRAPH'
+GRAPH_HEADER = struct.Struct('<8sIIQQ')  # magic, version, flags, nodes, entries
+DIRECTED, WEIGHTED, BIG_ENDIAN = 1, 2, 4
+
+
+def _graph_layout(num_nodes, num_entries):
+    """Byte ranges of the offsets, targets and weights sections"""
+    offsets_start = GRAPH_HEADER.size
+    targets_start = offsets_start + 8 * (num_nodes + 1)
+    weights_start = targets_start + 4 * num_entries
+    weights_start += -weights_start % 8
+    return offsets_start, targets_start, weights_start, weights_start + 8 * num_entries
+
+
+def write_graph(path, num_nodes, edges, directed=False, weighted=False, chunk=1 << 16):
+    """
+    Write a graph file from a stream of edges.
+    
+    File layout, all sections in native byte order:
+        header   magic, version, flags, node count, entry count (32 bytes)
+        offsets  int64 * (nodes + 1)
+        targets  int32 * entries
+        weights  float64 * entries, 8-byte aligned, only if weighted
+    
+    An undirected edge is stored in both directions. The edges are read
+    once: they are spooled to a temporary file in chunks while the
+    degrees are counted, then scattered straight into the mapped output,
+    so only O(V) arrays are held in memory.
+    
+    Args:
+        path: File to create
+        num_nodes: Vertex ids are 0..num_nodes-1
+        edges: Iterable of (u, v), or (u, v, weight) if weighted
+    
+    Returns:
+        Number of adjacency entries written
+    """
+    degree = array('q', [0]) * (num_nodes + 1)
+    with tempfile.TemporaryFile() as spool:
+        sizes = []
+        heads, tails, weights = array('i'), array('i'), array('d')
+        for edge in edges:
+            u, v = edge[0], edge[1]
+            heads.append(u)
+            tails.append(v)
+            if weighted:
+                weights.append(edge[2])
+            degree[u + 1] += 1
+            if not directed:
+                degree[v + 1] += 1
+            if len(heads) == chunk:
+                sizes.append(len(heads))
+                for part in (heads, tails, weights):
+                    part.tofile(spool)
+                    del part[:]
+        sizes.append(len(heads))
+        for part in (heads, tails, weights):
+            part.tofile(spool)
+            del part[:]
+        
+        offsets = array('q', accumulate(degree))
+        num_entries = offsets[-1]
+        offsets_start, targets_start, weights_start, end = _graph_layout(num_nodes, num_entries)
+        flags = (DIRECTED * directed) | (WEIGHTED * weighted) | (BIG_ENDIAN * (sys.byteorder == 'big'))
+        
+        with open(path, 'w+b') as f:
+            f.truncate(end)
+            with mmap.mmap(f.fileno(), 0) as mapped:
+                GRAPH_HEADER.pack_into(mapped, 0, GRAPH_MAGIC, 1, flags, num_nodes, num_entries)
+                mapped[offsets_start:targets_start] = offsets.tobytes()
+                
+                view = memoryview(mapped)
+                targets = view[targets_start:targets_start + 4 * num_entries].cast('i')
+                out_weights = view[weights_start:end].cast('d') if weighted else None
+                position = offsets[:-1]
+                spool.seek(0)
+                for size in sizes:
+                    heads.fromfile(spool, size)
+                    tails.fromfile(spool, size)
+                    if weighted:
+                        weights.fromfile(spool, size)
+                    for i in range(size):
+                        u, v = heads[i], tails[i]
+                        targets[position[u]] = v
+                        if weighted:
+                            out_weights[position[u]] = weights[i]
+                        position[u] += 1
+                        if not directed:
+                            targets[position[v]] = u
+                            if weighted:
+                                out_weights[position[v]] = weights[i]
+                            position[v] += 1
+                    for part in (heads, tails, weights):
+                        del part[:]
+                
+                targets.release()
+                if weighted:
+                    out_weights.release()
+                view.release()
+    return num_entries
+
+
+class MappedGraph(CSRGraph):
+    """
+    Read-only CSRGraph backed by a graph file (see write_graph) through mmap.
+    
+    Opening only reads the header: offsets, targets and weights are
+    memoryviews of the mapped file, so the operating system pages in the
+    parts a traversal touches and can drop them again under memory
+    pressure. Everything that accepts a CSRGraph accepts a MappedGraph.
+    
+    Attributes:
+        weights: memoryview of float64 edge weights parallel to targets,
+            or None
+    """
+    
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._mapped = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, flags, num_nodes, num_entries = GRAPH_HEADER.unpack_from(self._mapped)
+        if magic != GRAPH_MAGIC or version != 1:
+            self.close()
+            raise ValueError(f"{path} is not a graph file")
+        if bool(flags & BIG_ENDIAN) != (sys.byteorder == 'big'):
+            self.close()
+            raise ValueError(f"{path} was written with the other byte order")
+        
+        offsets_start, targets_start, weights_start, end = _graph_layout(num_nodes, num_entries)
+        self._view = memoryview(self._mapped)
+        super().__init__(self._view[offsets_start:targets_start].cast('q'),
+                         self._view[targets_start:targets_start + 4 * num_entries].cast('i'),
+                         directed=bool(flags & DIRECTED))
+        self.weights = self._view[weights_start:end].cast('d') if flags & WEIGHTED else None
+    
+    def close(self):
+        """Release the views and unmap the file"""
+        for view in (getattr(self, name, None) for name in ('offsets', 'targets', 'weights', '_view')):
+            if view is not None:
+                view.release()
+        self._mapped.close()
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+def bfs(graph, start, mode='queue'):
     """
     Breadth-First Search
     
     Time Complexity: O(V + E) where V is vertices, E is edges
     Space Complexity: O(V)
     
+    Args:
+        mode: 'queue' expands one node at a time; 'levels' and
+            'direction-optimizing' run bfs_levels and need a CSRGraph
+    
     Returns:
-        Dictionary mapping node -> distance from start
+        Dictionary mapping node -> distance from start; for a CSRGraph, an
+        array indexed by vertex id with -1 for unreachable vertices
     """
+    if mode in ('levels', 'direction-optimizing'):
+        if not isinstance(graph, CSRGraph):
+            raise ValueError(f"mode {mode!r} needs a CSRGraph")
+        return bfs_levels(graph, start, direction_optimizing=mode == 'direction-optimizing')
+    if mode != 'queue':
+        raise ValueError("mode must be 'queue', 'levels' or 'direction-optimizing'")
+    if isinstance(graph, CSRGraph):
+        return _bfs_csr(graph, graph.id_of(start))
+    
     visited = set()
     distance = {}
     queue = deque([start])
@@ -50,6 +334,98 @@ def bfs(graph, start):
     return distance
 
 
+def _bfs_csr(graph, start):
+    """BFS on a CSRGraph; distance doubles as the visited mark"""
+    offsets, targets = graph.offsets, graph.targets
+    distance = array('i', [-1]) * graph.num_nodes
+    distance[start] = 0
+    queue = [start]
+    
+    # Appending while iterating makes the list a FIFO queue without pops
+    for node in queue:
+        next_distance = distance[node] + 1
+        for neighbor in targets[offsets[node]:offsets[node + 1]]:
+            if distance[neighbor] < 0:
+                distance[neighbor] = next_distance
+                queue.append(neighbor)
+    
+    return distance
+
+
+def bfs_levels(graph, start, direction_optimizing=False, transpose=None, alpha=14, beta=24):
+    """
+    Level-synchronous BFS on a CSRGraph, one whole frontier per step.
+    
+    A top-down step expands every vertex of the frontier. With
+    direction_optimizing (Beamer et al.), the middle levels of a
+    low-diameter graph are run bottom-up instead: every unvisited vertex
+    checks whether any neighbor is in the frontier, with one C-level
+    any() over a frontier bitmap, and stops at the first hit. The search
+    goes bottom-up once the frontier's edges exceed 1/alpha of the edges
+    not yet explored, and back top-down once the frontier holds fewer
+    than 1/beta of the vertices.
+    
+    Time Complexity: O(V + E) top-down; a bottom-up step costs O(V) plus
+        the edges scanned before the first hit
+    
+    Args:
+        graph: CSRGraph
+        start: Start node
+        direction_optimizing: Allow bottom-up steps
+        transpose: CSRGraph of the reversed edges for bottom-up steps;
+            defaults to graph.transpose(), which is built once and cached
+            for a directed graph
+    
+    Returns:
+        Same distance array as bfs
+    """
+    n = graph.num_nodes
+    offsets, targets = graph.offsets, graph.targets
+    if transpose is None:
+        transpose = graph.transpose() if direction_optimizing else graph
+    in_offsets, in_targets = transpose.offsets, transpose.targets
+    
+    distance = array('i', [-1]) * n
+    start = graph.id_of(start)
+    distance[start] = 0
+    frontier = [start]
+    level = 0
+    edges_left = len(targets)
+    bottom_up = False
+    unvisited = range(n)
+    
+    while frontier:
+        level += 1
+        if direction_optimizing:
+            frontier_edges = sum(offsets[u + 1] - offsets[u] for u in frontier)
+            if not bottom_up and frontier_edges > edges_left / alpha:
+                bottom_up = True
+            elif bottom_up and len(frontier) < n / beta:
+                bottom_up = False
+            edges_left -= frontier_edges
+        
+        if bottom_up:
+            in_frontier = bytearray(n)
+            for u in frontier:
+                in_frontier[u] = 1
+            # Visited vertices never become unvisited, so the list only shrinks
+            unvisited = [v for v in unvisited if distance[v] < 0]
+            frontier = [v for v in unvisited
+                        if any(map(in_frontier.__getitem__, in_targets[in_offsets[v]:in_offsets[v + 1]]))]
+            for v in frontier:
+                distance[v] = level
+        else:
+            next_frontier = []
+            for u in frontier:
+                for v in targets[offsets[u]:offsets[u + 1]]:
+                    if distance[v] < 0:
+                        distance[v] = level
+                        next_frontier.append(v)
+            frontier = next_frontier
+    
+    return distance
+
+
 def dfs(graph, start):
     """
     Depth-First Search (iterative)
@@ -58,8 +434,12 @@ def dfs(graph, start):
     Space Complexity: O(V)
     
     Returns:
-        Set of visited nodes
+        Set of visited nodes; for a CSRGraph, a bytearray indexed by vertex
+        id with 1 for visited vertices
     """
+    if isinstance(graph, CSRGraph):
+        return _dfs_csr(graph, graph.id_of(start))
+    
     visited = set()
     stack = [start]
     
@@ -76,10 +456,31 @@ def dfs(graph, start):
     return visited
 
 
+def _dfs_csr(graph, start):
+    """Iterative DFS on a CSRGraph, visiting neighbors in the same order as dfs"""
+    offsets, targets = graph.offsets, graph.targets
+    visited = bytearray(graph.num_nodes)
+    stack = [start]
+    
+    while stack:
+        node = stack.pop()
+        if not visited[node]:
+            visited[node] = 1
+            for neighbor in reversed(targets[offsets[node]:offsets[node + 1]]):
+                if not visited[neighbor]:
+                    stack.append(neighbor)
+    
+    return visited
+
+
 def dfs_recursive(graph, start, visited=None):
     """
     Depth-First Search (recursive)
     
+    One Python frame per vertex on the current path, so paths longer than
+    the recursion limit (about 1000) raise RecursionError; dfs_iterative
+    visits in the same order without that limit.
+    
     Time Complexity: O(V + E)
     Space Complexity: O(V) for recursion stack
     """
@@ -95,6 +496,86 @@ def dfs_recursive(graph, start, visited=None):
     return visited
 
 
+def dfs_iterative(graph, start, visited=None):
+    """
+    Depth-First Search with an explicit stack of frames.
+    
+    Each frame is (node, iterator over its neighbors), i.e. exactly the
+    state a dfs_recursive call keeps, so nodes are discovered and finished
+    in the same order, but the path can be as long as memory allows. A
+    frame is a tuple and a list iterator whatever the degree.
+    
+    Time Complexity: O(V + E)
+    Space Complexity: O(V) for the stack
+    
+    Returns:
+        Tuple (preorder, postorder) of the nodes reached from start; for a
+        CSRGraph, lists of vertex ids
+    """
+    if isinstance(graph, CSRGraph):
+        return _dfs_iterative_csr(graph, graph.id_of(start), visited)
+    if visited is None:
+        visited = set()
+    
+    adjacency = graph.graph
+    visited.add(start)
+    preorder = [start]
+    postorder = []
+    stack = [(start, iter(adjacency[start]))]
+    
+    while stack:
+        node, neighbors = stack[-1]
+        for neighbor in neighbors:
+            if neighbor not in visited:
+                visited.add(neighbor)
+                preorder.append(neighbor)
+                stack.append((neighbor, iter(adjacency[neighbor])))
+                break
+        else:
+            # Neighbors exhausted: the call for node returns
+            stack.pop()
+            postorder.append(node)
+    
+    return preorder, postorder
+
+
+def _dfs_iterative_csr(graph, start, visited=None):
+    """
+    dfs_iterative on a CSRGraph.
+    
+    A frame is just a vertex id: cursor[v] is the position of v's next
+    neighbor in targets, so the stack holds one int per vertex on the path.
+    """
+    offsets, targets = graph.offsets, graph.targets
+    if visited is None:
+        visited = bytearray(graph.num_nodes)
+    # A copy: a MappedGraph's offsets are a read-only view of the file
+    cursor = array('q', offsets[:-1])
+    
+    visited[start] = 1
+    preorder = [start]
+    postorder = []
+    stack = [start]
+    
+    while stack:
+        node = stack[-1]
+        position, end = cursor[node], offsets[node + 1]
+        while position < end and visited[targets[position]]:
+            position += 1
+        if position < end:
+            neighbor = targets[position]
+            cursor[node] = position + 1
+            visited[neighbor] = 1
+            preorder.append(neighbor)
+            stack.append(neighbor)
+        else:
+            cursor[node] = end
+            stack.pop()
+            postorder.append(node)
+    
+    return preorder, postorder
+
+
 def find_path_bfs(graph, start, end):
     """
     Find shortest path using BFS
@@ -132,6 +613,351 @@ def find_path_bfs(graph, start, end):
     return None  # No path found
 
 
+class BatchBFS:
+    """
+    Distance queries from many sources against one CSRGraph.
+    
+    The search buffers are allocated once per graph and reset after each
+    query by walking only the vertices the query touched, so a query that
+    reaches k vertices costs O(k + edges scanned), not O(V).
+    
+    - nearest(sources): one BFS seeded with all sources at once, giving the
+      distance to the nearest source and which source that is
+    - distances(sources): one distance array per source, computed 64
+      sources per pass by bit-parallel BFS: bit i of a vertex's mask says
+      source i has reached it, so one scan of an edge advances all 64
+      searches, and a pass costs about (levels x E) instead of 64 x E
+    """
+    
+    WORD = 64
+    # BYTE_BITS[b] lists the set bits of byte b
+    BYTE_BITS = [tuple(i for i in range(8) if b >> i & 1) for b in range(256)]
+    
+    def __init__(self, graph):
+        self.graph = graph
+        n = graph.num_nodes
+        self.distance = array('i', [-1]) * n
+        self.nearest_source = array('i', [-1]) * n
+        self.parent = array('i', [-1]) * n
+        self._reached = []
+        self._seen = [0] * n
+        self._frontier = [0] * n
+        self._next = [0] * n
+    
+    def nearest(self, sources):
+        """
+        Multi-source BFS.
+        
+        The returned arrays are buffers of this object and are overwritten
+        by the next call; copy them to keep them.
+        
+        Returns:
+            (distance, nearest_source) arrays indexed by vertex id, where
+            nearest_source[v] is the index in sources of a closest source
+            (-1 for unreachable vertices)
+        """
+        offsets, targets = self.graph.offsets, self.graph.targets
+        distance, nearest_source, parent = self.distance, self.nearest_source, self.parent
+        for v in self._reached:
+            distance[v] = nearest_source[v] = parent[v] = -1
+        
+        queue = []
+        for i, source in enumerate(sources):
+            source = self.graph.id_of(source)
+            if distance[source] < 0:
+                distance[source] = 0
+                nearest_source[source] = i
+                queue.append(source)
+        
+        for node in queue:
+            next_distance = distance[node] + 1
+            owner = nearest_source[node]
+            for neighbor in targets[offsets[node]:offsets[node + 1]]:
+                if distance[neighbor] < 0:
+                    distance[neighbor] = next_distance
+                    nearest_source[neighbor] = owner
+                    parent[neighbor] = node
+                    queue.append(neighbor)
+        
+        self._reached = queue
+        return distance, nearest_source
+    
+    def path(self, target):
+        """
+        Shortest path from the nearest source to target after nearest().
+        
+        Returns:
+            List of vertex ids from the source to target, or None
+        """
+        target = self.graph.id_of(target)
+        if self.distance[target] < 0:
+            return None
+        path = [target]
+        while self.parent[path[-1]] >= 0:
+            path.append(self.parent[path[-1]])
+        return path[::-1]
+    
+    def distances(self, sources):
+        """
+        Single-source distances from every source, 64 sources per pass.
+        
+        Returns:
+            List of distance arrays in the order of sources, each as bfs
+            returns it for a CSRGraph
+        """
+        ids = [self.graph.id_of(source) for source in sources]
+        result = []
+        for first in range(0, len(ids), self.WORD):
+            result.extend(self._bit_parallel_pass(ids[first:first + self.WORD]))
+        return result
+    
+    def _bit_parallel_pass(self, ids):
+        """Run up to 64 searches together; bit i belongs to ids[i]"""
+        n = self.graph.num_nodes
+        offsets, targets = self.graph.offsets, self.graph.targets
+        seen, frontier, pending = self._seen, self._frontier, self._next
+        out = [array('i', [-1]) * n for _ in ids]
+        # rows[k][b]: output arrays of the sources whose bits are set in
+        # byte b of byte k of a mask, so writing costs one store per bit
+        rows = [[tuple(out[8 * k + i] for i in self.BYTE_BITS[b] if 8 * k + i < len(out))
+                 for b in range(256)] for k in range(self.WORD // 8)]
+        
+        active = []
+        reached = []
+        for i, source in enumerate(ids):
+            if not seen[source]:
+                reached.append(source)
+                active.append(source)
+            seen[source] |= 1 << i
+            frontier[source] |= 1 << i
+            out[i][source] = 0
+        
+        level = 0
+        while active:
+            level += 1
+            next_active = []
+            for u in active:
+                mask = frontier[u]
+                frontier[u] = 0
+                for v in targets[offsets[u]:offsets[u + 1]]:
+                    known = seen[v]
+                    new = mask & ~known
+                    if new:
+                        if not known:
+                            reached.append(v)
+                        if not pending[v]:
+                            next_active.append(v)
+                        # Same level for every u that brings these bits
+                        seen[v] = known | new
+                        pending[v] |= new
+            
+            for v in next_active:
+                bits = frontier[v] = pending[v]
+                pending[v] = 0
+                for k, byte in enumerate(bits.to_bytes(8, 'little')):
+                    if byte:
+                        for row in rows[k][byte]:
+                            row[v] = level
+            active = next_active
+        
+        for v in reached:
+            seen[v] = 0
+        return out
+
+
+def random_edges(num_nodes, num_edges, seed=0):
+    """Generate random (u, v) edges over vertex ids 0..num_nodes-1"""
+    rng = random.Random(seed)
+    for _ in range(num_edges):
+        yield rng.randrange(num_nodes), rng.randrange(num_nodes)
+
+
+def benchmark_csr_graph(sizes=((50000, 250000), (100000, 500000))):
+    """
+    Compare Graph and CSRGraph on random undirected graphs.
+    
+    Edges are streamed from a generator, as from a file, so Graph pays
+    for the int objects it keeps. Graph memory is what tracemalloc sees
+    once it is built; CSR memory is exact (memory_bytes). For a 10M-edge
+    graph:
+        benchmark_csr_graph(sizes=((1000000, 10000000),))
+    """
+    print(f"{'V':<9} {'E':<9} {'Graph (MB)':<12} {'CSR (MB)':<10} {'ratio':<7} "
+          f"{'BFS Graph (ms)':<16} {'BFS CSR (ms)':<14} {'DFS Graph (ms)':<16} {'DFS CSR (ms)':<13}")
+    print("-" * 108)
+    
+    for num_nodes, num_edges in sizes:
+        tracemalloc.start()
+        graph = Graph()
+        for u, v in random_edges(num_nodes, num_edges, seed=num_nodes):
+            graph.add_edge(u, v)
+        graph_mb = tracemalloc.get_traced_memory()[0] / 2**20
+        tracemalloc.stop()
+        
+        csr = CSRGraph.from_edges(num_nodes, random_edges(num_nodes, num_edges, seed=num_nodes))
+        csr_mb = csr.memory_bytes() / 2**20
+        
+        timings = []
+        for traverse in (bfs, dfs):
+            for g in (graph, csr):
+                start = time.perf_counter()
+                traverse(g, 0)
+                timings.append((time.perf_counter() - start) * 1000)
+        
+        distance = bfs(csr, 0)
+        same = bfs(graph, 0) == {v: d for v, d in enumerate(distance) if d >= 0}
+        print(f"{num_nodes:<9} {num_edges:<9} {graph_mb:<12.1f} {csr_mb:<10.1f} "
+              f"{graph_mb / csr_mb:<7.1f} {timings[0]:<16.1f} {timings[1]:<14.1f} "
+              f"{timings[2]:<16.1f} {timings[3]:<13.1f}{'' if same else ' MISMATCH'}")
+    print()
+
+
+def benchmark_bfs_modes(sizes=((100000, 500000), (100000, 2000000)), sources=3):
+    """
+    Time the BFS modes on random undirected CSR graphs, and check them on
+    a directed one, whose bottom-up steps need the transpose.
+    
+    Random graphs have a small diameter, so most vertices sit in two or
+    three middle levels, where bottom-up steps skip most edges. The gain
+    grows with the average degree. For million-node graphs:
+        benchmark_bfs_modes(sizes=((1000000, 5000000), (1000000, 20000000)))
+    """
+    modes = ('queue', 'levels', 'direction-optimizing')
+    print(f"{'V':<9} {'E':<10} " + " ".join(f"{mode + ' (ms)':<26}" for mode in modes) + " speedup")
+    print("-" * 108)
+    
+    cases = [(num_nodes, num_edges, False) for num_nodes, num_edges in sizes]
+    cases.append((sizes[0][0], sizes[0][1], True))
+    for num_nodes, num_edges, directed in cases:
+        csr = CSRGraph.from_edges(num_nodes, random_edges(num_nodes, num_edges, seed=num_nodes),
+                                  directed=directed)
+        expected = [bfs(csr, source) for source in range(sources)]
+        timings = []
+        for mode in modes:
+            best = float('inf')
+            for source in range(sources):
+                start = time.perf_counter()
+                distance = bfs(csr, source, mode=mode)
+                best = min(best, time.perf_counter() - start)
+                if distance != expected[source]:
+                    print(f"  {mode} differs from queue BFS from {source}")
+            timings.append(best)
+        print(f"{num_nodes:<9} {num_edges:<10} " +
+              " ".join(f"{t * 1000:<26.1f}" for t in timings) + f" {timings[0] / timings[2]:.1f}x"
+              + (" (directed)" if directed else ""))
+    print()
+
+
+def benchmark_batch_bfs(num_nodes=100000, num_edges=500000, num_sources=64):
+    """
+    Compare one bfs call per source with the BatchBFS queries.
+    
+    The bit-parallel pass still writes num_sources x V distances, so its
+    gain over separate searches is bounded by that output, not by the
+    edge scans it saves.
+    """
+    csr = CSRGraph.from_edges(num_nodes, random_edges(num_nodes, num_edges, seed=num_nodes))
+    sources = random.Random(0).sample(range(num_nodes), num_sources)
+    batch = BatchBFS(csr)
+    
+    start = time.perf_counter()
+    expected = [bfs(csr, source) for source in sources]
+    separate = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    vectors = batch.distances(sources)
+    parallel = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    distance, _ = batch.nearest(sources)
+    multi = time.perf_counter() - start
+    
+    same_vectors = vectors == expected
+    # -1 marks a source that cannot reach the vertex
+    same_nearest = list(distance) == [min((d for d in column if d >= 0), default=-1)
+                                      for column in zip(*expected)]
+    print(f"{num_sources} sources on V = {num_nodes}, E = {num_edges}:")
+    print(f"  {'separate bfs calls':<30} {separate * 1000:>9.1f} ms")
+    print(f"  {'bit-parallel distances':<30} {parallel * 1000:>9.1f} ms "
+          f"({separate / parallel:.1f}x, same: {same_vectors})")
+    print(f"  {'multi-source nearest':<30} {multi * 1000:>9.1f} ms (same as min: {same_nearest})")
+    print()
+
+
+def benchmark_deep_dfs(lengths=(500, 100000, 1000000)):
+    """
+    Depth-first search down a path graph, where the DFS stack is as deep
+    as the graph is long.
+    
+    dfs_recursive stops at the recursion limit; the iterative versions
+    only need memory for the frames.
+    """
+    print(f"{'length':<10} {'recursive':<22} {'iterative (ms)':<16} {'CSR (ms)':<10}")
+    print("-" * 60)
+    
+    for length in lengths:
+        graph = Graph()
+        for node in range(length - 1):
+            graph.add_edge(node, node + 1)
+        csr = CSRGraph.from_graph(graph)
+        
+        try:
+            start = time.perf_counter()
+            dfs_recursive(graph, 0)
+            recursive = f"{(time.perf_counter() - start) * 1000:.1f} ms"
+        except RecursionError:
+            recursive = "RecursionError"
+        
+        start = time.perf_counter()
+        preorder, postorder = dfs_iterative(graph, 0)
+        iterative_ms = (time.perf_counter() - start) * 1000
+        assert preorder == list(range(length)) and postorder == preorder[::-1]
+        
+        start = time.perf_counter()
+        dfs_iterative(csr, 0)
+        csr_ms = (time.perf_counter() - start) * 1000
+        
+        print(f"{length:<10} {recursive:<22} {iterative_ms:<16.1f} {csr_ms:<10.1f}")
+    print()
+
+
+def benchmark_mapped_graph(num_nodes=200000, num_edges=2000000):
+    """
+    Write a random graph file once, then compare opening it with building
+    a CSRGraph in memory, and traversing either.
+    """
+    path = os.path.join(tempfile.mkdtemp(), 'random.graph')
+    
+    start = time.perf_counter()
+    write_graph(path, num_nodes, random_edges(num_nodes, num_edges))
+    write_ms = (time.perf_counter() - start) * 1000
+    
+    start = time.perf_counter()
+    csr = CSRGraph.from_edges(num_nodes, random_edges(num_nodes, num_edges))
+    build_ms = (time.perf_counter() - start) * 1000
+    
+    start = time.perf_counter()
+    mapped = MappedGraph(path)
+    open_ms = (time.perf_counter() - start) * 1000
+    
+    print(f"Random graph with {num_nodes} vertices and {num_edges} edges "
+          f"({os.path.getsize(path) / 2**20:.1f} MB file, written in {write_ms:.0f} ms):")
+    print(f"{'graph':<12} {'load (ms)':<11} {'BFS (ms)':<10} {'DFS (ms)':<10}")
+    print("-" * 43)
+    for label, g, load_ms in (("CSRGraph", csr, build_ms), ("MappedGraph", mapped, open_ms)):
+        timings = []
+        for traverse in (bfs, dfs):
+            start = time.perf_counter()
+            traverse(g, 0)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"{label:<12} {load_ms:<11.2f} {timings[0]:<10.1f} {timings[1]:<10.1f}")
+    print(f"Same BFS distances: {bfs(mapped, 0) == bfs(csr, 0)}")
+    
+    mapped.close()
+    os.remove(path)
+    os.rmdir(os.path.dirname(path))
+
+
 def demonstrate_traversal():
     """Demonstrate BFS and DFS algorithms"""
     print("=" * 70)
@@ -167,6 +993,11 @@ def demonstrate_traversal():
     visited_rec = dfs_recursive(g1, 0)
     print(f"  Visited nodes: {sorted(visited_rec)}")
     
+    print("\nDFS (explicit stack frames) starting from 0:")
+    preorder, postorder = dfs_iterative(g1, 0)
+    print(f"  Discovery order: {preorder}")
+    print(f"  Finishing order: {postorder}")
+    
     # Example 2: Path finding
     print("\n\nExample 2: Shortest Path Finding")
     print("-" * 70)
@@ -203,6 +1034,63 @@ def demonstrate_traversal():
     for node in sorted(distances.keys()):
         print(f"  Node {node}: distance {distances[node]}")
     
+    # Example 4: Compressed sparse row graphs
+    print("\n\nExample 4: CSR Graph")
+    print("-" * 70)
+    
+    csr = CSRGraph.from_graph(g2)
+    distance = bfs(csr, 'A')
+    print("BFS from A on the CSR form of Example 2:")
+    print("  " + ", ".join(f"{csr.nodes[v]}: {d}" for v, d in enumerate(distance)))
+    print(f"  Same as on the Graph: {bfs(g2, 'A') == dict(zip(csr.nodes, distance))}")
+    print()
+    benchmark_csr_graph()
+    
+    print("BFS modes on CSR graphs (best of 3 sources):")
+    benchmark_bfs_modes()
+    
+    # Example 5: Many sources against the same graph
+    print("\nExample 5: Batched BFS Queries")
+    print("-" * 70)
+    
+    csr = CSRGraph.from_graph(g3)
+    batch = BatchBFS(csr)
+    distance, _ = batch.nearest([1, 9])
+    print("Nearest of sources 1 and 9 in Example 3:")
+    for v in sorted(range(csr.num_nodes), key=csr.nodes.__getitem__):
+        route = " -> ".join(str(csr.nodes[u]) for u in batch.path(csr.nodes[v]))
+        print(f"  Node {csr.nodes[v]}: distance {distance[v]} via {route}")
+    vectors = batch.distances([1, 9])
+    print(f"  Per-source vectors match bfs: "
+          f"{all(vector == bfs(csr, s) for vector, s in zip(vectors, [1, 9]))}")
+    print()
+    benchmark_batch_bfs()
+    
+    # Example 6: Deep paths
+    print("\nExample 6: DFS on Long Chains")
+    print("-" * 70)
+    benchmark_deep_dfs()
+    
+    # Example 7: Graphs larger than memory
+    print("\nExample 7: Memory-Mapped Graph Files")
+    print("-" * 70)
+    
+    path = os.path.join(tempfile.mkdtemp(), 'example3.graph')
+    csr = CSRGraph.from_graph(g3)
+    write_graph(path, csr.num_nodes,
+                ((u, v) for u in range(csr.num_nodes) for v in csr.neighbors(u) if u < v))
+    with MappedGraph(path) as mapped:
+        distance = bfs(mapped, csr.id_of(1))
+        print(f"Example 3 from {os.path.getsize(path)} bytes on disk, BFS from node 1:")
+        print("  " + ", ".join(f"{csr.nodes[v]}: {d}" for v, d in enumerate(distance)))
+        preorder, _ = dfs_iterative(mapped, csr.id_of(1))
+        print(f"DFS from node 1: {[csr.nodes[v] for v in preorder]}")
+        print(f"Same DFS as the CSRGraph: {preorder == dfs_iterative(csr, 1)[0]}")
+    os.remove(path)
+    os.rmdir(os.path.dirname(path))
+    print()
+    benchmark_mapped_graph()
+    
     print("\n" + "=" * 70)
     print("Key Differences:")
     print("=" * 70)
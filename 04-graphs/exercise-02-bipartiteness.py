@@ -3,7 +3,11 @@ Exercise 2: Bipartite Graph Detection
 Determines if a graph is bipartite using BFS/DFS coloring
 """
 
+import random
+import time
+from array import array
 from collections import deque, defaultdict
+from itertools import accumulate
 
 
 class Graph:
@@ -18,6 +22,83 @@ class Graph:
         self.graph[v].append(u)
 
 
+class CSRGraph:
+    """Compressed sparse row graph over vertex ids 0..n-1 (from exercise 1)"""
+    
+    def __init__(self, offsets, targets, nodes=None):
+        self.num_nodes = len(offsets) - 1
+        self.offsets = offsets
+        self.targets = targets
+        self.nodes = range(self.num_nodes) if nodes is None else nodes
+        self.node_id = None if nodes is None else {node: i for i, node in enumerate(nodes)}
+    
+    @classmethod
+    def from_edges(cls, num_nodes, edges, directed=False):
+        """
+        Build from (u, v) pairs of vertex ids with a counting sort.
+        
+        Neighbors keep the order in which their edges were given.
+        
+        Time Complexity: O(V + E)
+        """
+        heads = array('i')
+        tails = array('i')
+        for u, v in edges:
+            heads.append(u)
+            tails.append(v)
+            if not directed:
+                heads.append(v)
+                tails.append(u)
+        
+        degree = array('q', [0]) * (num_nodes + 1)
+        for u in heads:
+            degree[u + 1] += 1
+        offsets = array('q', accumulate(degree))
+        
+        targets = array('i', [0]) * len(heads)
+        position = offsets[:-1]
+        for u, v in zip(heads, tails):
+            targets[position[u]] = v
+            position[u] += 1
+        return cls(offsets, targets)
+    
+    @classmethod
+    def from_graph(cls, graph):
+        """
+        Build from a Graph, numbering nodes in order of first appearance.
+        
+        Neighbor order is kept, so traversals visit nodes in the same order
+        as on the Graph.
+        """
+        adjacency = graph.graph
+        node_id = {}
+        for node, neighbors in adjacency.items():
+            node_id.setdefault(node, len(node_id))
+            for neighbor in neighbors:
+                node_id.setdefault(neighbor, len(node_id))
+        nodes = list(node_id)
+        
+        offsets = array('q', [0])
+        offsets.extend(accumulate(len(adjacency.get(node, ())) for node in nodes))
+        targets = array('i')
+        for node in nodes:
+            targets.fromlist(list(map(node_id.__getitem__, adjacency.get(node, ()))))
+        return cls(offsets, targets, nodes)
+    
+    def id_of(self, node):
+        """Vertex id of an original node"""
+        return node if self.node_id is None else self.node_id[node]
+    
+    def neighbors(self, v):
+        """Neighbor ids of vertex v"""
+        return self.targets[self.offsets[v]:self.offsets[v + 1]]
+    
+    def memory_bytes(self):
+        """Bytes used by the offset and target arrays"""
+        return (self.offsets.itemsize * len(self.offsets) +
+                self.targets.itemsize * len(self.targets))
+
+
 def is_bipartite_bfs(graph, start):
     """
     Check if graph is bipartite using BFS (2-coloring)
@@ -29,46 +110,285 @@ def is_bipartite_bfs(graph, start):
     Space Complexity: O(V)
     
     Returns:
-        Tuple (is_bipartite, coloring_dict)
+        Tuple (is_bipartite, coloring_dict); for a CSRGraph the coloring is
+        an array indexed by vertex id with -1 for uncolored vertices
     """
+    if isinstance(graph, CSRGraph):
+        return _is_bipartite_csr(graph, graph.id_of(start))
+    
     color = {}
-    queue = deque([start])
-    color[start] = 0  # Color 0 or 1
     
-    while queue:
-        node = queue.popleft()
+    # The start component first, then every other component
+    for root in [start] + list(graph.graph):
+        if root in color:
+            continue
+        queue = deque([root])
+        color[root] = 0  # Color 0 or 1
         
-        for neighbor in graph.graph[node]:
-            if neighbor not in color:
-                # Color neighbor with opposite color
-                color[neighbor] = 1 - color[node]
-                queue.append(neighbor)
-            elif color[neighbor] == color[node]:
-                # Found edge between same-colored vertices
-                return False, color
-    
-    # Check all components
-    for node in graph.graph:
-        if node not in color:
-            # New component, start BFS from here
-            queue = deque([node])
-            color[node] = 0
+        while queue:
+            node = queue.popleft()
             
-            while queue:
-                current = queue.popleft()
-                for neighbor in graph.graph[current]:
-                    if neighbor not in color:
-                        color[neighbor] = 1 - color[current]
-                        queue.append(neighbor)
-                    elif color[neighbor] == color[current]:
-                        return False, color
+            for neighbor in graph.graph[node]:
+                if neighbor not in color:
+                    # Color neighbor with opposite color
+                    color[neighbor] = 1 - color[node]
+                    queue.append(neighbor)
+                elif color[neighbor] == color[node]:
+                    # Found edge between same-colored vertices
+                    return False, color
+    
+    return True, color
+
+
+def _is_bipartite_csr(graph, start):
+    """is_bipartite_bfs on a CSRGraph: the start component first, then the rest"""
+    offsets, targets = graph.offsets, graph.targets
+    color = array('b', [-1]) * graph.num_nodes
+    
+    for root in [start] + list(range(graph.num_nodes)):
+        if color[root] >= 0:
+            continue
+        color[root] = 0
+        queue = [root]
+        
+        for node in queue:
+            other = 1 - color[node]
+            for neighbor in targets[offsets[node]:offsets[node + 1]]:
+                if color[neighbor] < 0:
+                    color[neighbor] = other
+                    queue.append(neighbor)
+                elif color[neighbor] != other:
+                    return False, color
     
     return True, color
 
 
+def bipartition(graph):
+    """
+    Two-color every component in one pass, or prove that no coloring exists.
+    
+    An edge between two vertices of the same color closes an odd cycle
+    through their lowest common ancestor in the BFS forest: both tree
+    paths to it have lengths of the same parity, so together with the
+    edge they have odd length. That cycle is returned as a certificate
+    that can be checked without trusting this function.
+    
+    Time Complexity: O(V + E)
+    Space Complexity: O(V)
+    
+    Returns:
+        Tuple (True, color) with a color (0 or 1) for every vertex, or
+        (False, cycle) with an odd cycle [v0, v1, ..., vk] whose
+        consecutive vertices, and vk and v0, are adjacent; for a CSRGraph
+        the color is an array indexed by vertex id and the cycle holds ids
+    """
+    if isinstance(graph, CSRGraph):
+        return _bipartition_csr(graph)
+    
+    csr = CSRGraph.from_graph(graph)
+    is_bip, result = _bipartition_csr(csr)
+    if is_bip:
+        return True, dict(zip(csr.nodes, result))
+    return False, [csr.nodes[v] for v in result]
+
+
+def _bipartition_csr(graph):
+    """bipartition on a CSRGraph, with BFS parents kept for the certificate"""
+    offsets, targets = graph.offsets, graph.targets
+    color = array('b', [-1]) * graph.num_nodes
+    parent = array('i', [-1]) * graph.num_nodes
+    
+    for root in range(graph.num_nodes):
+        if color[root] >= 0:
+            continue
+        color[root] = 0
+        queue = [root]
+        
+        for node in queue:
+            other = 1 - color[node]
+            for neighbor in targets[offsets[node]:offsets[node + 1]]:
+                if color[neighbor] < 0:
+                    color[neighbor] = other
+                    parent[neighbor] = node
+                    queue.append(neighbor)
+                elif color[neighbor] != other:
+                    return False, _odd_cycle(parent, node, neighbor)
+    
+    return True, color
+
+
+def _odd_cycle(parent, u, w):
+    """
+    Cycle through the tree paths from u and w to their lowest common
+    ancestor, closed by the edge w - u.
+    """
+    up = [u]
+    while parent[up[-1]] >= 0:
+        up.append(parent[up[-1]])
+    depth = {node: i for i, node in enumerate(up)}
+    
+    down = [w]
+    while down[-1] not in depth:
+        down.append(parent[down[-1]])
+    return up[:depth[down[-1]]] + down[::-1]
+
+
+class ParityUnionFind:
+    """
+    Disjoint sets over ids 0..n-1 that also track which side of a
+    bipartition every element is on, relative to its set's root.
+    
+    Each element stores the parity of the path to its parent; find
+    compresses the path and folds those parities into one. Joining two
+    elements by an edge puts them on opposite sides, so an edge inside
+    a set whose endpoints have equal parity closes an odd cycle.
+    
+    Time Complexity: O(α(n)) amortized per operation (union by size,
+        path compression)
+    
+    Attributes:
+        parent: int32 array of parent ids
+        parity: int8 array, side relative to the parent
+        size: int32 array, only meaningful at roots
+    """
+    
+    def __init__(self, n=0):
+        self.parent = array('i', range(n))
+        self.parity = array('b', [0]) * n
+        self.size = array('i', [1]) * n
+    
+    def __len__(self):
+        return len(self.parent)
+    
+    def add(self):
+        """Add a singleton set and return its id"""
+        element = len(self.parent)
+        self.parent.append(element)
+        self.parity.append(0)
+        self.size.append(1)
+        return element
+    
+    def find(self, x):
+        """
+        Root of x's set and the side of x relative to it (0 or 1).
+        """
+        parent, parity = self.parent, self.parity
+        path = []
+        while parent[x] != x:
+            path.append(x)
+            x = parent[x]
+        side = 0
+        for node in reversed(path):
+            side ^= parity[node]
+            parity[node] = side
+            parent[node] = x
+        return x, side
+    
+    def union(self, x, y):
+        """
+        Put x and y on opposite sides.
+        
+        Returns:
+            False if that contradicts earlier unions (x and y are already
+            known to be on the same side), True otherwise
+        """
+        (x, x_side), (y, y_side) = self.find(x), self.find(y)
+        if x == y:
+            return x_side != y_side
+        if self.size[x] < self.size[y]:
+            x, y = y, x
+        self.parent[y] = x
+        self.parity[y] = x_side ^ y_side ^ 1
+        self.size[x] += self.size[y]
+        return True
+    
+    def colors(self):
+        """Side of every element relative to its root, as an int8 array"""
+        return array('b', (self.find(x)[1] for x in range(len(self.parent))))
+
+
+def bipartite_stream(edges, num_nodes=None):
+    """
+    Check bipartiteness of an edge stream without building the adjacency.
+    
+    The edges are read once into a ParityUnionFind. Only the edges that
+    merged two sets are kept, a spanning forest of at most V - 1 edges,
+    so that a conflicting edge can be turned into an odd cycle: the
+    forest path between its endpoints has even length.
+    
+    Args:
+        edges: Iterable of (u, v) pairs
+        num_nodes: If given, nodes are the ids 0..num_nodes-1 and no
+            node dictionary is built
+    
+    Time Complexity: O(E α(V))
+    Space Complexity: O(V)
+    
+    Returns:
+        Tuple (True, color) or (False, cycle) as bipartition returns; the
+        color is an int8 array when num_nodes is given, a dictionary
+        otherwise
+    """
+    sides = ParityUnionFind(num_nodes or 0)
+    node_id = None if num_nodes is not None else {}
+    forest = array('i')
+    
+    for u, v in edges:
+        if node_id is not None:
+            u = node_id[u] if u in node_id else node_id.setdefault(u, sides.add())
+            v = node_id[v] if v in node_id else node_id.setdefault(v, sides.add())
+        (u_root, u_side), (v_root, v_side) = sides.find(u), sides.find(v)
+        if u_root != v_root:
+            sides.union(u, v)
+            forest.append(u)
+            forest.append(v)
+        elif u_side == v_side:
+            cycle = _forest_path(forest, v, u)
+            if node_id is not None:
+                nodes = list(node_id)
+                cycle = [nodes[x] for x in cycle]
+            return False, cycle
+    
+    color = sides.colors()
+    if node_id is None:
+        return True, color
+    return True, dict(zip(node_id, color))
+
+
+def _forest_path(forest, source, target):
+    """Path from source to target in a forest given as a flat edge array"""
+    adjacency = defaultdict(list)
+    for i in range(0, len(forest), 2):
+        adjacency[forest[i]].append(forest[i + 1])
+        adjacency[forest[i + 1]].append(forest[i])
+    
+    parent = {source: None}
+    queue = [source]
+    for node in queue:
+        if node == target:
+            break
+        for neighbor in adjacency[node]:
+            if neighbor not in parent:
+                parent[neighbor] = node
+                queue.append(neighbor)
+    
+    path = [target]
+    while parent[path[-1]] is not None:
+        path.append(parent[path[-1]])
+    return path[::-1]
+
+
 def is_bipartite_dfs(graph, start, color=None, current_color=0):
     """
-    Check if graph is bipartite using DFS (recursive)
+    Check if graph is bipartite using DFS
+    
+    Runs on an explicit stack of (node, neighbor iterator) frames, in the
+    order of the recursive formulation (color a neighbor, descend, resume
+    the parent's neighbors), so it stops at the same conflict with the
+    same partial coloring, but is not limited by the recursion depth.
+    
+    Time Complexity: O(V + E)
+    Space Complexity: O(V) for the stack
     
     Returns:
         Tuple (is_bipartite, coloring_dict)
@@ -76,19 +396,108 @@ def is_bipartite_dfs(graph, start, color=None, current_color=0):
     if color is None:
         color = {}
     
+    adjacency = graph.graph
     color[start] = current_color
+    stack = [(start, iter(adjacency[start]))]
     
-    for neighbor in graph.graph[start]:
-        if neighbor not in color:
-            is_bip, _ = is_bipartite_dfs(graph, neighbor, color, 1 - current_color)
-            if not is_bip:
+    while stack:
+        node, neighbors = stack[-1]
+        node_color = color[node]
+        for neighbor in neighbors:
+            if neighbor not in color:
+                color[neighbor] = 1 - node_color
+                stack.append((neighbor, iter(adjacency[neighbor])))
+                break
+            if color[neighbor] == node_color:
                 return False, color
-        elif color[neighbor] == current_color:
-            return False, color
+        else:
+            stack.pop()
     
     return True, color
 
 
+def benchmark_csr_bipartite(num_nodes=200000, num_edges=1000000, seed=0):
+    """
+    Time is_bipartite_bfs on a Graph and on its CSRGraph form.
+    
+    Edges join the even and the odd vertices, so the whole graph has to
+    be colored before the answer is known.
+    """
+    rng = random.Random(seed)
+    half = num_nodes // 2
+    edges = [(2 * rng.randrange(half), 2 * rng.randrange(half) + 1) for _ in range(num_edges)]
+    
+    graph = Graph()
+    for u, v in edges:
+        graph.add_edge(u, v)
+    csr = CSRGraph.from_edges(num_nodes, edges)
+    
+    print(f"Random bipartite graph with {num_nodes} vertices and {num_edges} edges:")
+    print(f"{'graph':<8} {'time (ms)':<11} {'bipartite':<10}")
+    print("-" * 30)
+    for label, g in (("Graph", graph), ("CSR", csr)):
+        start = time.perf_counter()
+        is_bip, _ = is_bipartite_bfs(g, 0)
+        print(f"{label:<8} {(time.perf_counter() - start) * 1000:<11.1f} {str(is_bip):<10}")
+
+
+def benchmark_deep_bipartite_dfs(length=1000000):
+    """Color a path graph of the given length with is_bipartite_dfs"""
+    graph = Graph()
+    for node in range(length - 1):
+        graph.add_edge(node, node + 1)
+    
+    start = time.perf_counter()
+    is_bip, color = is_bipartite_dfs(graph, 0)
+    elapsed = time.perf_counter() - start
+    print(f"Path of {length} vertices: bipartite = {is_bip}, "
+          f"{len(color)} vertices colored in {elapsed * 1000:.1f} ms")
+
+
+def benchmark_bipartition(num_nodes=200000, num_edges=1000000, seed=0):
+    """
+    Compare the BFS coloring, the single-pass CSR engine and the edge
+    stream check, on a bipartite graph and with one odd edge appended.
+    """
+    half = num_nodes // 2
+    
+    def stream(odd):
+        rng = random.Random(seed)
+        for _ in range(num_edges):
+            yield 2 * rng.randrange(half), 2 * rng.randrange(half) + 1
+        if odd:
+            yield 0, 2
+    
+    print(f"Random bipartite graph with {num_nodes} vertices and {num_edges} edges:")
+    print(f"{'odd edge':<10} {'method':<24} {'time (ms)':<11} {'result':<22}")
+    print("-" * 67)
+    for odd in (False, True):
+        graph = Graph()
+        for u, v in stream(odd):
+            graph.add_edge(u, v)
+        csr = CSRGraph.from_edges(num_nodes, stream(odd))
+        
+        for name, check in (
+                ("is_bipartite_bfs", lambda: is_bipartite_bfs(graph, 0)),
+                ("bipartition (CSR)", lambda: bipartition(csr)),
+                ("bipartite_stream", lambda: bipartite_stream(stream(odd), num_nodes))):
+            start = time.perf_counter()
+            is_bip, result = check()
+            elapsed = time.perf_counter() - start
+            if is_bip:
+                outcome = "bipartite"
+            elif isinstance(result, dict):
+                outcome = "not bipartite"
+            else:
+                outcome = f"odd cycle of {len(result)}"
+            print(f"{str(odd):<10} {name:<24} {elapsed * 1000:<11.1f} {outcome:<22}")
+    
+    # parent, parity and size arrays plus the forest of at most V - 1 edges
+    stream_bytes = num_nodes * (4 + 1 + 4) + 2 * 4 * (num_nodes - 1)
+    print(f"Memory: CSR arrays {csr.memory_bytes() / 2**20:.1f} MB, "
+          f"stream state at most {stream_bytes / 2**20:.1f} MB")
+
+
 def demonstrate_bipartiteness():
     """Demonstrate bipartite graph detection"""
     print("=" * 70)
@@ -193,6 +602,36 @@ def demonstrate_bipartiteness():
     is_bip, coloring = is_bipartite_bfs(g5, 0)
     print(f"Is bipartite: {is_bip}")
     
+    # Example 6: Compressed sparse row graphs
+    print("\n\nExample 6: CSR Graph")
+    print("-" * 70)
+    
+    for label, g, start in (("Example 3", g3, 'A'), ("Example 5", g5, 0)):
+        csr = CSRGraph.from_graph(g)
+        is_bip, coloring = is_bipartite_bfs(csr, start)
+        print(f"{label} as a CSR graph: bipartite = {is_bip}, "
+              f"colors = {dict(zip(csr.nodes, coloring))}")
+    print()
+    benchmark_csr_bipartite()
+    
+    # Example 7: DFS coloring without recursion limits
+    print("\n\nExample 7: DFS Coloring of a Long Path")
+    print("-" * 70)
+    print(f"Example 5 with DFS: bipartite = {is_bipartite_dfs(g5, 3)[0]}")
+    benchmark_deep_bipartite_dfs()
+    
+    # Example 8: Odd cycle certificates
+    print("\n\nExample 8: Odd Cycle Certificates")
+    print("-" * 70)
+    
+    for label, g in (("Example 1", g1), ("Example 2", g2), ("Example 5", g5)):
+        is_bip, result = bipartition(g)
+        print(f"{label}: " + ("bipartite" if is_bip else f"odd cycle {' - '.join(map(str, result))}"))
+    is_bip, result = bipartite_stream([(0, 1), (1, 2), (2, 3), (3, 4), (4, 0)])
+    print(f"Edge stream of a 5-cycle: odd cycle {' - '.join(map(str, result))}")
+    print()
+    benchmark_bipartition()
+    
     print("\n" + "=" * 70)
     print("Key Properties:")
     print("=" * 70)
@@ -201,6 +640,7 @@ def demonstrate_bipartiteness():
     print("3. Even-length cycles are bipartite")
     print("4. Odd-length cycles are NOT bipartite")
     print("5. Can be checked in O(V + E) time using BFS/DFS")
+    print("6. An odd cycle is a checkable certificate that a graph is not bipartite")
 
 
 if __name__ == "__main__":
@@ -3,7 +3,13 @@ Exercise 3: Topological Ordering
 Finds topological order of a directed acyclic graph (DAG)
 """
 
-from collections import deque, defaultdict
+import random
+import time
+from array import array
+from collections import Counter, deque, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import accumulate
 
 
 class Graph:
@@ -28,6 +34,83 @@ class Graph:
         return nodes
 
 
+class CSRGraph:
+    """Compressed sparse row graph over vertex ids 0..n-1 (from exercise 1)"""
+    
+    def __init__(self, offsets, targets, nodes=None):
+        self.num_nodes = len(offsets) - 1
+        self.offsets = offsets
+        self.targets = targets
+        self.nodes = range(self.num_nodes) if nodes is None else nodes
+        self.node_id = None if nodes is None else {node: i for i, node in enumerate(nodes)}
+    
+    @classmethod
+    def from_edges(cls, num_nodes, edges, directed=False):
+        """
+        Build from (u, v) pairs of vertex ids with a counting sort.
+        
+        Neighbors keep the order in which their edges were given.
+        
+        Time Complexity: O(V + E)
+        """
+        heads = array('i')
+        tails = array('i')
+        for u, v in edges:
+            heads.append(u)
+            tails.append(v)
+            if not directed:
+                heads.append(v)
+                tails.append(u)
+        
+        degree = array('q', [0]) * (num_nodes + 1)
+        for u in heads:
+            degree[u + 1] += 1
+        offsets = array('q', accumulate(degree))
+        
+        targets = array('i', [0]) * len(heads)
+        position = offsets[:-1]
+        for u, v in zip(heads, tails):
+            targets[position[u]] = v
+            position[u] += 1
+        return cls(offsets, targets)
+    
+    @classmethod
+    def from_graph(cls, graph):
+        """
+        Build from a Graph, numbering nodes in order of first appearance.
+        
+        Neighbor order is kept, so traversals visit nodes in the same order
+        as on the Graph.
+        """
+        adjacency = graph.graph
+        node_id = {}
+        for node, neighbors in adjacency.items():
+            node_id.setdefault(node, len(node_id))
+            for neighbor in neighbors:
+                node_id.setdefault(neighbor, len(node_id))
+        nodes = list(node_id)
+        
+        offsets = array('q', [0])
+        offsets.extend(accumulate(len(adjacency.get(node, ())) for node in nodes))
+        targets = array('i')
+        for node in nodes:
+            targets.fromlist(list(map(node_id.__getitem__, adjacency.get(node, ()))))
+        return cls(offsets, targets, nodes)
+    
+    def id_of(self, node):
+        """Vertex id of an original node"""
+        return node if self.node_id is None else self.node_id[node]
+    
+    def neighbors(self, v):
+        """Neighbor ids of vertex v"""
+        return self.targets[self.offsets[v]:self.offsets[v + 1]]
+    
+    def memory_bytes(self):
+        """Bytes used by the offset and target arrays"""
+        return (self.offsets.itemsize * len(self.offsets) +
+                self.targets.itemsize * len(self.targets))
+
+
 def topological_sort_kahn(graph):
     """
     Topological sort using Kahn's algorithm (BFS-based)
@@ -36,8 +119,12 @@ def topological_sort_kahn(graph):
     Space Complexity: O(V)
     
     Returns:
-        List representing topological order, or None if cycle exists
+        List representing topological order, or None if cycle exists; for
+        a CSRGraph (built with directed=True) the order is of vertex ids
     """
+    if isinstance(graph, CSRGraph):
+        return _topological_sort_kahn_csr(graph)
+    
     in_degree = graph.in_degree.copy()
     all_nodes = graph.get_all_nodes()
     
@@ -67,45 +154,734 @@ def topological_sort_kahn(graph):
         return None  # Cycle exists
 
 
+def _topological_sort_kahn_csr(graph):
+    """Kahn's algorithm on a CSRGraph, with in-degrees counted from the targets"""
+    offsets, targets = graph.offsets, graph.targets
+    in_degree = array('i', [0]) * graph.num_nodes
+    for node in targets:
+        in_degree[node] += 1
+    
+    order = [node for node in range(graph.num_nodes) if in_degree[node] == 0]
+    # The order list is also the queue: nodes are appended once their
+    # last incoming edge is removed
+    for node in order:
+        for neighbor in targets[offsets[node]:offsets[node + 1]]:
+            in_degree[neighbor] -= 1
+            if in_degree[neighbor] == 0:
+                order.append(neighbor)
+    
+    return order if len(order) == graph.num_nodes else None
+
+
+def topological_waves(graph):
+    """
+    Kahn's algorithm level by level: each wave holds the nodes whose
+    in-degree reaches zero together, so the nodes of one wave never depend
+    on each other and can run in parallel.
+    
+    The waves are the antichains of the longest-path layering: a node's
+    wave is the number of nodes on the longest dependency chain ending at
+    it, minus one, so the number of waves is the critical-path length.
+    
+    Time Complexity: O(V + E)
+    Space Complexity: O(V)
+    
+    Returns:
+        List of waves (lists of nodes), or None if a cycle exists; for a
+        CSRGraph the waves hold vertex ids
+    """
+    if isinstance(graph, CSRGraph):
+        return _topological_waves_csr(graph)
+    
+    csr = CSRGraph.from_graph(graph)
+    waves = _topological_waves_csr(csr)
+    if waves is None:
+        return None
+    return [[csr.nodes[v] for v in wave] for wave in waves]
+
+
+def _topological_waves_csr(graph):
+    """
+    Wave-by-wave Kahn on a CSRGraph.
+    
+    The targets of a whole wave are gathered into one array and counted,
+    so every in-degree is decremented once per wave by the number of
+    edges it lost, instead of once per edge. That pays off when many
+    edges of a wave share targets (wide task graphs); on sparse graphs
+    where most counts are 1 the counting costs a little extra.
+    """
+    offsets, targets = graph.offsets, graph.targets
+    in_degree = array('i', [0]) * graph.num_nodes
+    for node in targets:
+        in_degree[node] += 1
+    
+    wave = [node for node in range(graph.num_nodes) if in_degree[node] == 0]
+    waves = []
+    done = 0
+    while wave:
+        waves.append(wave)
+        done += len(wave)
+        hits = array('i')
+        for node in wave:
+            hits.extend(targets[offsets[node]:offsets[node + 1]])
+        wave = []
+        for node, count in Counter(hits).items():
+            in_degree[node] -= count
+            if in_degree[node] == 0:
+                wave.append(node)
+    
+    return waves if done == graph.num_nodes else None
+
+
+def _timed_call(task):
+    """Run a task and measure it inside the worker"""
+    start = time.perf_counter()
+    result = task()
+    return result, time.perf_counter() - start
+
+
+def execute_waves(graph, tasks, executor=None, max_workers=None):
+    """
+    Run tasks wave by wave on an executor, respecting the dependencies.
+    
+    Every wave from topological_waves is submitted at once and waited for
+    before the next one starts. Any concurrent.futures executor works;
+    with a ProcessPoolExecutor the tasks must be picklable (module-level
+    functions or functools.partial objects).
+    
+    Args:
+        graph: Graph whose edges u -> v mean u must finish before v starts
+        tasks: Dictionary mapping nodes to callables taking no arguments;
+            nodes without a task are scheduled but do nothing, tasks for
+            nodes not in the graph run in the first wave
+        executor: Executor to submit to; a ThreadPoolExecutor with
+            max_workers threads is created (and shut down) if None
+        max_workers: Size of the thread pool created when executor is None
+    
+    Returns:
+        Dictionary with:
+            results: node -> return value of its task
+            waves: List of waves (lists of nodes)
+            wave_seconds: Wall time of each wave
+            total_seconds: Wall time of the whole run
+            busy_seconds: Sum of the task durations
+            critical_path: Longest chain of nodes by summed task duration
+            critical_path_seconds: Its summed duration, a lower bound on
+                total_seconds for any number of workers
+    
+    Raises:
+        CycleError: If the graph has a cycle; no task is run
+    """
+    csr = CSRGraph.from_graph(graph)
+    waves = _topological_waves_csr(csr)
+    if waves is None:
+        raise CycleError(find_cycles(graph)[0])
+    waves = [[csr.nodes[v] for v in wave] for wave in waves]
+    extra = [node for node in tasks if node not in csr.node_id]
+    if extra:
+        if waves:
+            waves[0].extend(extra)
+        else:
+            waves.append(extra)
+    
+    owned = executor is None
+    if owned:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+    
+    results = {}
+    duration = {}
+    wave_seconds = []
+    try:
+        run_start = time.perf_counter()
+        for wave in waves:
+            start = time.perf_counter()
+            futures = [(node, executor.submit(_timed_call, tasks[node]))
+                       for node in wave if node in tasks]
+            for node, future in futures:
+                results[node], duration[node] = future.result()
+            wave_seconds.append(time.perf_counter() - start)
+        total_seconds = time.perf_counter() - run_start
+    finally:
+        if owned:
+            executor.shutdown()
+    
+    # Longest path by duration, relaxing edges in wave order
+    finish = {}
+    previous = {}
+    for wave in waves:
+        for node in wave:
+            finish[node] = finish.get(node, 0.0) + duration.get(node, 0.0)
+            for neighbor in graph.graph.get(node, ()):
+                if finish[node] > finish.get(neighbor, 0.0):
+                    finish[neighbor] = finish[node]
+                    previous[neighbor] = node
+    
+    critical_path = []
+    if finish:
+        node = max(finish, key=finish.get)
+        while node is not None:
+            critical_path.append(node)
+            node = previous.get(node)
+        critical_path.reverse()
+    
+    return {
+        'results': results,
+        'waves': waves,
+        'wave_seconds': wave_seconds,
+        'total_seconds': total_seconds,
+        'busy_seconds': sum(duration.values()),
+        'critical_path': critical_path,
+        'critical_path_seconds': max(finish.values(), default=0.0),
+    }
+
+
 def topological_sort_dfs(graph):
     """
     Topological sort using DFS
     
+    The search keeps an explicit stack of (node, neighbor iterator)
+    frames instead of recursing, so dependency chains of any length work;
+    nodes finish in the same order as with a recursive visit.
+    
     Time Complexity: O(V + E)
-    Space Complexity: O(V) for recursion stack
+    Space Complexity: O(V) for the stack
     
     Returns:
         List representing topological order, or None if cycle exists
     """
     all_nodes = graph.get_all_nodes()
     visited = set()
-    temp_mark = set()  # For cycle detection
+    temp_mark = set()  # Nodes on the current path, for cycle detection
     result = []
+    adjacency = graph.graph
     
-    def visit(node):
-        if node in temp_mark:
-            # Cycle detected
-            return False
-        if node in visited:
-            return True
+    for root in all_nodes:
+        if root in visited:
+            continue
+        temp_mark.add(root)
+        stack = [(root, iter(adjacency.get(root, ())))]
         
-        temp_mark.add(node)
-        for neighbor in graph.graph[node]:
-            if not visit(neighbor):
-                return False
-        temp_mark.remove(node)
-        visited.add(node)
-        result.append(node)
-        return True
-    
-    for node in all_nodes:
-        if node not in visited:
-            if not visit(node):
-                return None  # Cycle exists
+        while stack:
+            node, neighbors = stack[-1]
+            for neighbor in neighbors:
+                if neighbor in temp_mark:
+                    return None  # Cycle exists
+                if neighbor not in visited:
+                    temp_mark.add(neighbor)
+                    stack.append((neighbor, iter(adjacency.get(neighbor, ()))))
+                    break
+            else:
+                # All descendants done: node finishes
+                stack.pop()
+                temp_mark.remove(node)
+                visited.add(node)
+                result.append(node)
     
     return result[::-1]  # Reverse to get correct order
 
 
+def strongly_connected_components(graph):
+    """
+    Strongly connected components by Tarjan's algorithm, without recursion.
+    
+    The DFS keeps an explicit call stack of vertex ids and a per-vertex
+    cursor into the targets array, so a path of millions of vertices needs
+    no Python frames. Tarjan's algorithm completes a component only after
+    every component it reaches, so numbering them backwards puts the
+    labels in topological order: every edge between components goes from
+    a lower to a higher label.
+    
+    Time Complexity: O(V + E)
+    Space Complexity: O(V)
+    
+    Args:
+        graph: Graph or CSRGraph (directed)
+    
+    Returns:
+        Tuple (labels, count): labels is a dict node -> component for a
+        Graph and an array indexed by vertex id for a CSRGraph
+    """
+    if not isinstance(graph, CSRGraph):
+        csr = CSRGraph.from_graph(graph)
+        labels, count = strongly_connected_components(csr)
+        return dict(zip(csr.nodes, labels)), count
+    
+    n = graph.num_nodes
+    offsets, targets = graph.offsets, graph.targets
+    index = array('i', [-1]) * n
+    low = array('i', [0]) * n
+    labels = array('i', [-1]) * n
+    on_stack = bytearray(n)
+    cursor = offsets[:-1]
+    stack = []  # Tarjan's stack of vertices not yet assigned to a component
+    counter = 0
+    count = 0
+    
+    for root in range(n):
+        if index[root] >= 0:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        calls = [root]
+        
+        while calls:
+            v = calls[-1]
+            position, end = cursor[v], offsets[v + 1]
+            while position < end:
+                w = targets[position]
+                position += 1
+                if index[w] < 0:
+                    break
+                if on_stack[w] and index[w] < low[v]:
+                    low[v] = index[w]
+            else:
+                w = -1
+            cursor[v] = position
+            
+            if w >= 0:
+                # Descend into w
+                index[w] = low[w] = counter
+                counter += 1
+                stack.append(w)
+                on_stack[w] = 1
+                calls.append(w)
+                continue
+            
+            # v returns to its caller
+            calls.pop()
+            if calls and low[v] < low[calls[-1]]:
+                low[calls[-1]] = low[v]
+            if low[v] == index[v]:
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = 0
+                    labels[w] = count
+                    if w == v:
+                        break
+                count += 1
+    
+    # Components were completed sinks first
+    for v in range(n):
+        labels[v] = count - 1 - labels[v]
+    return labels, count
+
+
+def condensation(graph):
+    """
+    Condensation DAG: one vertex per strongly connected component.
+    
+    Returns:
+        Tuple (labels, dag) with labels as strongly_connected_components
+        returns them and dag a directed CSRGraph over component labels,
+        without parallel edges; 0..count-1 is a topological order of it
+    """
+    csr = graph if isinstance(graph, CSRGraph) else CSRGraph.from_graph(graph)
+    ids, count = strongly_connected_components(csr)
+    labels = ids if csr is graph else dict(zip(csr.nodes, ids))
+    offsets, targets = csr.offsets, csr.targets
+    
+    edges = set()
+    for u in range(csr.num_nodes):
+        cu = ids[u]
+        for v in targets[offsets[u]:offsets[u + 1]]:
+            if ids[v] != cu:
+                edges.add(cu * count + ids[v])
+    dag = CSRGraph.from_edges(count, (divmod(edge, count) for edge in sorted(edges)), directed=True)
+    return labels, dag
+
+
+def topological_sort_components(graph):
+    """
+    Topological order that also works on cyclic graphs.
+    
+    Every strongly connected component is scheduled as one unit; the
+    result is a topological order of the components, with the members of
+    a component listed in vertex order. On a DAG every component is a
+    single node, so this is an ordinary topological order.
+    
+    Returns:
+        List of components, each a list of nodes (vertex ids for a CSRGraph)
+    """
+    labels, count = strongly_connected_components(graph)
+    components = [[] for _ in range(count)]
+    members = labels.items() if isinstance(labels, dict) else enumerate(labels)
+    for node, label in members:
+        components[label].append(node)
+    return components
+
+
+def find_cycles(graph):
+    """
+    One cycle through each strongly connected component that has one.
+    
+    A component has a cycle if it has more than one vertex or a self-loop.
+    From the component's first vertex v, a BFS that stays inside the
+    component finds the first edge back into v; the BFS tree path to its
+    tail plus that edge is a shortest cycle through v. Components are
+    disjoint, so all searches together scan each edge at most once.
+    
+    Time Complexity: O(V + E)
+    
+    Returns:
+        List of cycles [v, ..., x] (the edge x -> v closes it), in the
+        topological order of their components; nodes are vertex ids for a
+        CSRGraph
+    """
+    csr = graph if isinstance(graph, CSRGraph) else CSRGraph.from_graph(graph)
+    labels, count = strongly_connected_components(csr)
+    offsets, targets = csr.offsets, csr.targets
+    
+    first = array('i', [-1]) * count
+    size = array('i', [0]) * count
+    for v in range(csr.num_nodes):
+        if first[labels[v]] < 0:
+            first[labels[v]] = v
+        size[labels[v]] += 1
+    
+    parent = array('i', [-1]) * csr.num_nodes
+    cycles = []
+    for label in range(count):
+        start = first[label]
+        if size[label] == 1 and start not in targets[offsets[start]:offsets[start + 1]]:
+            continue
+        
+        parent[start] = start
+        queue = [start]
+        tail = -1
+        for node in queue:
+            for neighbor in targets[offsets[node]:offsets[node + 1]]:
+                if neighbor == start:
+                    tail = node
+                    break
+                if labels[neighbor] == label and parent[neighbor] < 0:
+                    parent[neighbor] = node
+                    queue.append(neighbor)
+            if tail >= 0:
+                break
+        
+        cycle = [tail]
+        while cycle[-1] != start:
+            cycle.append(parent[cycle[-1]])
+        cycles.append(cycle[::-1])
+    
+    if isinstance(graph, CSRGraph):
+        return cycles
+    return [[csr.nodes[v] for v in cycle] for cycle in cycles]
+
+
+class CycleError(ValueError):
+    """
+    Raised when an edge would close a cycle.
+    
+    Attributes:
+        cycle: List of nodes [v, ..., u] such that the rejected edge u -> v
+            plus the existing path v -> ... -> u form a cycle
+    """
+    
+    def __init__(self, cycle):
+        super().__init__(f"edge {cycle[-1]!r} -> {cycle[0]!r} would close the cycle "
+                         f"{' -> '.join(map(repr, cycle + cycle[:1]))}")
+        self.cycle = cycle
+
+
+class DynamicTopologicalOrder:
+    """
+    Topological order of a DAG maintained under edge insertions
+    (Pearce & Kelly, 2006).
+    
+    Every node has a position in the order. An edge u -> v with u already
+    before v changes nothing. Otherwise only the affected region between
+    v and u is touched: a forward search from v over nodes not after u
+    (reaching u means the edge closes a cycle, so it is rejected before
+    anything changes) and a backward search from u over nodes after v.
+    The nodes found backwards are then moved, in their old relative
+    order, to the front of the positions both sets occupied, followed by
+    the nodes found forwards.
+    
+    Time Complexity: O(1) for an edge that agrees with the order;
+        otherwise proportional to the affected region and its edges,
+        typically far below the O(V + E) of rerunning Kahn's algorithm
+    
+    Attributes:
+        version: Incremented whenever the order changes
+    """
+    
+    def __init__(self):
+        self.node_id = {}
+        self.nodes = []  # id -> node
+        self.successors = []  # id -> list of successor ids
+        self.predecessors = []  # id -> list of predecessor ids
+        self.position = []  # id -> position in the order
+        self.at = []  # position -> id
+        self.version = 0
+        self._snapshot = ()
+        self._snapshot_version = 0
+    
+    @classmethod
+    def from_graph(cls, graph):
+        """
+        Start from an existing DAG, ordered once by Kahn's algorithm.
+        
+        Raises:
+            CycleError: If the graph already has a cycle
+        """
+        order = topological_sort_kahn(graph)
+        if order is None:
+            raise CycleError(find_cycles(graph)[0])
+        
+        dynamic = cls()
+        for node in order:
+            dynamic.add_node(node)
+        for u, neighbors in graph.graph.items():
+            for v in neighbors:
+                dynamic.successors[dynamic.node_id[u]].append(dynamic.node_id[v])
+                dynamic.predecessors[dynamic.node_id[v]].append(dynamic.node_id[u])
+        return dynamic
+    
+    def __len__(self):
+        return len(self.nodes)
+    
+    def add_node(self, node):
+        """Add a node at the end of the order (no-op if it exists) and return its id"""
+        node_id = self.node_id.get(node)
+        if node_id is None:
+            node_id = self.node_id[node] = len(self.nodes)
+            self.nodes.append(node)
+            self.successors.append([])
+            self.predecessors.append([])
+            self.position.append(node_id)
+            self.at.append(node_id)
+            self.version += 1
+        return node_id
+    
+    def add_edge(self, u, v):
+        """
+        Add the edge u -> v, reordering the affected region if needed.
+        
+        Raises:
+            CycleError: If the edge would close a cycle; the graph and the
+                order are left unchanged
+        """
+        if u == v:
+            raise CycleError([u])
+        iu, iv = self.add_node(u), self.add_node(v)
+        position = self.position
+        lower, upper = position[iv], position[iu]
+        
+        if lower <= upper:
+            # Forward search from v, bounded by u's position
+            parent = {iv: iv}
+            forward = [iv]
+            for x in forward:
+                for y in self.successors[x]:
+                    if y == iu:
+                        path = [x]
+                        while path[-1] != iv:
+                            path.append(parent[path[-1]])
+                        raise CycleError([self.nodes[w] for w in reversed(path)] + [u])
+                    if position[y] < upper and y not in parent:
+                        parent[y] = x
+                        forward.append(y)
+            
+            # Backward search from u, bounded by v's position
+            seen = {iu}
+            backward = [iu]
+            for x in backward:
+                for y in self.predecessors[x]:
+                    if position[y] > lower and y not in seen:
+                        seen.add(y)
+                        backward.append(y)
+            
+            backward.sort(key=position.__getitem__)
+            forward.sort(key=position.__getitem__)
+            moved = backward + forward
+            slots = sorted(position[x] for x in moved)
+            for x, slot in zip(moved, slots):
+                position[x] = slot
+                self.at[slot] = x
+            self.version += 1
+        
+        self.successors[iu].append(iv)
+        self.predecessors[iv].append(iu)
+    
+    def order(self):
+        """
+        Current topological order as a tuple of nodes.
+        
+        The tuple is cached until the order changes, so asking again after
+        edges that needed no reordering is free.
+        """
+        if self._snapshot_version != self.version or len(self._snapshot) != len(self.at):
+            self._snapshot = tuple(map(self.nodes.__getitem__, self.at))
+            self._snapshot_version = self.version
+        return self._snapshot
+    
+    def precedes(self, u, v):
+        """Is u before v in the current order?"""
+        return self.position[self.node_id[u]] < self.position[self.node_id[v]]
+
+
+def benchmark_csr_kahn(num_nodes=200000, num_edges=1000000, seed=0):
+    """
+    Time topological_sort_kahn on a Graph and on its CSRGraph form.
+    
+    Edges of the random DAG go from the lower to the higher vertex id.
+    """
+    rng = random.Random(seed)
+    edges = [tuple(sorted(rng.sample(range(num_nodes), 2))) for _ in range(num_edges)]
+    
+    graph = Graph()
+    for u, v in edges:
+        graph.add_edge(u, v)
+    csr = CSRGraph.from_edges(num_nodes, edges, directed=True)
+    
+    print(f"Random DAG with {num_nodes} vertices and {num_edges} edges:")
+    print(f"{'graph':<8} {'time (ms)':<11} {'sorted':<8}")
+    print("-" * 28)
+    for label, g in (("Graph", graph), ("CSR", csr)):
+        start = time.perf_counter()
+        order = topological_sort_kahn(g)
+        print(f"{label:<8} {(time.perf_counter() - start) * 1000:<11.1f} {str(order is not None):<8}")
+
+
+def benchmark_deep_topological_sort(length=1000000):
+    """Sort a dependency chain 0 -> 1 -> ... -> length-1 with both algorithms"""
+    graph = Graph()
+    for node in range(length - 1):
+        graph.add_edge(node, node + 1)
+    
+    print(f"Dependency chain of {length} nodes:")
+    for name, sort in (("Kahn's", topological_sort_kahn), ("DFS", topological_sort_dfs)):
+        start = time.perf_counter()
+        order = sort(graph)
+        elapsed = time.perf_counter() - start
+        print(f"  {name:<7} {elapsed * 1000:>8.1f} ms, in order: {order == list(range(length))}")
+
+
+def benchmark_strongly_connected(num_nodes=200000, num_edges=1000000, seed=0):
+    """
+    Time the SCC engine on a random directed graph.
+    
+    About half of the edges point backwards, so most vertices end up in
+    one giant component and the rest in small ones. For a 10M-edge graph:
+        benchmark_strongly_connected(2000000, 10000000)
+    """
+    rng = random.Random(seed)
+    edges = [(rng.randrange(num_nodes), rng.randrange(num_nodes)) for _ in range(num_edges)]
+    csr = CSRGraph.from_edges(num_nodes, edges, directed=True)
+    
+    print(f"Random digraph with {num_nodes} vertices and {num_edges} edges:")
+    start = time.perf_counter()
+    labels, count = strongly_connected_components(csr)
+    scc = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    _, dag = condensation(csr)
+    dag_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    cycles = find_cycles(csr)
+    cycle_time = time.perf_counter() - start
+    
+    forward = all(labels[u] <= labels[v] for u, v in edges)
+    print(f"  {'SCC (Tarjan)':<16} {scc * 1000:>9.1f} ms, {count} components, "
+          f"edges respect the order: {forward}")
+    print(f"  {'condensation':<16} {dag_time * 1000:>9.1f} ms, {len(dag.targets)} DAG edges")
+    print(f"  {'cycles':<16} {cycle_time * 1000:>9.1f} ms, {len(cycles)} cycles, "
+          f"longest {max(map(len, cycles), default=0)}")
+
+
+def benchmark_dynamic_order(num_nodes=20000, num_edges=100000, batch=1000, seed=0):
+    """
+    Insert the edges of a random DAG one at a time, in random order,
+    and compare with rerunning Kahn's algorithm after every batch.
+    """
+    rng = random.Random(seed)
+    hidden = list(range(num_nodes))
+    rng.shuffle(hidden)
+    edges = []
+    for _ in range(num_edges):
+        i, j = sorted(rng.sample(range(num_nodes), 2))
+        edges.append((hidden[i], hidden[j]))
+    
+    dynamic = DynamicTopologicalOrder()
+    for node in range(num_nodes):
+        dynamic.add_node(node)
+    start = time.perf_counter()
+    for u, v in edges:
+        dynamic.add_edge(u, v)
+    incremental = time.perf_counter() - start
+    order = dynamic.order()
+    position = {node: i for i, node in enumerate(order)}
+    valid = all(position[u] < position[v] for u, v in edges)
+    
+    graph = Graph()
+    rebuilds = 0
+    start = time.perf_counter()
+    for first in range(0, num_edges, batch):
+        for u, v in edges[first:first + batch]:
+            graph.add_edge(u, v)
+        topological_sort_kahn(graph)
+        rebuilds += 1
+    rebuild = time.perf_counter() - start
+    
+    print(f"Random DAG, {num_nodes} nodes, {num_edges} edges inserted in random order:")
+    print(f"  {'Pearce-Kelly':<28} {incremental * 1000:>9.1f} ms "
+          f"({incremental * 1e6 / num_edges:.1f} us per edge, order valid: {valid})")
+    print(f"  {f'Kahn every {batch} edges':<28} {rebuild * 1000:>9.1f} ms "
+          f"({rebuild * 1000 / rebuilds:.1f} ms per rebuild)")
+    
+    cycle_edge = (order[-1], order[0])
+    try:
+        dynamic.add_edge(*cycle_edge)
+    except CycleError as error:
+        print(f"  Edge {cycle_edge[0]} -> {cycle_edge[1]} rejected, cycle of {len(error.cycle)} nodes")
+
+
+def benchmark_waves(num_nodes=200000, num_edges=1000000, num_tasks=300, seed=0):
+    """
+    Time topological_waves against the flat Kahn order, then run a random
+    task DAG of sleeping tasks wave by wave on thread pools of several
+    sizes.
+    """
+    rng = random.Random(seed)
+    edges = [tuple(sorted(rng.sample(range(num_nodes), 2))) for _ in range(num_edges)]
+    width = num_nodes // 100
+    fan_out = num_edges // num_nodes * 10
+    layered = [(layer * width + i, (layer + 1) * width + j)
+               for layer in range(num_nodes // width // 10 - 1) for i in range(width)
+               for j in rng.sample(range(width), fan_out)]
+    
+    for label, csr in (
+            (f"Random DAG, {num_nodes} vertices, {num_edges} edges",
+             CSRGraph.from_edges(num_nodes, edges, directed=True)),
+            (f"Layered DAG, {num_nodes // 10} vertices, {len(layered)} edges",
+             CSRGraph.from_edges(num_nodes // 10, layered, directed=True))):
+        print(f"{label}:")
+        for name, sort in (("Kahn order", topological_sort_kahn), ("Kahn waves", topological_waves)):
+            start = time.perf_counter()
+            result = sort(csr)
+            elapsed = time.perf_counter() - start
+            print(f"  {name:<11} {elapsed * 1000:>8.1f} ms"
+                  + (f", {len(result)} waves" if sort is topological_waves else ""))
+    
+    graph = Graph()
+    for v in range(1, num_tasks):
+        for u in rng.sample(range(max(0, v - 20), v), min(v, 2)):
+            graph.add_edge(u, v)
+    tasks = {v: partial(time.sleep, rng.uniform(0.0005, 0.002)) for v in range(num_tasks)}
+    
+    print(f"\n{num_tasks} sleeping tasks (0.5-2 ms each):")
+    print(f"{'workers':<9} {'waves':<7} {'wall (ms)':<11} {'busy (ms)':<11} {'critical (ms)':<14}")
+    print("-" * 54)
+    for workers in (1, 4, 16):
+        run = execute_waves(graph, tasks, max_workers=workers)
+        print(f"{workers:<9} {len(run['waves']):<7} {run['total_seconds'] * 1000:<11.1f} "
+              f"{run['busy_seconds'] * 1000:<11.1f} {run['critical_path_seconds'] * 1000:<14.1f}")
+
+
 def demonstrate_topological_sort():
     """Demonstrate topological sorting"""
     print("=" * 70)
@@ -212,14 +988,83 @@ def demonstrate_topological_sort():
         print(f"Topological order: {' -> '.join(map(str, order))}")
         print("\nNote: Multiple valid topological orders may exist")
     
+    # Example 6: Compressed sparse row graphs
+    print("\n\nExample 6: CSR Graph")
+    print("-" * 70)
+    
+    csr = CSRGraph.from_graph(g2)
+    order = topological_sort_kahn(csr)
+    print(f"Example 2 as a CSR graph: {' -> '.join(csr.nodes[v] for v in order)}")
+    print(f"Example 4 as a CSR graph: {topological_sort_kahn(CSRGraph.from_graph(g4))}")
+    print()
+    benchmark_csr_kahn()
+    
+    # Example 7: Long dependency chains
+    print("\n\nExample 7: Long Dependency Chain")
+    print("-" * 70)
+    print(f"Example 4 with DFS: {topological_sort_dfs(g4)}")
+    benchmark_deep_topological_sort()
+    
+    # Example 8: Cyclic dependencies
+    print("\n\nExample 8: Scheduling a Graph with Cycles")
+    print("-" * 70)
+    
+    g8 = Graph()
+    g8.add_edge('config', 'core')
+    g8.add_edge('core', 'net')
+    g8.add_edge('net', 'core')  # core and net depend on each other
+    g8.add_edge('net', 'api')
+    g8.add_edge('api', 'ui')
+    g8.add_edge('ui', 'api')  # api and ui depend on each other
+    g8.add_edge('core', 'db')
+    g8.add_edge('db', 'api')
+    
+    print("Dependencies: config -> core <-> net -> api <-> ui, core -> db -> api")
+    print(f"Kahn's algorithm: {topological_sort_kahn(g8)}")
+    components = topological_sort_components(g8)
+    print(f"Component order: {' -> '.join('{' + ', '.join(c) + '}' for c in components)}")
+    for cycle in find_cycles(g8):
+        print(f"  Cycle: {' -> '.join(cycle + cycle[:1])}")
+    print()
+    benchmark_strongly_connected()
+    
+    # Example 9: Keeping the order while edges arrive
+    print("\n\nExample 9: Incremental Topological Order")
+    print("-" * 70)
+    
+    dynamic = DynamicTopologicalOrder.from_graph(g2)
+    print(f"Start from Example 2: {' -> '.join(dynamic.order())}")
+    for u, v in [('Task6', 'Task7'), ('Task7', 'Task1'), ('Task6', 'Task2')]:
+        try:
+            dynamic.add_edge(u, v)
+            print(f"  add {u} -> {v}: {' -> '.join(dynamic.order())}")
+        except CycleError as error:
+            print(f"  add {u} -> {v}: rejected, {error}")
+    print()
+    benchmark_dynamic_order()
+    
+    # Example 10: Parallel waves
+    print("\n\nExample 10: Execution Waves")
+    print("-" * 70)
+    
+    for i, wave in enumerate(topological_waves(g3)):
+        print(f"  Wave {i}: {', '.join(sorted(wave))}")
+    run = execute_waves(g3, {node: partial(str.upper, node) for node in g3.get_all_nodes()},
+                        max_workers=4)
+    print(f"Critical path: {' -> '.join(run['critical_path'])}")
+    print()
+    benchmark_waves()
+    
     print("\n" + "=" * 70)
     print("Key Properties:")
     print("=" * 70)
     print("1. Topological sort only exists for DAGs (no cycles)")
     print("2. Multiple valid topological orders may exist")
     print("3. Kahn's algorithm: O(V + E) using BFS")
-    print("4. DFS algorithm: O(V + E) using recursion")
+    print("4. DFS algorithm: O(V + E) using an explicit stack")
     print("5. Applications: Course scheduling, build systems, task dependencies")
+    print("6. On cyclic graphs, strongly connected components can be ordered instead")
+    print("7. Kahn's waves group nodes that can run in parallel")
 
 
 if __name__ == "__main__":
@@ -4,7 +4,18 @@ Finds shortest paths from a source vertex to all other vertices
 """
 
 import heapq
+import json
+import math
+import mmap
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+from array import array
 from collections import defaultdict
+from itertools import accumulate
 
 
 class Graph:
@@ -12,18 +23,287 @@ class Graph:
     
     def __init__(self):
         self.graph = defaultdict(list)
+        self._reverse = None
     
     def add_edge(self, u, v, weight):
         """Add a weighted directed edge from u to v"""
         self.graph[u].append((v, weight))
+        self._reverse = None
     
     def add_undirected_edge(self, u, v, weight):
         """Add a weighted undirected edge"""
         self.graph[u].append((v, weight))
         self.graph[v].append((u, weight))
+        self._reverse = None
+    
+    def reverse(self):
+        """
+        Reverse adjacency, v -> [(u, weight)] for every edge u -> v.
+        
+        Built on first use and cached until the next edge is added.
+        """
+        if self._reverse is None:
+            reverse = defaultdict(list)
+            for u, neighbors in self.graph.items():
+                for v, weight in neighbors:
+                    reverse[v].append((u, weight))
+            self._reverse = reverse
+        return self._reverse
+
+
+GRAPH_MAGIC = b'CSRGRAPH'
+GRAPH_HEADER = struct.Struct('<8sIIQQ')  # magic, version, flags, nodes, entries
+DIRECTED, WEIGHTED, BIG_ENDIAN = 1, 2, 4
+
+
+def _graph_layout(num_nodes, num_entries):
+    """Byte ranges of the offsets, targets and weights sections"""
+    offsets_start = GRAPH_HEADER.size
+    targets_start = offsets_start + 8 * (num_nodes + 1)
+    weights_start = targets_start + 4 * num_entries
+    weights_start += -weights_start % 8
+    return offsets_start, targets_start, weights_start, weights_start + 8 * num_entries
+
+
+def write_graph(path, num_nodes, edges, directed=False, weighted=False, chunk=1 << 16):
+    """
+    Write a graph file from a stream of edges (from exercise 1 of 04-graphs).
+    
+    File layout, all sections in native byte order:
+        header   magic, version, flags, node count, entry count (32 bytes)
+        offsets  int64 * (nodes + 1)
+        targets  int32 * entries
+        weights  float64 * entries, 8-byte aligned, only if weighted
+    
+    An undirected edge is stored in both directions. The edges are read
+    once: they are spooled to a temporary file in chunks while the
+    degrees are counted, then scattered straight into the mapped output,
+    so only O(V) arrays are held in memory.
+    
+    Args:
+        path: File to create
+        num_nodes: Vertex ids are 0..num_nodes-1
+        edges: Iterable of (u, v), or (u, v, weight) if weighted
+    
+    Returns:
+        Number of adjacency entries written
+    """
+    degree = array('q', [0]) * (num_nodes + 1)
+    with tempfile.TemporaryFile() as spool:
+        sizes = []
+        heads, tails, weights = array('i'), array('i'), array('d')
+        for edge in edges:
+            u, v = edge[0], edge[1]
+            heads.append(u)
+            tails.append(v)
+            if weighted:
+                weights.append(edge[2])
+            degree[u + 1] += 1
+            if not directed:
+                degree[v + 1] += 1
+            if len(heads) == chunk:
+                sizes.append(len(heads))
+                for part in (heads, tails, weights):
+                    part.tofile(spool)
+                    del part[:]
+        sizes.append(len(heads))
+        for part in (heads, tails, weights):
+            part.tofile(spool)
+            del part[:]
+        
+        offsets = array('q', accumulate(degree))
+        num_entries = offsets[-1]
+        offsets_start, targets_start, weights_start, end = _graph_layout(num_nodes, num_entries)
+        flags = (DIRECTED * directed) | (WEIGHTED * weighted) | (BIG_ENDIAN * (sys.byteorder == 'big'))
+        
+        with open(path, 'w+b') as f:
+            f.truncate(end)
+            with mmap.mmap(f.fileno(), 0) as mapped:
+                GRAPH_HEADER.pack_into(mapped, 0, GRAPH_MAGIC, 1, flags, num_nodes, num_entries)
+                mapped[offsets_start:targets_start] = offsets.tobytes()
+                
+                view = memoryview(mapped)
+                targets = view[targets_start:targets_start + 4 * num_entries].cast('i')
+                out_weights = view[weights_start:end].cast('d') if weighted else None
+                position = offsets[:-1]
+                spool.seek(0)
+                for size in sizes:
+                    heads.fromfile(spool, size)
+                    tails.fromfile(spool, size)
+                    if weighted:
+                        weights.fromfile(spool, size)
+                    for i in range(size):
+                        u, v = heads[i], tails[i]
+                        targets[position[u]] = v
+                        if weighted:
+                            out_weights[position[u]] = weights[i]
+                        position[u] += 1
+                        if not directed:
+                            targets[position[v]] = u
+                            if weighted:
+                                out_weights[position[v]] = weights[i]
+                            position[v] += 1
+                    for part in (heads, tails, weights):
+                        del part[:]
+                
+                targets.release()
+                if weighted:
+                    out_weights.release()
+                view.release()
+    return num_entries
+
+
+class MappedGraph:
+    """
+    Read-only CSR graph backed by a graph file through mmap (from
+    exercise 1 of 04-graphs).
+    
+    The neighbors of vertex v are targets[offsets[v]:offsets[v + 1]], with
+    their weights at the same positions in weights. All three are
+    memoryviews of the mapped file, so opening only reads the header and
+    the operating system pages in what an algorithm touches.
+    
+    Attributes:
+        num_nodes: Number of vertices (ids 0..num_nodes-1)
+        offsets, targets, weights: Views of the file sections; weights is
+            None for an unweighted file
+        directed: Whether edges were stored in one direction only
+    """
+    
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._mapped = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, flags, num_nodes, num_entries = GRAPH_HEADER.unpack_from(self._mapped)
+        if magic != GRAPH_MAGIC or version != 1:
+            self.close()
+            raise ValueError(f"{path} is not a graph file")
+        if bool(flags & BIG_ENDIAN) != (sys.byteorder == 'big'):
+            self.close()
+            raise ValueError(f"{path} was written with the other byte order")
+        
+        offsets_start, targets_start, weights_start, end = _graph_layout(num_nodes, num_entries)
+        self._view = memoryview(self._mapped)
+        self.num_nodes = num_nodes
+        self.offsets = self._view[offsets_start:targets_start].cast('q')
+        self.targets = self._view[targets_start:targets_start + 4 * num_entries].cast('i')
+        self.weights = self._view[weights_start:end].cast('d') if flags & WEIGHTED else None
+        self.directed = bool(flags & DIRECTED)
+    
+    def neighbors(self, v):
+        """Neighbor ids of vertex v"""
+        return self.targets[self.offsets[v]:self.offsets[v + 1]]
+    
+    def close(self):
+        """Release the views and unmap the file"""
+        for view in (getattr(self, name, None) for name in ('offsets', 'targets', 'weights', '_view')):
+            if view is not None:
+                view.release()
+        self._mapped.close()
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+class IndexedHeap:
+    """
+    Array-backed d-ary min-heap over dense ids 0..n-1 with decrease-key.
+    
+    heap holds the ids in heap order, position maps an id to its index in
+    heap (-1 when absent) and key holds every id's current key, so each
+    id is in the heap at most once and lowering its key moves the
+    existing entry up instead of pushing a duplicate. A wider node (arity
+    4 rather than 2) halves the depth, making decrease-key cheaper at the
+    cost of more comparisons per pop.
+    
+    The sifts run in Python while heapq's run in C, so the heap is smaller
+    (at most n entries, no stale pops) but not faster than lazy heapq
+    pushes unless decrease-keys are rare relative to pops.
+    
+    Time Complexity: O(log_d n) for push and decrease_key,
+        O(d log_d n) for pop
+    
+    Attributes:
+        key: array('d') of keys by id, inf for ids never pushed; keys of
+            popped ids are kept
+    """
+    
+    def __init__(self, n, arity=4):
+        if arity < 2:
+            raise ValueError("arity must be at least 2")
+        self.arity = arity
+        self.heap = array('i')
+        self.position = array('i', [-1]) * n
+        self.key = array('d', [float('inf')]) * n
+    
+    def __len__(self):
+        return len(self.heap)
+    
+    def __contains__(self, v):
+        return self.position[v] >= 0
+    
+    def push(self, v, key):
+        """Insert id v, which must not be in the heap"""
+        if self.position[v] >= 0:
+            raise ValueError(f"{v} is already in the heap")
+        self.key[v] = key
+        self.heap.append(v)
+        self._sift_up(len(self.heap) - 1, v, key)
+    
+    def decrease_key(self, v, key):
+        """Lower the key of id v, which must be in the heap"""
+        if self.position[v] < 0 or key > self.key[v]:
+            raise ValueError(f"cannot decrease the key of {v} to {key}")
+        self.key[v] = key
+        self._sift_up(self.position[v], v, key)
+    
+    def pop(self):
+        """Remove the id with the smallest key and return (key, id)"""
+        heap = self.heap
+        top = heap[0]
+        last = heap.pop()
+        if heap:
+            self._sift_down(0, last, self.key[last])
+        self.position[top] = -1
+        return self.key[top], top
+    
+    def _sift_up(self, i, v, key):
+        heap, position, keys, arity = self.heap, self.position, self.key, self.arity
+        while i:
+            parent = (i - 1) // arity
+            above = heap[parent]
+            if keys[above] <= key:
+                break
+            heap[i] = above
+            position[above] = i
+            i = parent
+        heap[i] = v
+        position[v] = i
+    
+    def _sift_down(self, i, v, key):
+        heap, position, keys, arity = self.heap, self.position, self.key, self.arity
+        size = len(heap)
+        while True:
+            first = arity * i + 1
+            if first >= size:
+                break
+            best, best_key = first, keys[heap[first]]
+            for child in range(first + 1, min(first + arity, size)):
+                if keys[heap[child]] < best_key:
+                    best, best_key = child, keys[heap[child]]
+            if best_key >= key:
+                break
+            heap[i] = heap[best]
+            position[heap[i]] = i
+            i = best
+        heap[i] = v
+        position[v] = i
 
 
-def dijkstra(graph, start):
+def dijkstra(graph, start, heap='lazy', arity=4, stats=None):
     """
     Dijkstra's algorithm for shortest paths
     
@@ -31,18 +311,29 @@ def dijkstra(graph, start):
     Space Complexity: O(V)
     
     Args:
-        graph: Graph object
+        graph: Graph object, or a weighted MappedGraph
         start: Starting vertex
+        heap: 'lazy' pushes a new entry on every relaxation and skips
+            stale ones when popped (the heap can reach O(E) entries);
+            'indexed' keeps one entry per vertex in an IndexedHeap and
+            lowers it in place
+        arity: Children per node of the IndexedHeap
+        stats: Optional dictionary, filled with the number of pushes,
+            decreases and pops and the largest heap size
     
     Returns:
         Tuple (distances, previous)
         distances: Dict mapping vertex -> shortest distance from start
         previous: Dict mapping vertex -> previous vertex in shortest path
+        For a MappedGraph both are arrays indexed by vertex id, with inf
+        and -1 for unreachable vertices
     """
-    distances = {start: 0}
-    previous = {}
-    pq = [(0, start)]  # Priority queue: (distance, vertex)
-    visited = set()
+    if heap not in ('lazy', 'indexed'):
+        raise ValueError(f"unknown heap {heap!r}")
+    if isinstance(graph, MappedGraph):
+        if heap == 'indexed':
+            return _dijkstra_mapped_indexed(graph, start, arity, stats)
+        return _dijkstra_mapped(graph, start, stats)
     
     # Initialize distances
     all_nodes = set(graph.graph.keys())
@@ -50,12 +341,22 @@ def dijkstra(graph, start):
         for neighbor, _ in node:
             all_nodes.add(neighbor)
     
+    if heap == 'indexed':
+        return _dijkstra_indexed(graph, start, all_nodes, arity, stats)
+    
+    distances = {start: 0}
+    previous = {}
+    pq = [(0, start)]  # Priority queue: (distance, vertex)
+    visited = set()
+    pushes, pops, max_heap = 1, 0, 1
+    
     for node in all_nodes:
         if node != start:
             distances[node] = float('inf')
     
     while pq:
         current_dist, current = heapq.heappop(pq)
+        pops += 1
         
         if current in visited:
             continue
@@ -72,10 +373,444 @@ def dijkstra(graph, start):
                 distances[neighbor] = new_dist
                 previous[neighbor] = current
                 heapq.heappush(pq, (new_dist, neighbor))
+                pushes += 1
+                if len(pq) > max_heap:
+                    max_heap = len(pq)
+    
+    if stats is not None:
+        stats.update(pushes=pushes, decreases=0, pops=pops, max_heap=max_heap)
+    return distances, previous
+
+
+def _dijkstra_indexed(graph, start, all_nodes, arity, stats):
+    """dijkstra on a Graph with an IndexedHeap over vertex ids"""
+    nodes = list(all_nodes | {start})
+    node_id = {node: i for i, node in enumerate(nodes)}
+    pq = IndexedHeap(len(nodes), arity)
+    pq.push(node_id[start], 0)
+    previous = {}
+    pushes, decreases, pops, max_heap = 1, 0, 0, 1
+    
+    while pq:
+        current_dist, current = pq.pop()
+        pops += 1
+        node = nodes[current]
+        
+        for neighbor, weight in graph.graph[node]:
+            neighbor_id = node_id[neighbor]
+            new_dist = current_dist + weight
+            
+            # Settled vertices already have a distance no larger than new_dist
+            if new_dist < pq.key[neighbor_id]:
+                previous[neighbor] = node
+                if neighbor_id in pq:
+                    pq.decrease_key(neighbor_id, new_dist)
+                    decreases += 1
+                else:
+                    pq.push(neighbor_id, new_dist)
+                    pushes += 1
+                    if len(pq) > max_heap:
+                        max_heap = len(pq)
+    
+    if stats is not None:
+        stats.update(pushes=pushes, decreases=decreases, pops=pops, max_heap=max_heap)
+    distances = {node: pq.key[i] for i, node in enumerate(nodes)}
+    distances[start] = 0
+    return distances, previous
+
+
+def _dijkstra_mapped(graph, start, stats=None):
+    """dijkstra over the offset, target and weight views of a MappedGraph"""
+    if graph.weights is None:
+        raise ValueError("dijkstra needs a graph file written with weighted=True")
+    offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+    distances = array('d', [float('inf')]) * graph.num_nodes
+    previous = array('i', [-1]) * graph.num_nodes
+    visited = bytearray(graph.num_nodes)
+    distances[start] = 0
+    pq = [(0, start)]
+    pushes, pops, max_heap = 1, 0, 1
+    
+    while pq:
+        current_dist, current = heapq.heappop(pq)
+        pops += 1
+        if visited[current]:
+            continue
+        visited[current] = 1
+        
+        first, last = offsets[current], offsets[current + 1]
+        for neighbor, weight in zip(targets[first:last], weights[first:last]):
+            new_dist = current_dist + weight
+            if new_dist < distances[neighbor]:
+                distances[neighbor] = new_dist
+                previous[neighbor] = current
+                heapq.heappush(pq, (new_dist, neighbor))
+                pushes += 1
+                if len(pq) > max_heap:
+                    max_heap = len(pq)
+    
+    if stats is not None:
+        stats.update(pushes=pushes, decreases=0, pops=pops, max_heap=max_heap)
+    return distances, previous
+
+
+def _dijkstra_mapped_indexed(graph, start, arity, stats=None):
+    """
+    dijkstra on a MappedGraph with an IndexedHeap; the heap's key array
+    becomes the distance array
+    """
+    if graph.weights is None:
+        raise ValueError("dijkstra needs a graph file written with weighted=True")
+    offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+    previous = array('i', [-1]) * graph.num_nodes
+    pq = IndexedHeap(graph.num_nodes, arity)
+    distances, position, entries, sift_up = pq.key, pq.position, pq.heap, pq._sift_up
+    pq.push(start, 0)
+    pushes, decreases, pops, max_heap = 1, 0, 0, 1
+    
+    while entries:
+        current_dist, current = pq.pop()
+        pops += 1
+        
+        first, last = offsets[current], offsets[current + 1]
+        for neighbor, weight in zip(targets[first:last], weights[first:last]):
+            new_dist = current_dist + weight
+            if new_dist < distances[neighbor]:
+                # decrease_key and push without their argument checks
+                distances[neighbor] = new_dist
+                previous[neighbor] = current
+                if position[neighbor] >= 0:
+                    sift_up(position[neighbor], neighbor, new_dist)
+                    decreases += 1
+                else:
+                    entries.append(neighbor)
+                    sift_up(len(entries) - 1, neighbor, new_dist)
+                    pushes += 1
+                    if len(entries) > max_heap:
+                        max_heap = len(entries)
     
+    if stats is not None:
+        stats.update(pushes=pushes, decreases=decreases, pops=pops, max_heap=max_heap)
     return distances, previous
 
 
+def shortest_path(graph, source, target, bidirectional=False):
+    """
+    Shortest path between two vertices, stopping as soon as it is known.
+    
+    Unlike dijkstra, nothing is initialized up front: distances and
+    predecessors are only stored for vertices the search reaches, so the
+    cost depends on how far the target is rather than on the graph size.
+    
+    The one-way search stops when the target is settled. The
+    bidirectional search also runs backwards from the target over
+    graph.reverse(), always advancing the side with the smaller heap, and
+    stops once the two smallest keys add up to at least the best path seen
+    through a vertex reached from both sides.
+    
+    Time Complexity: O((V' + E') log V') for the V' vertices and E' edges
+        the search touches
+    
+    Args:
+        graph: Graph object
+        source, target: Endpoints
+        bidirectional: Search from both ends
+    
+    Returns:
+        Tuple (distance, path), or (inf, None) if target is unreachable
+    """
+    if source == target:
+        return 0, [source]
+    if bidirectional:
+        return _bidirectional_shortest_path(graph, source, target)
+    
+    adjacency = graph.graph
+    distances = {source: 0}
+    previous = {}
+    pq = [(0, source)]
+    visited = set()
+    
+    while pq:
+        current_dist, current = heapq.heappop(pq)
+        if current in visited:
+            continue
+        if current == target:
+            return current_dist, reconstruct_path(previous, source, target)
+        visited.add(current)
+        
+        for neighbor, weight in adjacency.get(current, ()):
+            new_dist = current_dist + weight
+            if new_dist < distances.get(neighbor, float('inf')):
+                distances[neighbor] = new_dist
+                previous[neighbor] = current
+                heapq.heappush(pq, (new_dist, neighbor))
+    
+    return float('inf'), None
+
+
+def _bidirectional_shortest_path(graph, source, target):
+    """shortest_path searching forwards from source and backwards from target"""
+    adjacency = (graph.graph, graph.reverse())
+    distances = ({source: 0}, {target: 0})
+    previous = ({}, {})
+    pqs = ([(0, source)], [(0, target)])
+    visited = (set(), set())
+    best, meet = float('inf'), None
+    
+    while pqs[0] and pqs[1]:
+        # No path found later can be shorter than the two smallest keys
+        if pqs[0][0][0] + pqs[1][0][0] >= best:
+            break
+        side = 0 if len(pqs[0]) <= len(pqs[1]) else 1
+        current_dist, current = heapq.heappop(pqs[side])
+        if current in visited[side]:
+            continue
+        visited[side].add(current)
+        
+        own, other = distances[side], distances[1 - side]
+        for neighbor, weight in adjacency[side].get(current, ()):
+            new_dist = current_dist + weight
+            if new_dist < own.get(neighbor, float('inf')):
+                own[neighbor] = new_dist
+                previous[side][neighbor] = current
+                heapq.heappush(pqs[side], (new_dist, neighbor))
+                if neighbor in other and new_dist + other[neighbor] < best:
+                    best, meet = new_dist + other[neighbor], neighbor
+    
+    if meet is None:
+        return float('inf'), None
+    path = reconstruct_path(previous[0], source, meet)
+    while path[-1] != target:
+        path.append(previous[1][path[-1]])
+    return best, path
+
+
+def astar(graph, source, target, heuristic=None, stats=None):
+    """
+    A* search: dijkstra ordered by distance so far plus an estimate of
+    the distance left, so the search leans towards the target.
+    
+    The path is shortest if the heuristic never overestimates the
+    remaining distance (admissible); a vertex whose distance improves
+    after it was expanded is expanded again. If the heuristic is also
+    consistent (h(u) <= weight(u, v) + h(v)), as CoordinateHeuristic with
+    a valid scale and Landmarks are, every vertex is expanded at most once.
+    Without a heuristic this is shortest_path.
+    
+    Args:
+        graph: Graph object
+        source, target: Endpoints
+        heuristic: Callable (vertex, target) -> lower bound on the distance
+            from vertex to target; called once per reached vertex
+        stats: Optional dictionary, filled with the number of vertices
+            reached and expanded
+    
+    Returns:
+        Tuple (distance, path), or (inf, None) if target is unreachable
+    """
+    adjacency = graph.graph
+    estimate = {source: heuristic(source, target) if heuristic else 0}
+    distances = {source: 0}
+    previous = {}
+    pq = [(estimate[source], 0, source)]  # (distance + estimate, distance, vertex)
+    expanded = 0
+    result = float('inf'), None
+    
+    while pq:
+        _, current_dist, current = heapq.heappop(pq)
+        if current_dist > distances[current]:
+            continue  # stale entry
+        if current == target:
+            result = current_dist, reconstruct_path(previous, source, target)
+            break
+        expanded += 1
+        
+        for neighbor, weight in adjacency.get(current, ()):
+            new_dist = current_dist + weight
+            if new_dist < distances.get(neighbor, float('inf')):
+                distances[neighbor] = new_dist
+                previous[neighbor] = current
+                if neighbor not in estimate:
+                    estimate[neighbor] = heuristic(neighbor, target) if heuristic else 0
+                heapq.heappush(pq, (new_dist + estimate[neighbor], new_dist, neighbor))
+    
+    if stats is not None:
+        stats.update(reached=len(distances), expanded=expanded)
+    return result
+
+
+class CoordinateHeuristic:
+    """
+    Straight-line A* heuristic from vertex coordinates.
+    
+    The coordinates are unpacked once into flat float arrays (radians and
+    cosines of latitude for haversine), so each estimate is a few float
+    operations on array lookups.
+    
+    Args:
+        coordinates: Dictionary vertex -> (x, y), or a sequence of (x, y)
+            indexed by vertex id; (latitude, longitude) in degrees for
+            haversine
+        metric: 'euclidean' or 'haversine' (great-circle distance)
+        scale: Smallest edge weight per unit of distance, which keeps the
+            estimate admissible (for travel times: 1 / top speed)
+        radius: Sphere radius for haversine, 6371 km by default
+    """
+    
+    def __init__(self, coordinates, metric='euclidean', scale=1.0, radius=6371.0):
+        if metric not in ('euclidean', 'haversine'):
+            raise ValueError(f"unknown metric {metric!r}")
+        if isinstance(coordinates, dict):
+            self.index = {node: i for i, node in enumerate(coordinates)}
+            points = list(coordinates.values())
+        else:
+            self.index = None
+            points = coordinates
+        self.metric = metric
+        self.scale = scale
+        self.radius = radius
+        
+        if metric == 'haversine':
+            self.x = array('d', (math.radians(lat) for lat, _ in points))
+            self.y = array('d', (math.radians(lon) for _, lon in points))
+            self.cos_x = array('d', map(math.cos, self.x))
+        else:
+            self.x = array('d', (x for x, _ in points))
+            self.y = array('d', (y for _, y in points))
+    
+    def __call__(self, v, target):
+        if self.index is not None:
+            v, target = self.index[v], self.index[target]
+        x, y = self.x, self.y
+        if self.metric == 'euclidean':
+            return self.scale * math.hypot(x[v] - x[target], y[v] - y[target])
+        a = (math.sin((x[v] - x[target]) / 2) ** 2 +
+             self.cos_x[v] * self.cos_x[target] * math.sin((y[v] - y[target]) / 2) ** 2)
+        return self.scale * 2 * self.radius * math.asin(math.sqrt(a))
+
+
+class Landmarks:
+    """
+    ALT heuristic (A*, landmarks, triangle inequality).
+    
+    For a landmark L, d(L, t) <= d(L, v) + d(v, t) and
+    d(v, L) <= d(v, t) + d(t, L), so d(L, t) - d(L, v) and
+    d(v, L) - d(t, L) are lower bounds on d(v, t); the heuristic is the
+    largest over all landmarks. It needs no coordinates and is consistent.
+    The distance tables cost one dijkstra per landmark (two on a directed
+    graph), which is why they are built once and saved.
+    
+    Attributes:
+        nodes: Vertices in table order
+        landmarks: The chosen landmark vertices
+        forward: One array('d') per landmark of d(L, v) in table order
+        backward: Same for d(v, L); the forward tables if undirected
+    """
+    
+    def __init__(self, nodes, landmarks, forward, backward=None):
+        self.nodes = nodes
+        self.index = {node: i for i, node in enumerate(nodes)}
+        self.landmarks = landmarks
+        self.forward = forward
+        self.backward = forward if backward is None else backward
+        self.directed = backward is not None
+    
+    @classmethod
+    def build(cls, graph, count=8, directed=True):
+        """
+        Choose count landmarks by farthest-point selection and compute
+        their distance tables.
+        
+        Each new landmark is the vertex farthest (by the smallest distance
+        to the landmarks so far) from the ones already chosen, which
+        spreads them around the edge of the graph where the bounds are
+        tightest.
+        
+        Args:
+            graph: Graph object
+            directed: False if every edge was added with add_undirected_edge,
+                which halves the work and the tables
+        
+        Raises:
+            ValueError: If the graph has no vertices
+        """
+        if not graph.graph:
+            raise ValueError("cannot choose landmarks in an empty graph")
+        
+        if directed:
+            reversed_graph = Graph()
+            reversed_graph.graph = graph.reverse()
+        
+        distances, _ = dijkstra(graph, next(iter(graph.graph)))
+        nodes = list(distances)
+        closest = array('d', [float('inf')]) * len(nodes)
+        seed = array('d', (distances[node] for node in nodes))
+        landmarks, forward, backward = [], [], []
+        
+        for _ in range(min(count, len(nodes))):
+            table = seed if not forward else closest
+            far = max(range(len(nodes)),
+                      key=lambda i: table[i] if table[i] < float('inf') else -1)
+            landmark = nodes[far]
+            landmarks.append(landmark)
+            
+            distances, _ = dijkstra(graph, landmark)
+            forward.append(array('d', (distances.get(node, float('inf')) for node in nodes)))
+            if directed:
+                distances, _ = dijkstra(reversed_graph, landmark)
+                backward.append(array('d', (distances.get(node, float('inf')) for node in nodes)))
+            for i, d in enumerate(forward[-1]):
+                if d < closest[i]:
+                    closest[i] = d
+        
+        return cls(nodes, landmarks, forward, backward if directed else None)
+    
+    def __call__(self, v, target):
+        # Vertices outside the tables (unreachable when they were built, or
+        # added since) get no bound, which keeps A* exact
+        if v not in self.index or target not in self.index:
+            return 0
+        v, target = self.index[v], self.index[target]
+        bound = 0
+        for to_vertex, from_vertex in zip(self.forward, self.backward):
+            # Tables hold inf for unreachable pairs, which give no bound
+            if to_vertex[v] < float('inf') and to_vertex[target] - to_vertex[v] > bound:
+                bound = to_vertex[target] - to_vertex[v]
+            if from_vertex[target] < float('inf') and from_vertex[v] - from_vertex[target] > bound:
+                bound = from_vertex[v] - from_vertex[target]
+        return bound
+    
+    def save(self, path):
+        """
+        Write the tables to a file: a JSON header line with the vertices
+        and landmarks (which must be strings or numbers), then the float64 tables
+        """
+        header = {'format': 'alt-landmarks', 'version': 1, 'byteorder': sys.byteorder,
+                  'nodes': self.nodes, 'landmarks': self.landmarks, 'directed': self.directed}
+        with open(path, 'wb') as f:
+            f.write(json.dumps(header).encode() + b'\n')
+            for table in self.forward + (self.backward if self.directed else []):
+                table.tofile(f)
+    
+    @classmethod
+    def load(cls, path):
+        """Read tables written by save"""
+        with open(path, 'rb') as f:
+            header = json.loads(f.readline())
+            if header.get('format') != 'alt-landmarks' or header.get('version') != 1:
+                raise ValueError(f"{path} is not a landmark file")
+            if header['byteorder'] != sys.byteorder:
+                raise ValueError(f"{path} was written with the other byte order")
+            tables = []
+            for _ in range(len(header['landmarks']) * (2 if header['directed'] else 1)):
+                table = array('d')
+                table.fromfile(f, len(header['nodes']))
+                tables.append(table)
+        count = len(header['landmarks'])
+        return cls(header['nodes'], header['landmarks'], tables[:count],
+                   tables[count:] if header['directed'] else None)
+
+
 def reconstruct_path(previous, start, end):
     """
     Reconstruct shortest path from start to end
@@ -83,6 +818,14 @@ def reconstruct_path(previous, start, end):
     Returns:
         List of vertices representing the path, or None if no path exists
     """
+    if isinstance(previous, array):
+        if end != start and previous[end] < 0:
+            return None
+        path = [end]
+        while path[-1] != start:
+            path.append(previous[path[-1]])
+        return path[::-1]
+    
     if end not in previous and end != start:
         return None
     
@@ -99,6 +842,168 @@ def reconstruct_path(previous, start, end):
     return path[::-1] if path else None
 
 
+def random_weighted_edges(num_nodes, num_edges, seed=0):
+    """Generate random (u, v, weight) edges over vertex ids 0..num_nodes-1"""
+    rng = random.Random(seed)
+    for _ in range(num_edges):
+        yield rng.randrange(num_nodes), rng.randrange(num_nodes), rng.randint(1, 100)
+
+
+def benchmark_mapped_dijkstra(num_nodes=100000, num_edges=1000000):
+    """
+    Run dijkstra on a Graph and on a graph file with the same edges,
+    including the time to get each graph ready.
+    """
+    path = os.path.join(tempfile.mkdtemp(), 'roads.graph')
+    write_graph(path, num_nodes, random_weighted_edges(num_nodes, num_edges), weighted=True)
+    
+    start = time.perf_counter()
+    graph = Graph()
+    for u, v, weight in random_weighted_edges(num_nodes, num_edges):
+        graph.add_undirected_edge(u, v, weight)
+    build_ms = (time.perf_counter() - start) * 1000
+    
+    start = time.perf_counter()
+    mapped = MappedGraph(path)
+    open_ms = (time.perf_counter() - start) * 1000
+    
+    print(f"Random road network with {num_nodes} vertices and {num_edges} edges "
+          f"({os.path.getsize(path) / 2**20:.1f} MB file):")
+    print(f"{'graph':<12} {'load (ms)':<11} {'dijkstra (ms)':<14}")
+    print("-" * 37)
+    results = []
+    for label, g, load_ms in (("Graph", graph, build_ms), ("MappedGraph", mapped, open_ms)):
+        start = time.perf_counter()
+        results.append(dijkstra(g, 0)[0])
+        print(f"{label:<12} {load_ms:<11.2f} {(time.perf_counter() - start) * 1000:<14.1f}")
+    print(f"Same distances: {all(results[0][v] == d for v, d in enumerate(results[1]))}")
+    
+    mapped.close()
+    os.remove(path)
+    os.rmdir(os.path.dirname(path))
+
+
+def grid_road_edges(side, seed=0, low=1, high=100):
+    """
+    Generate the (u, v, weight) streets of a side x side grid of
+    intersections; vertex row * side + col sits at (col, row) and every
+    street has length 1 and a travel time between low and high
+    """
+    rng = random.Random(seed)
+    for row in range(side):
+        for col in range(side):
+            node = row * side + col
+            if col + 1 < side:
+                yield node, node + 1, rng.randint(low, high)
+            if row + 1 < side:
+                yield node, node + side, rng.randint(low, high)
+
+
+def benchmark_heaps(side=300, num_nodes=20000, num_edges=600000):
+    """
+    Compare the lazy heap with indexed binary and 4-ary heaps on a grid
+    road network and on a dense random graph, both read from graph files.
+    """
+    directory = tempfile.mkdtemp()
+    cases = [
+        (f"grid {side}x{side}", side * side, grid_road_edges(side)),
+        ("dense random", num_nodes, random_weighted_edges(num_nodes, num_edges)),
+    ]
+    
+    print(f"{'graph':<14} {'heap':<10} {'max size':<10} {'pushes':<9} {'decreases':<11} "
+          f"{'pops':<9} {'time (ms)':<10}")
+    print("-" * 75)
+    for label, size, edges in cases:
+        path = os.path.join(directory, 'bench.graph')
+        write_graph(path, size, edges, weighted=True)
+        with MappedGraph(path) as mapped:
+            reference = None
+            for name, heap, arity in (("lazy", 'lazy', 0), ("binary", 'indexed', 2),
+                                      ("4-ary", 'indexed', 4)):
+                stats = {}
+                start = time.perf_counter()
+                distances, _ = dijkstra(mapped, 0, heap=heap, arity=arity, stats=stats)
+                elapsed = (time.perf_counter() - start) * 1000
+                reference = reference or distances
+                same = '' if distances == reference else ' MISMATCH'
+                print(f"{label:<14} {name:<10} {stats['max_heap']:<10} {stats['pushes']:<9} "
+                      f"{stats['decreases']:<11} {stats['pops']:<9} {elapsed:<10.1f}{same}")
+        os.remove(path)
+    os.rmdir(directory)
+
+
+def benchmark_point_to_point(side=700):
+    """
+    Time one query near the middle of a grid road network and one between
+    opposite corners, with the full dijkstra and with shortest_path.
+    
+    For a 10M-vertex grid: benchmark_point_to_point(side=3163)
+    """
+    graph = Graph()
+    for u, v, weight in grid_road_edges(side):
+        graph.add_undirected_edge(u, v, weight)
+    
+    start = time.perf_counter()
+    graph.reverse()
+    reverse_ms = (time.perf_counter() - start) * 1000
+    
+    middle = (side // 2) * side + side // 2
+    queries = [("nearby", middle, middle + 10 * side + 10), ("corner", 0, side * side - 1)]
+    print(f"Grid road network with {side * side} intersections "
+          f"(reverse adjacency built once in {reverse_ms:.0f} ms):")
+    print(f"{'query':<8} {'method':<16} {'distance':<10} {'time (ms)':<10}")
+    print("-" * 46)
+    for label, source, target in queries:
+        start = time.perf_counter()
+        distances, previous = dijkstra(graph, source)
+        reconstruct_path(previous, source, target)
+        print(f"{label:<8} {'full dijkstra':<16} {distances[target]:<10} "
+              f"{(time.perf_counter() - start) * 1000:<10.1f}")
+        for name, bidirectional in (("early exit", False), ("bidirectional", True)):
+            start = time.perf_counter()
+            distance, _ = shortest_path(graph, source, target, bidirectional)
+            print(f"{label:<8} {name:<16} {distance:<10} {(time.perf_counter() - start) * 1000:<10.1f}")
+
+
+def benchmark_astar(side=400, landmarks=8):
+    """
+    Compare dijkstra-order search with A* using grid coordinates and ALT
+    landmarks on a grid road network whose streets take 50-100 time units.
+    """
+    graph = Graph()
+    for u, v, weight in grid_road_edges(side, low=50, high=100):
+        graph.add_undirected_edge(u, v, weight)
+    coordinates = [(node % side, node // side) for node in range(side * side)]
+    
+    start = time.perf_counter()
+    alt = Landmarks.build(graph, count=landmarks, directed=False)
+    build_ms = (time.perf_counter() - start) * 1000
+    path = os.path.join(tempfile.mkdtemp(), 'grid.landmarks')
+    alt.save(path)
+    start = time.perf_counter()
+    alt = Landmarks.load(path)
+    load_ms = (time.perf_counter() - start) * 1000
+    print(f"Grid road network with {side * side} intersections; {landmarks} landmarks built in "
+          f"{build_ms:.0f} ms, loaded from {os.path.getsize(path) / 2**20:.1f} MB in {load_ms:.0f} ms")
+    os.remove(path)
+    os.rmdir(os.path.dirname(path))
+    
+    heuristics = [("none", None), ("euclidean", CoordinateHeuristic(coordinates, scale=50)),
+                  ("landmarks", alt)]
+    rng = random.Random(0)
+    queries = [("corner", 0, side * side - 1)] + [
+        (f"random {i + 1}", rng.randrange(side * side), rng.randrange(side * side)) for i in range(2)]
+    print(f"{'query':<10} {'heuristic':<11} {'distance':<10} {'expanded':<10} {'time (ms)':<10}")
+    print("-" * 55)
+    for label, source, target in queries:
+        for name, heuristic in heuristics:
+            stats = {}
+            start = time.perf_counter()
+            distance, _ = astar(graph, source, target, heuristic, stats)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"{label:<10} {name:<11} {distance:<10} {stats['expanded']:<10} {elapsed:<10.1f}")
+
+
 def demonstrate_dijkstra():
     """Demonstrate Dijkstra's algorithm"""
     print("=" * 70)
@@ -196,6 +1101,62 @@ def demonstrate_dijkstra():
     print(f"  Path: {' -> '.join(path)}")
     print(f"  Total latency: {distances[target]}")
     
+    # Example 4: Graph files
+    print("\n\nExample 4: Memory-Mapped Graph File")
+    print("-" * 70)
+    
+    path = os.path.join(tempfile.mkdtemp(), 'grid.graph')
+    write_graph(path, 9, edges, weighted=True)
+    with MappedGraph(path) as mapped:
+        distances, previous = dijkstra(mapped, 0)
+        print("Example 2 read from disk, shortest distances from vertex 0:")
+        for node in range(mapped.num_nodes):
+            print(f"  {node}: distance {distances[node]:g}, "
+                  f"path: {reconstruct_path(previous, 0, node)}")
+    os.remove(path)
+    os.rmdir(os.path.dirname(path))
+    print()
+    benchmark_mapped_dijkstra()
+    
+    # Example 5: Heaps with decrease-key
+    print("\n\nExample 5: Indexed Heap with Decrease-Key")
+    print("-" * 70)
+    
+    lazy_stats, indexed_stats = {}, {}
+    lazy, _ = dijkstra(g1, 'A', stats=lazy_stats)
+    indexed, _ = dijkstra(g1, 'A', heap='indexed', stats=indexed_stats)
+    print(f"Example 1, lazy heap:    {lazy_stats}")
+    print(f"Example 1, indexed heap: {indexed_stats}")
+    print(f"Same distances: {lazy == indexed}")
+    print()
+    benchmark_heaps()
+    
+    # Example 6: Point-to-point queries
+    print("\n\nExample 6: Point-to-Point Queries")
+    print("-" * 70)
+    
+    for bidirectional in (False, True):
+        distance, path = shortest_path(g3, source, target, bidirectional)
+        print(f"{'Bidirectional' if bidirectional else 'Early exit':<14} {source} to {target}: "
+              f"{' -> '.join(path)} ({distance})")
+    print()
+    benchmark_point_to_point()
+    
+    # Example 7: A* search
+    print("\n\nExample 7: A* with Coordinates and Landmarks")
+    print("-" * 70)
+    
+    # Example 2's grid: vertex 3 * row + col, streets of length 1 and weight >= 1
+    heuristic = CoordinateHeuristic([(node % 3, node // 3) for node in range(9)])
+    for name, h in (("none", None), ("euclidean", heuristic),
+                    ("landmarks", Landmarks.build(g2, count=2, directed=False))):
+        stats = {}
+        distance, path = astar(g2, 0, 8, h, stats)
+        print(f"  {name:<10} 0 -> 8: distance {distance}, path {path}, "
+              f"{stats['expanded']} vertices expanded")
+    print()
+    benchmark_astar()
+    
     print("\n" + "=" * 70)
     print("Key Properties:")
     print("=" * 70)
@@ -203,7 +1164,9 @@ def demonstrate_dijkstra():
     print("2. Finds shortest paths from source to all vertices")
     print("3. Uses greedy strategy: always process closest unvisited vertex")
     print("4. Time complexity: O((V + E) log V) with binary heap")
+    print("   An indexed heap with decrease-key holds at most V entries")
     print("5. Applications: GPS navigation, network routing, social networks")
+    print("6. A* with an admissible heuristic finds the same paths expanding fewer vertices")
 
 
 if __name__ == "__main__":
@@ -4,7 +4,17 @@ Implements Prim's and Kruskal's algorithms for MST
 """
 
 import heapq
+import mmap
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from bisect import bisect_right
 from collections import defaultdict
+from itertools import accumulate
 
 
 class Graph:
@@ -21,6 +31,163 @@ class Graph:
         self.edges.append((u, v, weight))
 
 
+GRAPH_MAGIC = b'CSRGRAPH'
+GRAPH_HEADER = struct.Struct('<8sIIQQ')  # magic, version, flags, nodes, entries
+DIRECTED, WEIGHTED, BIG_ENDIAN = 1, 2, 4
+
+
+def _graph_layout(num_nodes, num_entries):
+    """Byte ranges of the offsets, targets and weights sections"""
+    offsets_start = GRAPH_HEADER.size
+    targets_start = offsets_start + 8 * (num_nodes + 1)
+    weights_start = targets_start + 4 * num_entries
+    weights_start += -weights_start % 8
+    return offsets_start, targets_start, weights_start, weights_start + 8 * num_entries
+
+
+def write_graph(path, num_nodes, edges, directed=False, weighted=False, chunk=1 << 16):
+    """
+    Write a graph file from a stream of edges (from exercise 1 of 04-graphs).
+    
+    File layout, all sections in native byte order:
+        header   magic, version, flags, node count, entry count (32 bytes)
+        offsets  int64 * (nodes + 1)
+        targets  int32 * entries
+        weights  float64 * entries, 8-byte aligned, only if weighted
+    
+    An undirected edge is stored in both directions. The edges are read
+    once: they are spooled to a temporary file in chunks while the
+    degrees are counted, then scattered straight into the mapped output,
+    so only O(V) arrays are held in memory.
+    
+    Args:
+        path: File to create
+        num_nodes: Vertex ids are 0..num_nodes-1
+        edges: Iterable of (u, v), or (u, v, weight) if weighted
+    
+    Returns:
+        Number of adjacency entries written
+    """
+    degree = array('q', [0]) * (num_nodes + 1)
+    with tempfile.TemporaryFile() as spool:
+        sizes = []
+        heads, tails, weights = array('i'), array('i'), array('d')
+        for edge in edges:
+            u, v = edge[0], edge[1]
+            heads.append(u)
+            tails.append(v)
+            if weighted:
+                weights.append(edge[2])
+            degree[u + 1] += 1
+            if not directed:
+                degree[v + 1] += 1
+            if len(heads) == chunk:
+                sizes.append(len(heads))
+                for part in (heads, tails, weights):
+                    part.tofile(spool)
+                    del part[:]
+        sizes.append(len(heads))
+        for part in (heads, tails, weights):
+            part.tofile(spool)
+            del part[:]
+        
+        offsets = array('q', accumulate(degree))
+        num_entries = offsets[-1]
+        offsets_start, targets_start, weights_start, end = _graph_layout(num_nodes, num_entries)
+        flags = (DIRECTED * directed) | (WEIGHTED * weighted) | (BIG_ENDIAN * (sys.byteorder == 'big'))
+        
+        with open(path, 'w+b') as f:
+            f.truncate(end)
+            with mmap.mmap(f.fileno(), 0) as mapped:
+                GRAPH_HEADER.pack_into(mapped, 0, GRAPH_MAGIC, 1, flags, num_nodes, num_entries)
+                mapped[offsets_start:targets_start] = offsets.tobytes()
+                
+                view = memoryview(mapped)
+                targets = view[targets_start:targets_start + 4 * num_entries].cast('i')
+                out_weights = view[weights_start:end].cast('d') if weighted else None
+                position = offsets[:-1]
+                spool.seek(0)
+                for size in sizes:
+                    heads.fromfile(spool, size)
+                    tails.fromfile(spool, size)
+                    if weighted:
+                        weights.fromfile(spool, size)
+                    for i in range(size):
+                        u, v = heads[i], tails[i]
+                        targets[position[u]] = v
+                        if weighted:
+                            out_weights[position[u]] = weights[i]
+                        position[u] += 1
+                        if not directed:
+                            targets[position[v]] = u
+                            if weighted:
+                                out_weights[position[v]] = weights[i]
+                            position[v] += 1
+                    for part in (heads, tails, weights):
+                        del part[:]
+                
+                targets.release()
+                if weighted:
+                    out_weights.release()
+                view.release()
+    return num_entries
+
+
+class MappedGraph:
+    """
+    Read-only CSR graph backed by a graph file through mmap (from
+    exercise 1 of 04-graphs).
+    
+    The neighbors of vertex v are targets[offsets[v]:offsets[v + 1]], with
+    their weights at the same positions in weights. All three are
+    memoryviews of the mapped file, so opening only reads the header and
+    the operating system pages in what an algorithm touches.
+    
+    Attributes:
+        num_nodes: Number of vertices (ids 0..num_nodes-1)
+        offsets, targets, weights: Views of the file sections; weights is
+            None for an unweighted file
+        directed: Whether edges were stored in one direction only
+    """
+    
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._mapped = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, flags, num_nodes, num_entries = GRAPH_HEADER.unpack_from(self._mapped)
+        if magic != GRAPH_MAGIC or version != 1:
+            self.close()
+            raise ValueError(f"{path} is not a graph file")
+        if bool(flags & BIG_ENDIAN) != (sys.byteorder == 'big'):
+            self.close()
+            raise ValueError(f"{path} was written with the other byte order")
+        
+        offsets_start, targets_start, weights_start, end = _graph_layout(num_nodes, num_entries)
+        self._view = memoryview(self._mapped)
+        self.num_nodes = num_nodes
+        self.offsets = self._view[offsets_start:targets_start].cast('q')
+        self.targets = self._view[targets_start:targets_start + 4 * num_entries].cast('i')
+        self.weights = self._view[weights_start:end].cast('d') if flags & WEIGHTED else None
+        self.directed = bool(flags & DIRECTED)
+    
+    def neighbors(self, v):
+        """Neighbor ids of vertex v"""
+        return self.targets[self.offsets[v]:self.offsets[v + 1]]
+    
+    def close(self):
+        """Release the views and unmap the file"""
+        for view in (getattr(self, name, None) for name in ('offsets', 'targets', 'weights', '_view')):
+            if view is not None:
+                view.release()
+        self._mapped.close()
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
 class UnionFind:
     """Union-Find data structure for Kruskal's algorithm"""
     
@@ -101,8 +268,12 @@ def kruskal_mst(graph):
     Space Complexity: O(V)
     
     Returns:
-        List of edges in the MST
+        List of edges in the MST; for a MappedGraph (weighted, undirected)
+        the edges are (u, v, weight) with vertex ids
     """
+    if isinstance(graph, MappedGraph):
+        return _kruskal_mapped(graph)
+    
     # Sort edges by weight
     sorted_edges = sorted(graph.edges, key=lambda x: x[2])
     
@@ -132,6 +303,79 @@ def kruskal_mst(graph):
     return mst_edges
 
 
+def _kruskal_mapped(graph):
+    """
+    kruskal_mst over the views of a MappedGraph.
+    
+    Every undirected edge is stored twice; only the copy with u < v is
+    sorted. The sorted positions are the only O(E) structure in memory,
+    and the source vertex of a position is found by bisecting the offsets
+    rather than stored.
+    """
+    if graph.weights is None or graph.directed:
+        raise ValueError("kruskal_mst needs an undirected graph file written with weighted=True")
+    offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+    
+    positions = array('q')
+    for u in range(graph.num_nodes):
+        for i in range(offsets[u], offsets[u + 1]):
+            if targets[i] > u:
+                positions.append(i)
+    
+    uf = UnionFind(graph.num_nodes)
+    mst_edges = []
+    for i in sorted(positions, key=weights.__getitem__):
+        u, v = bisect_right(offsets, i) - 1, targets[i]
+        if uf.union(u, v):
+            mst_edges.append((u, v, weights[i]))
+            
+            # Stop when we have V-1 edges
+            if len(mst_edges) == graph.num_nodes - 1:
+                break
+    
+    return mst_edges
+
+
+def random_weighted_edges(num_nodes, num_edges, seed=0):
+    """Generate random (u, v, weight) edges over vertex ids 0..num_nodes-1"""
+    rng = random.Random(seed)
+    for _ in range(num_edges):
+        yield rng.randrange(num_nodes), rng.randrange(num_nodes), rng.randint(1, 1000)
+
+
+def benchmark_mapped_kruskal(num_nodes=100000, num_edges=1000000):
+    """
+    Run kruskal_mst on a Graph and on a graph file with the same edges,
+    including the time to get each graph ready.
+    """
+    path = os.path.join(tempfile.mkdtemp(), 'network.graph')
+    write_graph(path, num_nodes, random_weighted_edges(num_nodes, num_edges), weighted=True)
+    
+    start = time.perf_counter()
+    graph = Graph()
+    for u, v, weight in random_weighted_edges(num_nodes, num_edges):
+        graph.add_edge(u, v, weight)
+    build_ms = (time.perf_counter() - start) * 1000
+    
+    start = time.perf_counter()
+    mapped = MappedGraph(path)
+    open_ms = (time.perf_counter() - start) * 1000
+    
+    print(f"Random network with {num_nodes} vertices and {num_edges} edges "
+          f"({os.path.getsize(path) / 2**20:.1f} MB file):")
+    print(f"{'graph':<12} {'load (ms)':<11} {'kruskal (ms)':<13} {'weight':<12}")
+    print("-" * 48)
+    for label, g, load_ms in (("Graph", graph, build_ms), ("MappedGraph", mapped, open_ms)):
+        start = time.perf_counter()
+        mst_edges = kruskal_mst(g)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{label:<12} {load_ms:<11.2f} {elapsed:<13.1f} {sum(w for _, _, w in mst_edges):<12.0f}")
+    
+    mapped.close()
+    os.remove(path)
+    os.rmdir(os.path.dirname(path))
+
+
 def demonstrate_mst():
     """Demonstrate MST algorithms"""
     print("=" * 70)
@@ -224,6 +468,23 @@ def demonstrate_mst():
         print(f"  {u} -- ${w} -- {v}")
     print(f"\nTotal cost: ${total_cost}")
     
+    # Example 4: Graph files
+    print("\n\nExample 4: Memory-Mapped Graph File")
+    print("-" * 70)
+    
+    path = os.path.join(tempfile.mkdtemp(), 'example2.graph')
+    write_graph(path, 7, edges, weighted=True)
+    with MappedGraph(path) as mapped:
+        mst_edges = kruskal_mst(mapped)
+        print("Example 2 read from disk, Kruskal's MST:")
+        for u, v, w in mst_edges:
+            print(f"  {u} --{w:g}-- {v}")
+        print(f"  Total weight: {sum(w for _, _, w in mst_edges):g}")
+    os.remove(path)
+    os.rmdir(os.path.dirname(path))
+    print()
+    benchmark_mapped_kruskal()
+    
     print("\n" + "=" * 70)
     print("Key Properties:")
     print("=" * 70)